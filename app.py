@@ -1,11 +1,27 @@
-from src.etl.extract import extract
-from src.etl.transform import transform
-from src.etl.load import load
-from src.visualization.dashboard import show_dashboard  # <-- importa aqui
+from functools import partial
 
+import streamlit as st
+from src.data.access import (carregar_agregados, carregar_contas, exportar_transacoes, fingerprint_db,
+                             registrar_transacao_db)
+from src.visualization.dashboard import filtros_sidebar, formulario_transacao, show_dashboard
 
+# O app lê o que já está no banco e só grava transações avulsas. O ETL roda à parte:
+#   python -m src.etl.pipeline <extrato.csv>
+#   python -m src.etl.ingest <pasta-de-extratos>
+#   python -m src.etl.agendador <pasta-de-entrada>   (fica observando a pasta)
 
-df = extract()
-df = transform(df)
-load(df)
-show_dashboard(df)
\ No newline at end of file
+st.set_page_config(page_title="Controle Financeiro", layout="wide")
+
+# Uma consulta barata por rerun decide se os caches ainda valem. Os filtros
+# vão para o WHERE das consultas; sem filtro, os agregados vivos
+versao = fingerprint_db()
+menu = st.sidebar.selectbox("Menu", ["🏠 Dashboard", "➕ Nova Transação"])
+
+if menu == "🏠 Dashboard":
+    filtros = filtros_sidebar(carregar_agregados(fingerprint=versao), contas=carregar_contas(versao))
+    show_dashboard(agregados=carregar_agregados(filtros, versao),
+                   exportar=partial(exportar_transacoes, filtros))
+else:
+    # INSERT de uma linha pelo pool; os agregados vivos recebem o delta
+    st.header("Adicionar Nova Transação")
+    formulario_transacao(registrar_transacao_db, contas=carregar_contas(versao))
@@ -0,0 +1,88 @@
+import argparse
+import os
+import re
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from src.etl import categorizacao
+
+
+def regras_sinteticas(n):
+    # `n` regras de palavras-chave, como um arquivo de regras real com
+    # algumas centenas de estabelecimentos
+    return [{"categoria": f"Categoria {i % 20}", "palavras": [f"loja{i:04x}", f"servico {i:04x}"]}
+            for i in range(n)]
+
+
+def descricoes_sinteticas(n, estabelecimentos, seed=0):
+    # Poucos milhares de estabelecimentos, cada um com um código de
+    # transação diferente por linha (que a normalização descarta)
+    rng = np.random.default_rng(seed)
+    lojas = rng.integers(0, estabelecimentos, n)
+    codigos = rng.integers(0, 10**6, n)
+    return pd.Series([f"PIX LOJA{l:04x} {c}" for l, c in zip(lojas, codigos)])
+
+
+def laco_por_linha(descricoes, regras):
+    # Abordagem ingênua: cada linha contra cada regra, na ordem
+    padroes = [(re.compile("|".join(re.escape(p) for p in regra["palavras"])), regra["categoria"])
+               for regra in regras]
+    resultado = []
+    for descricao in descricoes.str.lower():
+        resultado.append(next((categoria for padrao, categoria in padroes if padrao.search(descricao)), None))
+    return resultado
+
+
+def main():
+    argumentos = argparse.ArgumentParser(description="Categorização: laço por linha x regras compiladas com memo")
+    argumentos.add_argument("--linhas", type=int, default=200_000)
+    argumentos.add_argument("--regras", type=int, default=500)
+    argumentos.add_argument("--estabelecimentos", type=int, default=2_000)
+    args = argumentos.parse_args()
+
+    regras = regras_sinteticas(args.regras)
+    descricoes = descricoes_sinteticas(args.linhas, args.estabelecimentos)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = os.path.join(tmp, "categorizacao.json")
+
+        def motor_frio():
+            categorizacao._motores.clear()
+            if os.path.exists(cache):
+                os.remove(cache)
+            motor = categorizacao.categorizador(regras, cache)
+            resultado = motor.categorizar(descricoes)
+            motor.salvar()
+            return resultado
+
+        def motor_cache_em_disco():
+            # Outro processo: memo vazio, mas o cache gravado pelo anterior
+            categorizacao._motores.clear()
+            return categorizacao.categorizador(regras, cache).categorizar(descricoes)
+
+        def motor_quente():
+            return categorizacao.categorizador(regras, cache).categorizar(descricoes)
+
+        casos = {
+            "laço por linha x regra": lambda: laco_por_linha(descricoes, regras),
+            "compilado, sem cache": motor_frio,
+            "compilado, cache em disco": motor_cache_em_disco,
+            "compilado, memo do processo": motor_quente,
+        }
+
+        print(f"\n{args.linhas:,} linhas, {args.regras} regras, {args.estabelecimentos:,} estabelecimentos")
+        referencia = None
+        for nome, func in casos.items():
+            inicio = time.perf_counter()
+            resultado = list(func())
+            segundos = time.perf_counter() - inicio
+            if referencia is None:
+                referencia = resultado
+            iguais = "ok" if resultado == referencia else "DIVERGE"
+            print(f"  {nome:<28} {segundos:8.3f}s  {args.linhas / segundos:12,.0f} linhas/s  {iguais}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import argparse
+import contextlib
+import io
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+from benchmarks.sintetico import gerar_extrato
+from src.analytics.aggregates import (DIAS_ORDEM, MESES, _somar_por_dia, codigos_dia,
+                                      dia_semana_do_diario, heatmap_mes_dia)
+from src.etl.transform import transform
+
+MESES_EN = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+
+
+def pivot_por_linha(df):
+    # Como o dashboard fazia: nomes de mês e de dia da semana em strings por
+    # linha, pivot_table por nome do mês (anos somados) e Categorical no dia
+    df = df.copy()
+    df['Mês_Nome'] = df['Data'].dt.strftime('%b')
+    df['Dia_Semana'] = df['Data'].dt.day_name()
+    df_saidas = df[df['Tipo'] == 'saida'].copy()
+    df_saidas['Valor'] = df_saidas['Valor'].abs()
+
+    df_saidas['Dia_Semana'] = pd.Categorical(df_saidas['Dia_Semana'], categories=DIAS_ORDEM, ordered=True)
+    gastos_dia = df_saidas.groupby('Dia_Semana', observed=False)['Valor'].sum().reindex(DIAS_ORDEM)
+
+    df_saidas['Dia'] = df_saidas['Data'].dt.day
+    heatmap = df_saidas.pivot_table(index='Mês_Nome', columns='Dia', values='Valor', aggfunc='sum', fill_value=0)
+    heatmap = heatmap.reindex([m for m in MESES_EN if m in heatmap.index])
+    return heatmap, gastos_dia
+
+
+def groupby_diario(df):
+    # Versão anterior dos agregados: groupby por dia (Timestamp) e, sobre o
+    # diário, groupby por nome do mês e por dayofweek
+    saida = (df['Tipo'] == 'saida').to_numpy()
+    base = pd.DataFrame({'Dia': df['Data'].dt.normalize().to_numpy(),
+                         'saida': np.where(saida, df['Valor'].abs().to_numpy(), 0.0)})
+    saidas = base.groupby('Dia')['saida'].sum().sort_index()
+
+    gastos_dia = saidas.groupby(saidas.index.dayofweek).sum().reindex(range(7), fill_value=0.0)
+    gastos_dia.index = DIAS_ORDEM
+    heatmap = saidas.groupby([saidas.index.strftime('%b'), saidas.index.day]).sum().unstack(fill_value=0)
+    heatmap = heatmap.reindex([m for m in MESES_EN if m in heatmap.index])
+    return heatmap, gastos_dia
+
+
+def codigos_bincount(df):
+    # Códigos inteiros de dia + bincount, um heatmap por ano
+    saida = (df['Tipo'] == 'saida').to_numpy()
+    valor = df['Valor'].abs().to_numpy(dtype='float64')
+    diario = _somar_por_dia(codigos_dia(df['Data']), np.where(saida, 0.0, valor), np.where(saida, valor, 0.0),
+                            saida)
+    agregados = SimpleNamespace(diario=diario)
+    anos = sorted(set(diario.index.year))
+    return {ano: heatmap_mes_dia(agregados, ano) for ano in anos}, dia_semana_do_diario(diario)
+
+
+def conferir(resultados):
+    # Dia da semana igual nos três; os heatmaps por ano somados dão o pivot
+    # original (que mistura os anos)
+    pivot, dia_pivot = resultados["pivot por linha (original)"]
+    por_ano, dia_codigos = resultados["códigos + bincount"]
+    somado = sum(h.reindex(MESES, fill_value=0.0) for h in por_ano.values())
+    somado = somado.loc[(somado > 0).any(axis=1)]
+    somado.index = [MESES_EN[MESES.index(m)] for m in somado.index]
+    heatmap_ok = np.allclose(somado[pivot.columns].to_numpy(), pivot.to_numpy())
+    dias_ok = all(np.allclose(dia.to_numpy(), dia_pivot.to_numpy()) for _, dia in resultados.values())
+    return heatmap_ok and dias_ok
+
+
+def main():
+    argumentos = argparse.ArgumentParser(description="Heatmap e dia da semana: pivot x groupby x códigos + bincount")
+    argumentos.add_argument("--linhas", type=int, default=1_000_000)
+    argumentos.add_argument("--repeticoes", type=int, default=3)
+    args = argumentos.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        df = transform(gerar_extrato(args.linhas))
+
+    casos = {
+        "pivot por linha (original)": pivot_por_linha,
+        "groupby no diário (anterior)": groupby_diario,
+        "códigos + bincount": codigos_bincount,
+    }
+
+    print(f"\n{args.linhas:,} linhas, {df['Data'].dt.year.nunique()} anos")
+    resultados = {}
+    for nome, func in casos.items():
+        tempos = []
+        for _ in range(args.repeticoes):
+            inicio = time.perf_counter()
+            resultados[nome] = func(df)
+            tempos.append(time.perf_counter() - inicio)
+        print(f"  {nome:<30} {min(tempos):8.3f}s  {args.linhas / min(tempos):12,.0f} linhas/s")
+    print(f"  resultados {'conferem' if conferir(resultados) else 'DIVERGEM'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.sintetico import gerar_extrato, salvar_extrato
+from src.etl.ingest import ler_arquivos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingestão multi-arquivo: sequencial x pool de processos")
+    parser.add_argument("--arquivos", type=int, default=16)
+    parser.add_argument("--linhas", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        arquivos = []
+        for i in range(args.arquivos):
+            path = os.path.join(tmp, f"Extrato_{i:03d}.csv")
+            salvar_extrato(gerar_extrato(args.linhas, seed=i), path)
+            arquivos.append(path)
+        contas = [f"Conta {i % 4}" for i in range(args.arquivos)]
+
+        resultados = {}
+        for nome, workers in (("sequencial", 1), (f"pool ({args.workers})", args.workers)):
+            inicio = time.perf_counter()
+            # Sem o cache Parquet: mede o parse dos CSVs, não a releitura do cache
+            ler_arquivos(arquivos, contas, workers=workers, cache=False)
+            resultados[nome] = time.perf_counter() - inicio
+
+    total = args.arquivos * args.linhas
+    print(f"\n{args.arquivos} arquivos x {args.linhas} linhas ({total} linhas)")
+    base = resultados["sequencial"]
+    for nome, segundos in resultados.items():
+        print(f"  {nome:<14} {segundos:8.2f}s  {total / segundos:12,.0f} linhas/s  {base / segundos:5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
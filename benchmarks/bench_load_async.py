@@ -0,0 +1,82 @@
+import argparse
+import contextlib
+import io
+import os
+import time
+
+import psycopg2
+from benchmarks.sintetico import gerar_extrato
+from src.config.database import DB_CONFIG
+from src.etl.dimensoes import limpar_cache
+from src.etl.load import load
+from src.etl.load_async import carregar_lotes
+from src.etl.schema import garantir_schema
+from src.etl.transform import transform
+
+SCHEMA_BENCH = os.getenv("BENCH_SCHEMA", "bench_etl")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Carga de vários lotes: load() sequencial x load_async")
+    parser.add_argument("--lotes", type=int, default=8)
+    parser.add_argument("--linhas", type=int, default=50_000)
+    parser.add_argument("--concorrencia", type=int, default=4)
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        lotes = [transform(gerar_extrato(args.linhas, seed=i), conta=f"Conta {i}")
+                 for i in range(args.lotes)]
+
+    conn = psycopg2.connect(**DB_CONFIG, options=f"-c search_path={SCHEMA_BENCH}")
+    with conn.cursor() as cur:
+        cur.execute(f"CREATE SCHEMA IF NOT EXISTS {SCHEMA_BENCH}")
+        garantir_schema(cur)
+    conn.commit()
+
+    def limpar():
+        with conn.cursor() as cur:
+            cur.execute("TRUNCATE tb_transacoes, tb_resumo_mensal, tb_marcas_carga")
+        conn.commit()
+
+    def sequencial(mode):
+        for df in lotes:
+            load(df, mode=mode, conn=conn)
+
+    def concorrente(mode, concorrencia):
+        carregar_lotes(lotes, mode=mode, concorrencia=concorrencia,
+                       server_settings={"search_path": SCHEMA_BENCH})
+
+    casos = {
+        "sequencial insert (execute_batch)": lambda: sequencial("insert"),
+        "sequencial copy": lambda: sequencial("copy"),
+        "sequencial incremental": lambda: sequencial("incremental"),
+        "async insert": lambda: concorrente("insert", args.concorrencia),
+        "async copy": lambda: concorrente("copy", args.concorrencia),
+        "async incremental": lambda: concorrente("incremental", args.concorrencia),
+        "async incremental (1 conexão)": lambda: concorrente("incremental", 1),
+    }
+
+    resultados = {}
+    try:
+        for nome, func in casos.items():
+            limpar()
+            with contextlib.redirect_stdout(io.StringIO()):
+                inicio = time.perf_counter()
+                func()
+                resultados[nome] = time.perf_counter() - inicio
+    finally:
+        with conn.cursor() as cur:
+            cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA_BENCH} CASCADE")
+        conn.commit()
+        limpar_cache()
+        conn.close()
+
+    total = args.lotes * args.linhas
+    print(f"\n{args.lotes} lotes x {args.linhas} linhas ({total} linhas), {args.concorrencia} conexões")
+    base = resultados["sequencial insert (execute_batch)"]
+    for nome, segundos in resultados.items():
+        print(f"  {nome:<34} {segundos:8.2f}s  {total / segundos:12,.0f} linhas/s  {base / segundos:5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+import argparse
+import os
+import tempfile
+import time
+import warnings
+
+import pandas as pd
+from benchmarks.sintetico import gerar_extrato, salvar_extrato
+from src.etl import parser
+
+COLUNAS = parser.COLUNAS_EXTRATO
+
+
+def legado(path):
+    # Leitura e conversão como eram no transform original
+    df = pd.read_csv(path)
+    df["Data"] = pd.to_datetime(df["Data"], format=parser.FORMATO_DATA, errors="coerce")
+    df["Valor"] = pd.to_numeric(df["Valor"], errors="coerce")
+    return df.dropna(subset=["Data", "Valor"])
+
+
+def dtypes_na_leitura(path):
+    # extract() anterior ao parser: dtypes na leitura, Valor float com
+    # releitura como texto quando falha
+    dtypes = {"Data": str, "Descrição": str, "Categoria": "category", "Transação": "category"}
+    try:
+        df = pd.read_csv(path, usecols=COLUNAS, dtype={**dtypes, "Valor": "float64"})
+    except ValueError:
+        df = pd.read_csv(path, usecols=COLUNAS, dtype={**dtypes, "Valor": str})
+    df["Data"] = parser.parse_datas(df["Data"])
+    df["Valor"] = pd.to_numeric(df["Valor"], errors="coerce")
+    return df.dropna(subset=["Data", "Valor"])
+
+
+def parser_pandas(path):
+    pyarrow, parser.pa = parser.pa, None
+    try:
+        return parser.ler_extrato(path, rejeitados_dir=None)
+    finally:
+        parser.pa = pyarrow
+
+
+def main():
+    argumentos = argparse.ArgumentParser(description="Parse do extrato: legado x parser com pyarrow")
+    argumentos.add_argument("--linhas", type=int, default=1_000_000)
+    argumentos.add_argument("--repeticoes", type=int, default=3)
+    args = argumentos.parse_args()
+
+    casos = {
+        "legado (object + to_datetime)": legado,
+        "dtypes na leitura": dtypes_na_leitura,
+        "parser (pandas)": parser_pandas,
+        "parser (pyarrow)": lambda path: parser.ler_extrato(path, rejeitados_dir=None),
+    }
+    if parser.pa is None:
+        del casos["parser (pyarrow)"]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for decimal in (".", ","):
+            path = os.path.join(tmp, f"extrato{decimal}.csv")
+            salvar_extrato(gerar_extrato(args.linhas, decimal=decimal), path)
+            tamanho = os.path.getsize(path) / 2**20
+
+            print(f"\n{args.linhas:,} linhas, decimal '{decimal}' ({tamanho:.0f} MB, melhor de {args.repeticoes})")
+            for nome, func in casos.items():
+                melhor = float("inf")
+                for _ in range(args.repeticoes):
+                    with warnings.catch_warnings():
+                        warnings.simplefilter("ignore")
+                        inicio = time.perf_counter()
+                        df = func(path)
+                        melhor = min(melhor, time.perf_counter() - inicio)
+                print(f"  {nome:<30} {melhor:8.3f}s  {args.linhas / melhor:12,.0f} linhas/s  "
+                      f"{tamanho / melhor:7.1f} MB/s  {len(df):>10,} linhas válidas")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+import pandas as pd
+from benchmarks.sintetico import gerar_extrato, salvar_extrato
+from src.etl.extract import extract
+from src.etl.transform import transform
+
+
+def transform_legado(df):
+    # Cópia do transform() anterior à vetorização, mantida como referência
+    df = df.drop(columns=["Unnamed: 4"], errors="ignore")
+    df = df.drop(columns=["Unnamed: 7"], errors="ignore")
+    df = df.drop(columns=["Unnamed: 0"], errors="ignore")
+    df = df.drop(columns=["Unnamed: 5"], errors="ignore")
+    df = df.drop(columns=["Unnamed: 8"], errors="ignore")
+    df = df.drop(columns=["Unnamed: 9"], errors="ignore")
+    df["Data"] = pd.to_datetime(df["Data"], format="%d/%m/%Y %H:%M", errors="coerce")
+    df["Descrição"] = df["Descrição"].str.lower().str.strip()
+    df["Categoria"] = df["Categoria"].str.strip()
+    df["Transação"] = df["Transação"].str.lower().str.strip()
+    df["Valor"] = pd.to_numeric(df["Valor"], errors="coerce")
+    df["Conta"] = "Conta BTG Pactual"
+    df["Tipo"] = df["Valor"].apply(lambda x: "saida" if x < 0 else "entrada")
+    print(df)
+    df.isna().any(axis=1).sum()
+    return df.dropna(subset=["Data", "Valor", "Transação", "Categoria", "Descrição", "Conta"])
+
+
+def cronometrar(func, repeticoes):
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        with contextlib.redirect_stdout(io.StringIO()):
+            inicio = time.perf_counter()
+            resultado = func()
+            melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor, resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description="transform(): legado x vetorizado")
+    parser.add_argument("--linhas", type=int, default=1_000_000)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "extrato.csv")
+        salvar_extrato(gerar_extrato(args.linhas), path)
+
+        bruto_legado = pd.read_csv(path)
+        bruto_novo = extract(path, cache=False)
+
+        casos = {
+            "read_csv padrão": lambda: pd.read_csv(path),
+            "extract() com dtypes": lambda: extract(path, cache=False),
+            "transform legado": lambda: transform_legado(bruto_legado.copy()),
+            "transform vetorizado": lambda: transform(bruto_novo),
+        }
+        resultados = {nome: cronometrar(func, args.repeticoes) for nome, func in casos.items()}
+
+    print(f"\n{args.linhas:,} linhas (melhor de {args.repeticoes})")
+    for nome, (segundos, df) in resultados.items():
+        memoria = df.memory_usage(deep=True).sum() / 2**20
+        print(f"  {nome:<22} {segundos:8.3f}s  {args.linhas / segundos:12,.0f} linhas/s  {memoria:8.1f} MB")
+
+    antes = resultados["transform legado"][0]
+    depois = resultados["transform vetorizado"][0]
+    print(f"  transform: {antes / depois:.1f}x mais rápido")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+CATEGORIAS = ["Alimentação", "Transporte", "Moradia", "Lazer", "Saúde",
+              "Educação", "Salário", "Investimentos", "Outros"]
+TAMANHOS = {"10k": 10_000, "1m": 1_000_000, "10m": 10_000_000}
+PARTE = 1_000_000
+
+TRANSACOES = ["Pix", "Cartão de crédito", "Cartão de débito", "TED", "Boleto"]
+DESCRICOES = ["Mercado Pão de Açúcar", "Uber *Trip", "Aluguel", "Netflix.com",
+              "Farmácia São João", "Salário ACME Ltda", "Posto Shell", "iFood *Pedido"]
+
+
+def gerar_extrato(n, seed=0, decimal="."):
+    """
+    Extrato sintético no mesmo formato do CSV exportado pelo BTG. Com
+    `decimal=","` os valores saem no formato brasileiro ("-1.234,56").
+    """
+    rng = np.random.default_rng(seed)
+    minutos = rng.integers(0, 3 * 365 * 24 * 60, n)
+    datas = pd.Timestamp("2023-01-01") + pd.to_timedelta(minutos, unit="m")
+
+    valores = np.round(rng.normal(-80, 400, n), 2)
+    if decimal == ",":
+        br = str.maketrans(",.", ".,")
+        valores = [f"{v:,.2f}".translate(br) for v in valores]
+
+    return pd.DataFrame({
+        "Unnamed: 0": "",
+        "Data": datas.strftime("%d/%m/%Y %H:%M"),
+        "Categoria": np.array(CATEGORIAS)[rng.integers(0, len(CATEGORIAS), n)],
+        "Transação": np.array(TRANSACOES)[rng.integers(0, len(TRANSACOES), n)],
+        "Unnamed: 4": "",
+        "Unnamed: 5": "",
+        "Descrição": np.array(DESCRICOES)[rng.integers(0, len(DESCRICOES), n)],
+        "Unnamed: 7": "",
+        "Unnamed: 8": "",
+        "Unnamed: 9": "",
+        "Valor": valores,
+    })
+
+
+def gerar_em_partes(n, seed=0, parte=PARTE):
+    # Mesmo extrato em pedaços de `parte` linhas: 10M linhas sem 10M na memória
+    for i, inicio in enumerate(range(0, n, parte)):
+        yield gerar_extrato(min(parte, n - inicio), seed=seed * 1_000 + i)
+
+
+def salvar_extrato(df, path):
+    # As colunas "Unnamed: N" do extrato real são cabeçalhos vazios no arquivo.
+    # Aceita um DataFrame ou um iterável de partes (gerar_em_partes).
+    partes = [df] if isinstance(df, pd.DataFrame) else df
+    with open(path, "w", encoding="utf-8") as f:
+        for i, parte in enumerate(partes):
+            if i == 0:
+                cabecalho = ["" if c.startswith("Unnamed:") else c for c in parte.columns]
+                f.write(",".join(cabecalho) + "\n")
+            parte.to_csv(f, index=False, header=False)
+
+
+def extrato_em_cache(n, seed=0, diretorio=".cache/benchmarks"):
+    """
+    Caminho de um extrato sintético de `n` linhas, gerado só na primeira vez.
+    O mesmo (n, seed) dá sempre o mesmo arquivo.
+    """
+    os.makedirs(diretorio, exist_ok=True)
+    path = os.path.join(diretorio, f"extrato-{n}-{seed}.csv")
+    if not os.path.exists(path):
+        temporario = f"{path}.tmp"
+        salvar_extrato(gerar_em_partes(n, seed), temporario)
+        os.replace(temporario, path)
+    return path
@@ -0,0 +1,267 @@
+import argparse
+import contextlib
+import functools
+import glob
+import io
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import time
+from datetime import datetime
+
+import pandas as pd
+import psycopg2
+from benchmarks.sintetico import TAMANHOS, extrato_em_cache
+from src.analytics.aggregates import (build_aggregates, heatmap_mes_dia, media_mensal,
+                                      saldo_acumulado, saldo_mensal)
+from src.config.database import DB_CONFIG
+from src.etl.dimensoes import limpar_cache
+from src.etl.extract import extract
+from src.etl.load import load
+from src.etl.schema import garantir_schema
+from src.etl.transform import transform
+
+RESULTADOS_DIR = os.path.join(os.path.dirname(__file__), "resultados")
+SCHEMA_BENCH = os.getenv("BENCH_SCHEMA", "bench_etl")
+LIMITE_REGRESSAO = 0.10
+
+# Suíte de benchmarks do ETL e do dashboard sobre extratos sintéticos.
+#
+# Cada caso tem `preparar(n)` (uma vez por tamanho, fora do cronômetro),
+# `antes(n)` (a cada repetição, fora do cronômetro) e `executar(n)`, que é o
+# que se mede. Os resultados vão para benchmarks/resultados/ em JSON e cada
+# execução é comparada com a anterior da mesma máquina.
+#
+#   python -m benchmarks.suite                      # 10k e 1m, todos os casos
+#   python -m benchmarks.suite --tamanhos 10m --casos transform dashboard
+#
+# Os casos de load usam o PostgreSQL de DB_CONFIG, num schema à parte
+# (BENCH_SCHEMA) que é apagado no fim.
+
+
+def _silencioso(func, *args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func(*args, **kwargs)
+
+
+@functools.lru_cache(maxsize=1)
+def _bruto(n):
+    return _silencioso(extract, extrato_em_cache(n), cache=False)
+
+
+@functools.lru_cache(maxsize=1)
+def _transformado(n):
+    return _silencioso(transform, _bruto(n))
+
+
+class Caso:
+    nome = None
+
+    def preparar(self, n):
+        pass
+
+    def antes(self, n):
+        pass
+
+    def executar(self, n):
+        raise NotImplementedError
+
+    def finalizar(self):
+        pass
+
+
+class Extract(Caso):
+    nome = "extract"
+
+    def preparar(self, n):
+        self.path = extrato_em_cache(n)
+
+    def executar(self, n):
+        _silencioso(extract, self.path, cache=False)
+
+
+class Transform(Caso):
+    nome = "transform"
+
+    def preparar(self, n):
+        self.bruto = _bruto(n)
+
+    def executar(self, n):
+        _silencioso(transform, self.bruto)
+
+
+class Load(Caso):
+    def __init__(self, mode):
+        self.mode = mode
+        self.nome = f"load_{mode}"
+        self.conn = None
+
+    def preparar(self, n):
+        self.df = _transformado(n)
+        if self.conn is None:
+            self.conn = psycopg2.connect(**DB_CONFIG, options=f"-c search_path={SCHEMA_BENCH}")
+            with self.conn.cursor() as cur:
+                cur.execute(f"CREATE SCHEMA IF NOT EXISTS {SCHEMA_BENCH}")
+                garantir_schema(cur)
+            self.conn.commit()
+
+    def antes(self, n):
+        # Cada repetição parte de tabelas vazias
+        with self.conn.cursor() as cur:
+            cur.execute("TRUNCATE tb_transacoes, tb_resumo_mensal, tb_marcas_carga")
+        self.conn.commit()
+
+    def executar(self, n):
+        _silencioso(load, self.df, mode=self.mode, conn=self.conn)
+
+    def finalizar(self):
+        if self.conn is not None:
+            with self.conn.cursor() as cur:
+                cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA_BENCH} CASCADE")
+            self.conn.commit()
+            limpar_cache(self.conn)
+            self.conn.close()
+            self.conn = None
+
+
+class Dashboard(Caso):
+    nome = "dashboard"
+
+    def preparar(self, n):
+        self.df = _transformado(n)
+
+    def executar(self, n):
+        # O que o dashboard calcula ao abrir: agregados e as séries derivadas
+        agregados = build_aggregates(self.df)
+        saldo_acumulado(agregados)
+        saldo_mensal(agregados)
+        heatmap_mes_dia(agregados)
+        media_mensal(agregados, "entrada")
+        media_mensal(agregados, "saida")
+
+
+def casos_disponiveis():
+    casos = [Extract(), Transform(), Load("copy"), Load("incremental"), Dashboard()]
+    return {caso.nome: caso for caso in casos}
+
+
+def medir(caso, n, repeticoes):
+    caso.preparar(n)
+    tempos = []
+    for _ in range(repeticoes):
+        caso.antes(n)
+        inicio = time.perf_counter()
+        caso.executar(n)
+        tempos.append(time.perf_counter() - inicio)
+    return {
+        "caso": caso.nome,
+        "linhas": n,
+        "repeticoes": repeticoes,
+        "melhor_s": min(tempos),
+        "mediana_s": statistics.median(tempos),
+        "linhas_s": n / min(tempos),
+    }
+
+
+def ambiente():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"],
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "maquina": f"{socket.gethostname()}/{os.cpu_count()}cpu",
+        "commit": commit,
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "data": datetime.now().isoformat(timespec="seconds"),
+    }
+
+
+def salvar(registro, diretorio=RESULTADOS_DIR):
+    os.makedirs(diretorio, exist_ok=True)
+    nome = f"{datetime.now():%Y%m%d-%H%M%S}-{registro['ambiente']['commit'] or 'local'}.json"
+    path = os.path.join(diretorio, nome)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(registro, f, ensure_ascii=False, indent=2)
+    return path
+
+
+def anterior(maquina, diretorio=RESULTADOS_DIR):
+    # Resultado mais recente da mesma máquina: tempos de máquinas diferentes não se comparam
+    for path in sorted(glob.glob(os.path.join(diretorio, "*.json")), reverse=True):
+        with open(path, encoding="utf-8") as f:
+            registro = json.load(f)
+        if registro["ambiente"]["maquina"] == maquina:
+            return path, registro
+    return None, None
+
+
+def comparar(atual, base, limite=LIMITE_REGRESSAO):
+    referencia = {(r["caso"], r["linhas"]): r["melhor_s"] for r in base["resultados"]}
+    regressoes = []
+    for r in atual["resultados"]:
+        antes = referencia.get((r["caso"], r["linhas"]))
+        if antes is None:
+            continue
+        variacao = r["melhor_s"] / antes - 1
+        r["variacao"] = variacao
+        if variacao > limite:
+            regressoes.append(r)
+    return regressoes
+
+
+def imprimir(registro):
+    print(f"\n🏁 {registro['ambiente']['maquina']} @ {registro['ambiente']['commit']}")
+    for r in registro["resultados"]:
+        linha = (f"  {r['caso']:<18} {r['linhas']:>12,} linhas  {r['melhor_s']:9.3f}s  "
+                 f"{r['linhas_s']:14,.0f} linhas/s")
+        if "variacao" in r:
+            linha += f"  {r['variacao']:+7.1%}"
+        print(linha)
+
+
+def main():
+    casos = casos_disponiveis()
+    parser = argparse.ArgumentParser(description="Benchmarks do ETL e do dashboard")
+    parser.add_argument("--tamanhos", nargs="+", choices=TAMANHOS, default=["10k", "1m"])
+    parser.add_argument("--casos", nargs="+", choices=casos, default=list(casos))
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--nao-salvar", action="store_true", help="não grava o resultado")
+    parser.add_argument("--limite", type=float, default=LIMITE_REGRESSAO,
+                        help="fração de lentidão a partir da qual um caso conta como regressão")
+    parser.add_argument("--falhar", action="store_true",
+                        help="sai com código 1 se houver regressão (para CI)")
+    args = parser.parse_args()
+
+    resultados = []
+    try:
+        for tamanho in args.tamanhos:
+            n = TAMANHOS[tamanho]
+            for nome in args.casos:
+                print(f"⏱️ {nome} com {n:,} linhas...")
+                resultados.append(medir(casos[nome], n, args.repeticoes))
+    finally:
+        for caso in casos.values():
+            caso.finalizar()
+
+    registro = {"ambiente": ambiente(), "resultados": resultados}
+    path_base, base = anterior(registro["ambiente"]["maquina"])
+    regressoes = comparar(registro, base, args.limite) if base else []
+    imprimir(registro)
+    if base:
+        print(f"  (variação contra {os.path.basename(path_base)})")
+    if not args.nao_salvar:
+        print(f"📝 Resultado salvo em {salvar(registro)}")
+
+    for r in regressoes:
+        print(f"⚠️ Regressão: {r['caso']} com {r['linhas']:,} linhas ficou {r['variacao']:.0%} mais lento")
+    if regressoes and args.falhar:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
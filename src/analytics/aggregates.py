@@ -0,0 +1,290 @@
+import hashlib
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+DIAS_ORDEM = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+MESES = ['Jan', 'Fev', 'Mar', 'Abr', 'Mai', 'Jun', 'Jul', 'Ago', 'Set', 'Out', 'Nov', 'Dez']
+COLUNAS_RECENTES = ['Data', 'Tipo', 'Categoria', 'Descrição', 'Valor']
+
+
+@dataclass
+class Agregados:
+    """
+    Tabelas compactas que alimentam o dashboard, montadas uma vez a partir
+    das transações:
+
+    diario      índice Dia; entrada, saida, qtd_entrada, qtd_saida
+                (+ saldo_acumulado quando vem do banco)
+    mensal      índice (Ano, Mês); mesmas colunas, somadas do diário
+    categorias  índice Categoria; mesmas colunas
+    dia_semana  gasto (saída) por dia da semana, na ordem de DIAS_ORDEM
+    recentes    as 10 transações mais recentes
+    maior_gasto a maior saída (linha) ou None
+    """
+    diario: pd.DataFrame
+    mensal: pd.DataFrame
+    categorias: pd.DataFrame
+    dia_semana: pd.Series
+    recentes: pd.DataFrame
+    maior_gasto: pd.Series | None
+
+    @property
+    def vazio(self):
+        return self.diario.empty
+
+    @property
+    def total_receita(self):
+        return float(self.mensal['entrada'].sum())
+
+    @property
+    def total_despesa(self):
+        return float(self.mensal['saida'].sum())
+
+    @property
+    def fingerprint(self):
+        # Hash do conteúdo do diário e das categorias (de onde saem mensal,
+        # dia da semana e heatmap): muda com transação nova, recategorização
+        # ou data alterada. Barata, são só tabelas compactas; serve de chave
+        # para o que o dashboard deriva daqui
+        if self.vazio:
+            return None
+        return hash_conteudo(self.diario, self.categorias)
+
+
+def hash_conteudo(*tabelas):
+    # Índice, valores e nomes das colunas de cada tabela
+    h = hashlib.sha1()
+    for tabela in tabelas:
+        h.update(pd.util.hash_pandas_object(tabela, index=True).to_numpy().tobytes())
+        h.update(repr(list(tabela.columns)).encode('utf-8'))
+    return h.hexdigest()
+
+
+# Datas viram códigos inteiros: o dia é o número de dias desde 1970-01-01, e
+# ano, mês, dia do mês e dia da semana saem dele com aritmética de numpy. As
+# somas por dia, mês ou dia da semana são np.bincount sobre esses códigos,
+# num vetor denso, sem groupby nem strings de nome de mês.
+
+
+SEM_DIA = np.iinfo('int64').min  # código de NaT
+
+
+def codigos_dia(datas):
+    # Dias desde 1970-01-01 (int64); NaT vira SEM_DIA. Divisão inteira sobre
+    # os valores crus, bem mais barata que astype('datetime64[D]')
+    valores = pd.DatetimeIndex(datas).to_numpy()
+    unidade, _ = np.datetime_data(valores.dtype)
+    por_dia = np.timedelta64(1, 'D') // np.timedelta64(1, unidade)
+    dias = valores.view('int64') // por_dia
+    nulos = np.isnat(valores)
+    if nulos.any():
+        dias[nulos] = SEM_DIA
+    return dias
+
+
+def decompor_dias(dias):
+    # (ano, mês 1-12, dia do mês 1-31, dia da semana 0=segunda) de cada código
+    dias = np.asarray(dias, dtype='int64').astype('datetime64[D]')
+    meses = dias.astype('datetime64[M]')
+    ano = meses.astype('datetime64[Y]').astype('int64') + 1970
+    mes = meses.astype('int64') % 12 + 1
+    dia = (dias - meses.astype('datetime64[D]')).astype('int64') + 1
+    # 1970-01-01 foi uma quinta (3)
+    dia_semana = (dias.astype('int64') + 3) % 7
+    return ano, mes, dia, dia_semana
+
+
+def _somar_por_dia(dias, entrada, saida, eh_saida, unidade='ns'):
+    # Tabela diária (só os dias com transação) por bincount sobre o código do
+    # dia. A contagem vem de `eh_saida` (Tipo), não do valor: saída de R$ 0 é saída
+    validos = dias != SEM_DIA
+    if not validos.all():
+        dias, entrada, saida, eh_saida = dias[validos], entrada[validos], saida[validos], eh_saida[validos]
+    colunas = ['entrada', 'saida', 'qtd_entrada', 'qtd_saida']
+    if not len(dias):
+        return pd.DataFrame({c: pd.Series(dtype='int64' if c.startswith('qtd_') else 'float64')
+                             for c in colunas}, index=pd.DatetimeIndex([], name='Dia').as_unit(unidade))
+
+    primeiro = dias.min()
+    posicao = dias - primeiro
+    tamanho = int(posicao.max()) + 1
+    qtd = np.bincount(posicao, minlength=tamanho)
+    qtd_saida = np.bincount(posicao[eh_saida], minlength=tamanho)
+    presentes = np.flatnonzero(qtd)
+    indice = pd.DatetimeIndex((primeiro + presentes).astype('datetime64[D]'), name='Dia').as_unit(unidade)
+    return pd.DataFrame({
+        'entrada': np.bincount(posicao, weights=entrada, minlength=tamanho)[presentes],
+        'saida': np.bincount(posicao, weights=saida, minlength=tamanho)[presentes],
+        'qtd_entrada': (qtd - qtd_saida)[presentes],
+        'qtd_saida': qtd_saida[presentes],
+    }, index=indice)
+
+
+def build_aggregates(df):
+    datas = pd.to_datetime(df['Data'])
+    # O extrato traz saídas negativas; no banco o valor é absoluto e o sinal vem do Tipo
+    valor = df['Valor'].abs().to_numpy(dtype='float64')
+    saida = (df['Tipo'] == 'saida').to_numpy()
+    entradas = np.where(saida, 0.0, valor)
+    saidas = np.where(saida, valor, 0.0)
+
+    diario = _somar_por_dia(codigos_dia(datas), entradas, saidas, saida, unidade=datas.dt.unit)
+
+    base = pd.DataFrame({
+        'Categoria': df['Categoria'].to_numpy(),
+        'entrada': entradas,
+        'saida': saidas,
+        'qtd_entrada': (~saida).astype('int64'),
+        'qtd_saida': saida.astype('int64'),
+    })
+    colunas = ['entrada', 'saida', 'qtd_entrada', 'qtd_saida']
+    categorias = base.groupby('Categoria', observed=True)[colunas].sum()
+    categorias.index = categorias.index.astype(str)
+
+    posicoes = datas.reset_index(drop=True).nlargest(10).index
+    recentes = df.iloc[posicoes][COLUNAS_RECENTES].copy()
+    recentes['Data'] = pd.to_datetime(recentes['Data'])
+    recentes['Valor'] = recentes['Valor'].abs()
+
+    maior_gasto = None
+    if saida.any():
+        pos = np.flatnonzero(saida)[np.argmax(valor[saida])]
+        maior_gasto = df.iloc[pos][COLUNAS_RECENTES].copy()
+        maior_gasto['Data'] = pd.Timestamp(maior_gasto['Data'])
+        maior_gasto['Valor'] = abs(maior_gasto['Valor'])
+
+    return Agregados(
+        diario=diario,
+        mensal=mensal_do_diario(diario),
+        categorias=categorias,
+        dia_semana=dia_semana_do_diario(diario),
+        recentes=recentes,
+        maior_gasto=maior_gasto,
+    )
+
+
+def mensal_do_diario(diario):
+    colunas = ['entrada', 'saida', 'qtd_entrada', 'qtd_saida']
+    mensal = diario[colunas].groupby([diario.index.year, diario.index.month]).sum()
+    mensal.index.names = ['Ano', 'Mês']
+    return mensal
+
+
+def dia_semana_do_diario(diario):
+    _, _, _, dia_semana = decompor_dias(codigos_dia(diario.index))
+    gastos = np.bincount(dia_semana, weights=diario['saida'].to_numpy(dtype='float64'), minlength=7)
+    return pd.Series(gastos, index=DIAS_ORDEM, name='saida')
+
+
+def media_mensal(agregados, tipo):
+    # Média só sobre os meses que tiveram movimento daquele tipo
+    mensal = agregados.mensal
+    return mensal.loc[mensal[f'qtd_{tipo}'] > 0, tipo].mean()
+
+
+def saldo_acumulado(agregados):
+    # Vindo do banco, o saldo já chega calculado por window function
+    if 'saldo_acumulado' in agregados.diario:
+        return agregados.diario['saldo_acumulado']
+    return (agregados.diario['entrada'] - agregados.diario['saida']).cumsum()
+
+
+def saldo_mensal(agregados):
+    mensal = agregados.mensal
+    datas = pd.to_datetime({'year': mensal.index.get_level_values('Ano'),
+                            'month': mensal.index.get_level_values('Mês'),
+                            'day': 1})
+    return pd.DataFrame({
+        'Data_Ref': datas.to_numpy(),
+        'entrada': mensal['entrada'].to_numpy(),
+        'saida': mensal['saida'].to_numpy(),
+        'Saldo_Mensal': (mensal['entrada'] - mensal['saida']).cumsum().to_numpy(),
+    })
+
+
+def anos_com_gastos(agregados):
+    # Anos com alguma saída, do mais recente para o mais antigo
+    diario = agregados.diario
+    anos = diario.index[diario['qtd_saida'] > 0].year
+    return sorted(set(anos.tolist()), reverse=True)
+
+
+def heatmap_mes_dia(agregados, ano=None):
+    """
+    Gastos de `ano` (padrão: o mais recente com saídas) por mês x dia do
+    mês, 12 x 31 somado com bincount. Só os meses com saída entram; dias
+    sem gasto (ou que não existem no mês) ficam 0.
+    """
+    diario = agregados.diario
+    if ano is None:
+        anos = anos_com_gastos(agregados)
+        if not anos:
+            return pd.DataFrame(columns=range(1, 32), dtype='float64')
+        ano = anos[0]
+
+    anos_dia, mes, dia, _ = decompor_dias(codigos_dia(diario.index))
+    do_ano = (anos_dia == ano) & (diario['qtd_saida'].to_numpy() > 0)
+    celula = (mes[do_ano] - 1) * 31 + (dia[do_ano] - 1)
+    gastos = np.bincount(celula, weights=diario['saida'].to_numpy(dtype='float64')[do_ano],
+                         minlength=12 * 31).reshape(12, 31)
+    meses = np.unique(mes[do_ano]) - 1
+    return pd.DataFrame(gastos[meses], index=[MESES[m] for m in meses], columns=range(1, 32))
+
+
+def aplicar_transacao(agregados, transacao):
+    """
+    Devolve uma cópia de `agregados` com uma transação nova somada, sem
+    voltar ao histórico. `transacao` é um dict com Data, Tipo, Categoria,
+    Descrição e Valor (positivo).
+    """
+    data = pd.Timestamp(transacao['Data'])
+    tipo = transacao['Tipo']
+    valor = abs(float(transacao['Valor']))
+    delta = {tipo: valor, f'qtd_{tipo}': 1}
+
+    dia = data.normalize()
+    diario = _somar_linha(agregados.diario, dia, delta)
+    if 'saldo_acumulado' in diario:
+        if dia not in agregados.diario.index:
+            # Dia novo herda o saldo do dia anterior
+            anteriores = agregados.diario.loc[agregados.diario.index < dia, 'saldo_acumulado']
+            diario.loc[dia, 'saldo_acumulado'] = anteriores.iloc[-1] if len(anteriores) else 0.0
+        sinal = valor if tipo == 'entrada' else -valor
+        diario.loc[diario.index >= dia, 'saldo_acumulado'] += sinal
+
+    dia_semana = agregados.dia_semana.copy()
+    if tipo == 'saida':
+        dia_semana.iloc[data.dayofweek] += valor
+
+    linha = pd.DataFrame([{c: transacao.get(c) for c in COLUNAS_RECENTES}])
+    linha['Data'] = data
+    linha['Valor'] = valor
+    recentes = pd.concat([agregados.recentes, linha], ignore_index=True)
+    recentes = recentes.loc[recentes['Data'].nlargest(10).index].reset_index(drop=True)
+
+    maior_gasto = agregados.maior_gasto
+    if tipo == 'saida' and (maior_gasto is None or valor > maior_gasto['Valor']):
+        maior_gasto = linha.iloc[0].copy()
+
+    return Agregados(
+        diario=diario,
+        mensal=_somar_linha(agregados.mensal, (data.year, data.month), delta),
+        categorias=_somar_linha(agregados.categorias, str(transacao['Categoria']), delta),
+        dia_semana=dia_semana,
+        recentes=recentes,
+        maior_gasto=maior_gasto,
+    )
+
+
+def _somar_linha(tabela, chave, delta):
+    tabela = tabela.copy()
+    if chave not in tabela.index:
+        tabela.loc[chave, :] = 0
+        tabela = tabela.sort_index().astype(tabela.dtypes.to_dict() | {
+            c: 'int64' for c in tabela.columns if c.startswith('qtd_')
+        })
+    for coluna, valor in delta.items():
+        tabela.loc[chave, coluna] += valor
+    return tabela
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+
+# Redução de séries temporais para os gráficos: o navegador recebe no máximo
+# MAX_PONTOS pontos, qualquer que seja o tamanho do histórico, sem perder o
+# desenho da curva (picos e vales continuam lá).
+
+MAX_PONTOS = 1500
+
+# Regra de reamostragem do pandas por granularidade; None mantém a série
+GRANULARIDADES = {"Diário": None, "Semanal": "W", "Mensal": "ME"}
+
+
+def reamostrar(serie, granularidade):
+    # Nível (saldo) ao fim de cada período: o último valor, não a soma
+    regra = GRANULARIDADES[granularidade]
+    if regra is None:
+        return serie
+    return serie.resample(regra).last().dropna()
+
+
+def lttb(x, y, n):
+    """
+    Largest-Triangle-Three-Buckets: escolhe `n` posições de (x, y) que
+    preservam a forma da curva. Mantém o primeiro e o último ponto e, em
+    cada balde do meio, o ponto que forma o maior triângulo com o escolhido
+    no balde anterior e a média do balde seguinte. Devolve os índices.
+    """
+    tamanho = len(x)
+    if n >= tamanho or n < 3:
+        return np.arange(tamanho)
+
+    x = np.asarray(x, dtype="float64")
+    y = np.asarray(y, dtype="float64")
+    # n - 2 baldes entre o primeiro e o último ponto; o "próximo" do último
+    # balde é o ponto final
+    limites = np.append(np.linspace(1, tamanho - 1, n - 1).astype(np.int64), tamanho)
+
+    escolhidos = np.empty(n, dtype=np.int64)
+    escolhidos[0], escolhidos[-1] = 0, tamanho - 1
+    anterior = 0
+    for i in range(n - 2):
+        inicio, fim = limites[i], limites[i + 1]
+        media_x = x[fim:limites[i + 2]].mean()
+        media_y = y[fim:limites[i + 2]].mean()
+        areas = np.abs((x[anterior] - media_x) * (y[inicio:fim] - y[anterior])
+                       - (x[anterior] - x[inicio:fim]) * (media_y - y[anterior]))
+        anterior = inicio + int(areas.argmax())
+        escolhidos[i + 1] = anterior
+    return escolhidos
+
+
+def reduzir(serie, max_pontos=MAX_PONTOS):
+    # Série com índice de datas -> no máximo `max_pontos` pontos via LTTB
+    if len(serie) <= max_pontos:
+        return serie
+    segundos = serie.index.to_numpy(dtype="datetime64[s]").astype("int64")
+    return serie.iloc[lttb(segundos, serie.to_numpy(), max_pontos)]
+
+
+def janela(serie, inicio=None, fim=None):
+    # Recorte por datas em índice ordenado (busca binária, sem máscara)
+    inicio = pd.Timestamp(inicio) if inicio is not None else None
+    fim = pd.Timestamp(fim) if fim is not None else None
+    return serie.loc[inicio:fim]
@@ -0,0 +1,239 @@
+import argparse
+import json
+import os
+import uuid
+from dataclasses import dataclass, field, replace
+
+import numpy as np
+import pandas as pd
+from src.config.contas import CONTA_PADRAO
+
+COLUNAS = ['entrada', 'saida', 'qtd_entrada', 'qtd_saida']
+# Muda quando o formato do arquivo muda (estados antigos são remontados)
+VERSAO = 1
+
+# Estado incremental dos KPIs (totais, médias mensais, taxa de poupança e
+# saldo por conta), gravado ao lado dos dados. Um lote novo só soma as
+# próprias linhas; o histórico não é relido. Os valores ficam em centavos
+# inteiros: a soma independe da ordem, e absorver lote a lote dá exatamente
+# o mesmo estado que montar tudo de uma vez (tests/test_kpis.py confere isso).
+
+
+@dataclass(frozen=True)
+class EstadoKPI:
+    """
+    mensal       índice (Conta, Ano, Mês); entrada, saida, qtd_entrada,
+                 qtd_saida, com valores em centavos
+    saldos       índice Conta; saldo (centavos) e ultima_data: o ponto de
+                 controle do saldo de cada conta
+    fingerprint  da origem quando o estado foi gravado (None = desconhecida)
+    lotes        lotes já absorvidos, para não somar o mesmo lote duas vezes
+    """
+    mensal: pd.DataFrame
+    saldos: pd.DataFrame
+    fingerprint: tuple | None = None
+    lotes: frozenset = field(default_factory=frozenset)
+
+
+def estado_vazio():
+    indice = pd.MultiIndex.from_arrays([[], [], []], names=['Conta', 'Ano', 'Mês'])
+    mensal = pd.DataFrame({c: pd.Series(dtype='int64') for c in COLUNAS}, index=indice)
+    saldos = pd.DataFrame({'saldo': pd.Series(dtype='int64'),
+                           'ultima_data': pd.Series(dtype='datetime64[ns]')},
+                          index=pd.Index([], name='Conta', dtype=object))
+    return EstadoKPI(mensal, saldos)
+
+
+def _base(df):
+    # Uma linha por transação, em centavos; sem coluna Conta (CSV do app),
+    # tudo cai na conta padrão
+    datas = pd.to_datetime(df['Data'])
+    centavos = np.rint(np.abs(df['Valor'].to_numpy(dtype='float64')) * 100).astype('int64')
+    saida = (df['Tipo'] == 'saida').to_numpy()
+    contas = df['Conta'].astype(str).to_numpy() if 'Conta' in df else np.full(len(df), CONTA_PADRAO, dtype=object)
+    return pd.DataFrame({
+        'Conta': contas,
+        'Ano': datas.dt.year.to_numpy(),
+        'Mês': datas.dt.month.to_numpy(),
+        'Data': datas.to_numpy(),
+        'entrada': np.where(saida, 0, centavos),
+        'saida': np.where(saida, centavos, 0),
+        'qtd_entrada': (~saida).astype('int64'),
+        'qtd_saida': saida.astype('int64'),
+    })
+
+
+def absorver(estado, df, lote=None):
+    """
+    Devolve um novo estado com as transações de `df` (Data, Tipo, Valor e,
+    se houver, Conta) somadas. O custo é o do lote mais o número de meses
+    do estado, nunca o do histórico. Com `lote`, um lote já absorvido
+    levanta ValueError em vez de ser contado de novo.
+    """
+    if lote is not None and lote in estado.lotes:
+        raise ValueError(f"Lote {lote!r} já absorvido")
+    lotes = estado.lotes | {lote} if lote is not None else estado.lotes
+    if df.empty:
+        return replace(estado, lotes=lotes)
+
+    base = _base(df)
+    novo = base.groupby(['Conta', 'Ano', 'Mês'])[COLUNAS].sum()
+    mensal = estado.mensal.add(novo, fill_value=0).astype('int64').sort_index()
+
+    por_conta = base.assign(liquido=base['entrada'] - base['saida']).groupby('Conta').agg(
+        saldo=('liquido', 'sum'), ultima_data=('Data', 'max'))
+    saldos = pd.concat([estado.saldos, por_conta]).groupby(level=0).agg(
+        {'saldo': 'sum', 'ultima_data': 'max'})
+    saldos = saldos.astype({'saldo': 'int64', 'ultima_data': 'datetime64[ns]'}).rename_axis('Conta')
+
+    return EstadoKPI(mensal, saldos, estado.fingerprint, lotes)
+
+
+def montar_estado(df, fingerprint=None):
+    return replace(absorver(estado_vazio(), df), fingerprint=fingerprint)
+
+
+def kpis(estado):
+    # Os números dos cartões do dashboard, em reais
+    mensal = estado.mensal.groupby(level=['Ano', 'Mês']).sum()
+    total_receita = mensal['entrada'].sum() / 100
+    total_despesa = mensal['saida'].sum() / 100
+    saldo = total_receita - total_despesa
+    taxa_poupanca = (saldo / total_receita * 100) if total_receita > 0 else 0
+    return {
+        'total_receita': float(total_receita),
+        'total_despesa': float(total_despesa),
+        'saldo': float(saldo),
+        'taxa_poupanca': float(taxa_poupanca),
+        # Média só sobre os meses que tiveram movimento daquele tipo
+        'media_mensal_entrada': float(mensal.loc[mensal['qtd_entrada'] > 0, 'entrada'].mean() / 100),
+        'media_mensal_saida': float(mensal.loc[mensal['qtd_saida'] > 0, 'saida'].mean() / 100),
+        'saldo_por_conta': {conta: saldo / 100 for conta, saldo in estado.saldos['saldo'].items()},
+    }
+
+
+def saldo_mensal(estado):
+    # Mesmo formato de aggregates.saldo_mensal, a partir dos totais do estado
+    mensal = estado.mensal.groupby(level=['Ano', 'Mês']).sum()
+    datas = pd.to_datetime({'year': mensal.index.get_level_values('Ano'),
+                            'month': mensal.index.get_level_values('Mês'),
+                            'day': 1})
+    return pd.DataFrame({
+        'Data_Ref': datas.to_numpy(),
+        'entrada': mensal['entrada'].to_numpy() / 100,
+        'saida': mensal['saida'].to_numpy() / 100,
+        'Saldo_Mensal': (mensal['entrada'] - mensal['saida']).cumsum().to_numpy() / 100,
+    })
+
+
+def saldos_mensais(estado):
+    # Ponto de controle por conta no fim de cada mês (reais)
+    liquido = estado.mensal['entrada'] - estado.mensal['saida']
+    return (liquido.groupby(level='Conta').cumsum() / 100).rename('saldo')
+
+
+# ----------- Persistência ----------- #
+
+def caminho_estado(origem):
+    # Ao lado dos dados: financas.csv -> financas.kpis.json; num diretório
+    # Parquet, _kpis.json (o pyarrow ignora arquivos com "_" na descoberta)
+    if os.path.isdir(origem):
+        return os.path.join(origem, "_kpis.json")
+    return f"{os.path.splitext(origem)[0]}.kpis.json"
+
+
+def salvar_estado(estado, path):
+    conteudo = {
+        'versao': VERSAO,
+        'fingerprint': list(estado.fingerprint) if estado.fingerprint is not None else None,
+        'lotes': sorted(estado.lotes),
+        'mensal': estado.mensal.reset_index().values.tolist(),
+        'saldos': [[conta, int(linha.saldo), linha.ultima_data.isoformat()]
+                   for conta, linha in estado.saldos.iterrows()],
+    }
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temporario = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump(conteudo, f, ensure_ascii=False, default=int)
+    os.replace(temporario, path)
+
+
+def ler_estado(path):
+    # None se não existe, não abre ou é de outra versão
+    try:
+        with open(path, encoding="utf-8") as f:
+            conteudo = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if conteudo.get('versao') != VERSAO:
+        return None
+
+    vazio = estado_vazio()
+    mensal = vazio.mensal
+    if conteudo['mensal']:
+        mensal = (pd.DataFrame(conteudo['mensal'], columns=['Conta', 'Ano', 'Mês'] + COLUNAS)
+                  .set_index(['Conta', 'Ano', 'Mês']).astype('int64'))
+    saldos = vazio.saldos
+    if conteudo['saldos']:
+        saldos = pd.DataFrame(conteudo['saldos'], columns=['Conta', 'saldo', 'ultima_data']).set_index('Conta')
+        saldos = saldos.astype({'saldo': 'int64', 'ultima_data': 'datetime64[ns]'})
+    fingerprint = tuple(conteudo['fingerprint']) if conteudo['fingerprint'] is not None else None
+    return EstadoKPI(mensal, saldos, fingerprint, frozenset(conteudo['lotes']))
+
+
+def atualizar_estado(path, df, antes, depois, lote=None):
+    """
+    Soma `df` ao estado gravado em `path` se ele corresponde à origem de
+    antes da gravação (`antes`) e grava com a fingerprint `depois`. Estado
+    ausente, defasado ou lote repetido: não mexe, e a próxima leitura com
+    `estado_atualizado` remonta.
+    """
+    estado = ler_estado(path)
+    antes = tuple(antes or ())
+    if estado is None and (not antes or antes[-1] == 0):
+        # Origem vazia antes desta gravação (as duas fingerprints terminam
+        # no total de bytes): o estado começa do zero
+        estado = replace(estado_vazio(), fingerprint=antes)
+    if estado is None or estado.fingerprint != antes or (lote is not None and lote in estado.lotes):
+        return None
+    estado = replace(absorver(estado, df, lote), fingerprint=tuple(depois))
+    salvar_estado(estado, path)
+    return estado
+
+
+def estado_atualizado(path, fingerprint, ler_origem):
+    # Estado gravado se ainda bate com a origem; senão remonta (lendo tudo
+    # uma vez com `ler_origem()`) e grava
+    estado = ler_estado(path)
+    if estado is not None and estado.fingerprint == tuple(fingerprint):
+        return estado
+    estado = montar_estado(ler_origem(), tuple(fingerprint))
+    salvar_estado(estado, path)
+    return estado
+
+
+def main():
+    parser = argparse.ArgumentParser(description="KPIs incrementais de um CSV do app ou diretório Parquet")
+    parser.add_argument("origem", help="financas.csv ou diretório Parquet particionado")
+    args = parser.parse_args()
+
+    if os.path.isdir(args.origem):
+        from src.storage.parquet import fingerprint_dataset, ler_particionado
+        fingerprint = fingerprint_dataset(args.origem)
+        ler = lambda: ler_particionado(args.origem)
+    else:
+        info = os.stat(args.origem)
+        fingerprint = (info.st_mtime_ns, info.st_size)
+        ler = lambda: pd.read_csv(args.origem, parse_dates=["Data"])
+
+    estado = estado_atualizado(caminho_estado(args.origem), fingerprint, ler)
+    for chave, valor in kpis(estado).items():
+        if isinstance(valor, dict):
+            for conta, saldo in valor.items():
+                print(f"  saldo {conta}: R$ {saldo:,.2f}")
+        else:
+            print(f"  {chave}: {valor:,.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+import json
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Regras opcionais de categorização pela descrição, em ordem de prioridade (a
+# primeira que casa vence). "palavras" são trechos literais; "regex" é uma
+# expressão regular. Ambos valem sobre a descrição normalizada (minúsculas,
+# sem acento e sem números), ex.:
+# [{"categoria": "Alimentação", "palavras": ["ifood", "padaria"]},
+#  {"categoria": "Transporte", "regex": "\\buber\\b|\\btaxi\\b"}]
+REGRAS_CATEGORIAS = os.getenv("REGRAS_CATEGORIAS", "regras_categorias.json")
+
+
+def carregar_regras(path=REGRAS_CATEGORIAS):
+    if not path or not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
@@ -0,0 +1,19 @@
+import json
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Conta usada quando não há como identificar a origem do extrato
+CONTA_PADRAO = os.getenv("CONTA_PADRAO", "Conta BTG Pactual")
+
+# Mapeamento opcional {padrão glob do nome do arquivo: nome da conta}, ex.:
+# {"Extrato_*_03379339105.csv": "Conta BTG Pactual", "nubank_*.csv": "Nubank"}
+CONTAS_CONFIG = os.getenv("CONTAS_CONFIG", "contas.json")
+
+
+def carregar_contas(path=CONTAS_CONFIG):
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
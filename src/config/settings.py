@@ -0,0 +1,7 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# 0 = só mensagens de etapa, 1 = + diagnósticos, 2 = + dump dos DataFrames
+VERBOSE = int(os.getenv("ETL_VERBOSE", "0"))
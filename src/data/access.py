@@ -0,0 +1,148 @@
+import os
+
+import pandas as pd
+import streamlit as st
+from src.analytics.aggregates import aplicar_transacao, build_aggregates
+from src.analytics.kpis import atualizar_estado, caminho_estado, estado_atualizado
+from src.data.db import consultar
+from src.data.exportacao import exportacao_em_cache
+from src.data.filtros import SEM_FILTROS, filtrar_frame, ordenar_por_data
+from src.data.queries import agregados_db, contas_db
+from src.data.writes import anexar_csv, inserir_transacao_db
+
+FINANCAS_CSV = "financas.csv"
+
+# Camada de acesso a dados do dashboard. Toda leitura passa por st.cache_data
+# com uma impressão digital da origem como parte da chave: arquivo alterado ou
+# transação nova no banco geram uma chave nova e a leitura é refeita só então.
+# Com filtros (src.data.filtros) eles também entram na chave e são empurrados
+# para a origem; os agregados "vivos" valem só para a visão sem filtro.
+
+
+def fingerprint_arquivo(path):
+    # (mtime, tamanho) muda a cada gravação sem precisar ler o arquivo
+    try:
+        info = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (info.st_mtime_ns, info.st_size)
+
+
+def fingerprint_db():
+    # MAX(id) pega inserções (índice da PK), e a soma de qtd no resumo mensal
+    # pega exclusões sem contar a tabela de transações inteira. O app lê uma
+    # vez por rerun e repassa para as funções abaixo
+    linhas, _ = consultar("""
+        SELECT (SELECT COALESCE(MAX(id), 0) FROM tb_transacoes),
+               (SELECT COALESCE(SUM(qtd), 0) FROM tb_resumo_mensal)
+    """)
+    return tuple(linhas[0])
+
+
+@st.cache_data(show_spinner=False)
+def _agregados_db(fingerprint, filtros=SEM_FILTROS):
+    return agregados_db(filtros)
+
+
+@st.cache_data(show_spinner=False)
+def _contas_db(fingerprint):
+    return contas_db()
+
+
+@st.cache_data(show_spinner="Carregando transações...")
+def _ler_csv(path, fingerprint):
+    # Ordenado por data uma vez aqui: os recortes de período viram busca binária
+    return ordenar_por_data(pd.read_csv(path, parse_dates=["Data"]))
+
+
+@st.cache_data(show_spinner=False)
+def _agregados_csv(path, fingerprint, filtros=SEM_FILTROS):
+    return build_aggregates(filtrar_frame(_ler_csv(path, fingerprint), filtros))
+
+
+@st.cache_resource
+def _agregados_vivos():
+    # {origem: (fingerprint, Agregados)} compartilhado entre as sessões. Ao
+    # gravar uma transação o delta é aplicado aqui e a fingerprint avança
+    # junto, então a próxima leitura não precisa refazer nada.
+    return {}
+
+
+def _agregados_atualizados(origem, fingerprint, montar):
+    vivos = _agregados_vivos()
+    atual = vivos.get(origem)
+    if atual is not None and atual[0] == fingerprint:
+        return atual[1]
+    agregados = montar()
+    vivos[origem] = (fingerprint, agregados)
+    return agregados
+
+
+def _aplicar_nos_vivos(origem, antes, depois, transacao):
+    vivos = _agregados_vivos()
+    atual = vivos.get(origem)
+    if atual is not None and atual[0] == antes:
+        vivos[origem] = (depois, aplicar_transacao(atual[1], transacao))
+    else:
+        # Alguém mais gravou no meio: a próxima leitura remonta
+        vivos.pop(origem, None)
+
+
+def carregar_agregados(filtros=SEM_FILTROS, fingerprint=None):
+    fingerprint = fingerprint or fingerprint_db()
+    if filtros.ativo:
+        return _agregados_db(fingerprint, filtros)
+    return _agregados_atualizados("db", fingerprint, lambda: _agregados_db(fingerprint))
+
+
+def carregar_contas(fingerprint=None):
+    return _contas_db(fingerprint or fingerprint_db())
+
+
+def registrar_transacao_db(transacao):
+    antes = fingerprint_db()
+    transacao_id = inserir_transacao_db(transacao)
+    depois = (transacao_id, antes[1] + 1)
+    if fingerprint_db() != depois:
+        antes = None  # outra gravação no meio: força remontar
+    _aplicar_nos_vivos("db", antes, depois, transacao)
+
+
+def exportar_transacoes(filtros=SEM_FILTROS, formato="csv"):
+    # Arquivo pronto para download; refeito só com transação nova ou outro filtro
+    return exportacao_em_cache("db", formato, filtros, fingerprint_db())
+
+
+def carregar_csv(path=FINANCAS_CSV, filtros=SEM_FILTROS):
+    fingerprint = fingerprint_arquivo(path)
+    if fingerprint is None:
+        return None
+    return filtrar_frame(_ler_csv(path, fingerprint), filtros)
+
+
+def carregar_agregados_csv(path=FINANCAS_CSV, filtros=SEM_FILTROS):
+    fingerprint = fingerprint_arquivo(path)
+    if fingerprint is None:
+        return None
+    if filtros.ativo:
+        return _agregados_csv(path, fingerprint, filtros)
+    return _agregados_atualizados(path, fingerprint, lambda: _agregados_csv(path, fingerprint))
+
+
+def registrar_transacao_csv(transacao, path=FINANCAS_CSV):
+    antes, depois = anexar_csv(transacao, path)
+    _aplicar_nos_vivos(path, antes, depois, transacao)
+    atualizar_estado(caminho_estado(path), pd.DataFrame([transacao]), antes, depois)
+
+
+def exportar_csv(filtros=SEM_FILTROS, formato="csv", path=FINANCAS_CSV):
+    return exportacao_em_cache(path, formato, filtros, fingerprint_arquivo(path))
+
+
+def carregar_kpis_csv(path=FINANCAS_CSV):
+    # Estado dos KPIs gravado ao lado do CSV; só relê o histórico se o
+    # arquivo mudou por fora do app
+    fingerprint = fingerprint_arquivo(path)
+    if fingerprint is None:
+        return None
+    return estado_atualizado(caminho_estado(path), fingerprint, lambda: _ler_csv(path, fingerprint))
@@ -0,0 +1,46 @@
+import os
+import threading
+from contextlib import contextmanager
+
+from src.config.database import DB_CONFIG
+
+# Pool compartilhado pelo processo inteiro (o Streamlit roda cada sessão numa
+# thread, daí o ThreadedConnectionPool)
+POOL_MIN = int(os.getenv("DB_POOL_MIN", "1"))
+POOL_MAX = int(os.getenv("DB_POOL_MAX", "5"))
+
+_pool = None
+_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        # psycopg2 só na primeira consulta: o app sobe sem ele quando lê CSV
+        from psycopg2.pool import ThreadedConnectionPool
+
+        with _lock:
+            if _pool is None:
+                _pool = ThreadedConnectionPool(POOL_MIN, POOL_MAX, **DB_CONFIG)
+    return _pool
+
+
+@contextmanager
+def conexao():
+    pool = get_pool()
+    conn = pool.getconn()
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        # Conexão quebrada não volta para o pool
+        pool.putconn(conn, close=bool(conn.closed))
+
+
+def consultar(sql, params=None):
+    with conexao() as conn, conn.cursor() as cur:
+        cur.execute(sql, params)
+        return cur.fetchall(), [d[0] for d in cur.description]
@@ -0,0 +1,260 @@
+import argparse
+import glob
+import hashlib
+import importlib.util
+import json
+import os
+import uuid
+from datetime import date
+
+import pandas as pd
+from src.data.filtros import SEM_FILTROS, Filtros, argumentos_parquet, clausula_sql, filtrar_frame
+
+# Exportação do histórico em CSV, Parquet ou XLSX, em lotes: cada lote sai da
+# origem (cursor no servidor, lotes do dataset Parquet ou chunks do CSV), é
+# gravado e descartado, então a memória não cresce com o histórico. Do banco
+# para CSV nem passa pelo pandas: COPY ... TO STDOUT direto no arquivo.
+#
+# No dashboard o arquivo é gerado no clique e guardado em EXPORT_DIR com a
+# origem, o formato, os filtros e a versão dos dados no nome: o mesmo pedido
+# sem transação nova reaproveita o arquivo pronto.
+#
+#   python -m src.data.exportacao historico.parquet --de 2025-01-01 --contas Nubank
+
+EXPORT_DIR = os.getenv("EXPORT_DIR", ".cache/exportacoes")
+LOTE = int(os.getenv("EXPORT_LOTE", "50000"))
+
+FORMATOS = {
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+# Limite de linhas de uma planilha do Excel, sem o cabeçalho; o que passar
+# vai para a planilha seguinte
+LINHAS_XLSX = 1_048_575
+
+
+# ----------- Origens (geradores de DataFrames) ----------- #
+
+def lotes_db(filtros=SEM_FILTROS, tamanho=LOTE):
+    # Cursor nomeado: o servidor guarda o resultado e manda `tamanho` linhas
+    # por vez, em vez de um fetchall do histórico inteiro
+    from src.data.db import conexao
+    from src.data.queries import SQL_TRANSACOES
+
+    filtro, params = clausula_sql(filtros)
+    with conexao() as conn, conn.cursor(name=f"exportacao_{uuid.uuid4().hex}") as cur:
+        cur.itersize = tamanho
+        cur.execute(f"{SQL_TRANSACOES} {filtro} ORDER BY t.data", params)
+        linhas = cur.fetchmany(tamanho)
+        colunas = [d[0] for d in cur.description]
+        # Sem linhas no filtro sai um lote vazio, que leva as colunas ao arquivo
+        yield pd.DataFrame(linhas, columns=colunas)
+        while linhas := cur.fetchmany(tamanho):
+            yield pd.DataFrame(linhas, columns=colunas)
+
+
+def lotes_parquet(base, filtros=SEM_FILTROS, tamanho=LOTE):
+    from src.storage.parquet import ler_em_lotes
+
+    inicio, fim, contas, categorias = argumentos_parquet(filtros)
+    yield from ler_em_lotes(base, inicio, fim, contas, categorias, tamanho=tamanho)
+
+
+def lotes_csv(path, filtros=SEM_FILTROS, tamanho=LOTE):
+    encontrou, vazio = False, None
+    for lote in pd.read_csv(path, parse_dates=["Data"], chunksize=tamanho):
+        # O CSV de finanças não vem ordenado por data
+        lote = filtrar_frame(lote, filtros, ordenado=False)
+        if len(lote):
+            encontrou = True
+            yield lote
+        else:
+            vazio = lote
+    if not encontrou and vazio is not None:
+        # Nada no filtro: um lote vazio leva as colunas ao arquivo
+        yield vazio
+
+
+def lotes_frame(df, tamanho=LOTE):
+    for inicio in range(0, max(len(df), 1), tamanho):
+        yield df.iloc[inicio:inicio + tamanho]
+
+
+def lotes_origem(origem, filtros=SEM_FILTROS, tamanho=LOTE):
+    # "db", um diretório Parquet particionado ou um CSV
+    if origem == "db":
+        return lotes_db(filtros, tamanho)
+    if os.path.isdir(origem):
+        return lotes_parquet(origem, filtros, tamanho)
+    return lotes_csv(origem, filtros, tamanho)
+
+
+# ----------- Gravação ----------- #
+
+def _normalizar(lote):
+    # Mesmos tipos em todos os lotes (o esquema do Parquet sai do primeiro):
+    # categorias e objetos viram texto, datas ficam em microssegundos
+    lote = lote.copy()
+    for coluna in lote.columns:
+        if pd.api.types.is_datetime64_any_dtype(lote[coluna]):
+            lote[coluna] = lote[coluna].astype("datetime64[us]")
+        elif not pd.api.types.is_numeric_dtype(lote[coluna]):
+            lote[coluna] = lote[coluna].astype("str")
+    return lote
+
+
+def _gravar_csv(lotes, arquivo):
+    with open(arquivo, "w", encoding="utf-8", newline="") as f:
+        for i, lote in enumerate(lotes):
+            lote.to_csv(f, index=False, header=i == 0)
+
+
+def _gravar_parquet(lotes, arquivo):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    escritor = None
+    try:
+        for lote in lotes:
+            lote = _normalizar(lote)
+            if escritor is None:
+                tabela = pa.Table.from_pandas(lote, preserve_index=False)
+                escritor = pq.ParquetWriter(arquivo, tabela.schema)
+            else:
+                tabela = pa.Table.from_pandas(lote, schema=escritor.schema, preserve_index=False)
+            escritor.write_table(tabela)
+    finally:
+        if escritor is not None:
+            escritor.close()
+    if escritor is None:
+        pd.DataFrame().to_parquet(arquivo)
+
+
+def _gravar_xlsx(lotes, arquivo):
+    # openpyxl é opcional e só importado aqui
+    try:
+        import openpyxl
+    except ImportError:
+        raise RuntimeError("A exportação em .xlsx precisa do openpyxl (pip install openpyxl)") from None
+
+    # write_only: as linhas vão para um arquivo temporário, não ficam na memória
+    livro = openpyxl.Workbook(write_only=True)
+    planilha, linhas, cabecalho = None, LINHAS_XLSX, None
+    for lote in lotes:
+        if cabecalho is None:
+            cabecalho = list(lote.columns)
+        valores = lote.astype(object).where(lote.notna(), None)
+        for linha in valores.itertuples(index=False, name=None):
+            if linhas == LINHAS_XLSX:
+                nome = "Transações" if planilha is None else f"Transações ({len(livro.worksheets) + 1})"
+                planilha = livro.create_sheet(nome)
+                planilha.append(cabecalho)
+                linhas = 0
+            planilha.append(linha)
+            linhas += 1
+    if planilha is None:
+        planilha = livro.create_sheet("Transações")
+        if cabecalho is not None:
+            planilha.append(cabecalho)
+    livro.save(arquivo)
+
+
+GRAVADORES = {"csv": _gravar_csv, "parquet": _gravar_parquet, "xlsx": _gravar_xlsx}
+
+
+def _copiar_csv_db(filtros, arquivo):
+    # COPY (consulta) TO STDOUT: o servidor formata o CSV e o psycopg2 só
+    # repassa os bytes para o arquivo
+    from src.data.db import conexao
+    from src.data.queries import SQL_TRANSACOES
+
+    filtro, params = clausula_sql(filtros)
+    with conexao() as conn, conn.cursor() as cur:
+        consulta = cur.mogrify(f"{SQL_TRANSACOES} {filtro} ORDER BY t.data", params).decode(conn.encoding)
+        with open(arquivo, "w", encoding="utf-8", newline="") as f:
+            cur.copy_expert(f"COPY ({consulta}) TO STDOUT WITH (FORMAT csv, HEADER)", f)
+
+
+def exportar(origem, destino, formato=None, filtros=SEM_FILTROS, lotes=None, tamanho=LOTE):
+    """
+    Grava as transações de `origem` ("db", diretório Parquet ou CSV) com
+    `filtros` em `destino`. O formato sai da extensão quando omitido.
+    `lotes` (iterável de DataFrames) substitui a origem, ex.: lotes_frame(df).
+    A troca do arquivo é atômica: quem lê `destino` nunca vê um pela metade.
+    """
+    formato = formato or os.path.splitext(destino)[1].lstrip(".").lower()
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato de exportação inválido: {formato!r} (use {', '.join(FORMATOS)})")
+
+    os.makedirs(os.path.dirname(destino) or ".", exist_ok=True)
+    temporario = f"{destino}.{uuid.uuid4().hex}.tmp"
+    try:
+        if lotes is None and origem == "db" and formato == "csv":
+            _copiar_csv_db(filtros, temporario)
+        else:
+            if lotes is None:
+                lotes = lotes_origem(origem, filtros, tamanho)
+            GRAVADORES[formato](lotes, temporario)
+        os.replace(temporario, destino)
+    finally:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+    return destino
+
+
+# ----------- Cache ----------- #
+
+def _chave(*partes):
+    conteudo = json.dumps(partes, default=str, ensure_ascii=False)
+    return hashlib.sha1(conteudo.encode("utf-8")).hexdigest()[:16]
+
+
+def exportacao_em_cache(origem, formato, filtros=SEM_FILTROS, versao=None, lotes=None,
+                        diretorio=EXPORT_DIR):
+    """
+    Caminho de uma exportação pronta para (origem, formato, filtros) na
+    `versao` dos dados (a fingerprint da origem), gerando só se ainda não
+    existe. Versões anteriores do mesmo pedido são apagadas.
+    """
+    pedido = _chave(origem, formato, filtros)
+    path = os.path.join(diretorio, f"{pedido}-{_chave(versao)}.{formato}")
+    if os.path.exists(path):
+        return path
+
+    exportar(origem, path, formato, filtros, lotes=lotes)
+    for antigo in glob.glob(os.path.join(diretorio, f"{pedido}-*.{formato}")):
+        if antigo != path:
+            os.remove(antigo)
+    return path
+
+
+def formatos_disponiveis():
+    # Parquet e XLSX dependem de pacotes opcionais
+    from src.storage.parquet import disponivel
+
+    return [f for f in FORMATOS
+            if (f != "parquet" or disponivel()) and (f != "xlsx" or importlib.util.find_spec("openpyxl") is not None)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exporta as transações em CSV, Parquet ou XLSX")
+    parser.add_argument("destino", help="arquivo de saída; o formato sai da extensão")
+    parser.add_argument("--origem", default="db",
+                        help='"db" (padrão), diretório Parquet particionado ou arquivo CSV')
+    parser.add_argument("--formato", choices=list(FORMATOS), default=None)
+    parser.add_argument("--de", type=date.fromisoformat, default=None, metavar="AAAA-MM-DD")
+    parser.add_argument("--ate", type=date.fromisoformat, default=None, metavar="AAAA-MM-DD")
+    parser.add_argument("--contas", nargs="*", default=[])
+    parser.add_argument("--categorias", nargs="*", default=[])
+    parser.add_argument("--lote", type=int, default=LOTE, help="linhas por lote")
+    args = parser.parse_args()
+
+    filtros = Filtros(args.de, args.ate, tuple(args.contas), tuple(args.categorias))
+    print(f"📦 Exportando {args.origem} para {args.destino}...")
+    exportar(args.origem, args.destino, args.formato, filtros, tamanho=args.lote)
+    print(f"✅ {args.destino} ({os.path.getsize(args.destino) / 2**20:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+from dataclasses import dataclass
+from datetime import date
+
+import pandas as pd
+
+# Filtros do dashboard (período, contas, categorias). Ficam imutáveis e
+# hasheáveis para entrar na chave do st.cache_data, e são aplicados o mais
+# cedo possível: no WHERE do SQL, no filtro do dataset Parquet ou, para
+# DataFrames em memória, por busca binária nas datas já ordenadas.
+
+
+@dataclass(frozen=True)
+class Filtros:
+    """
+    inicio, fim  datas (inclusivas) ou None para não limitar
+    contas       nomes das contas; vazio = todas
+    categorias   nomes das categorias; vazio = todas
+    """
+    inicio: date | None = None
+    fim: date | None = None
+    contas: tuple = ()
+    categorias: tuple = ()
+
+    @property
+    def ativo(self):
+        return bool(self.inicio or self.fim or self.contas or self.categorias)
+
+    def faixa(self):
+        # Intervalo semiaberto [início, fim + 1 dia): pega o dia final inteiro
+        inicio = pd.Timestamp(self.inicio) if self.inicio else None
+        fim = pd.Timestamp(self.fim) + pd.Timedelta(days=1) if self.fim else None
+        return inicio, fim
+
+
+SEM_FILTROS = Filtros()
+
+
+def clausula_sql(filtros, condicoes=()):
+    """
+    WHERE para consultas sobre tb_transacoes (alias `t`) e os parâmetros
+    nomeados dele. `condicoes` fixas da consulta entram junto.
+    """
+    condicoes = list(condicoes)
+    params = {}
+    inicio, fim = filtros.faixa()
+    # Faixa em `data` (e não date_trunc) para o planner podar partições
+    if inicio is not None:
+        condicoes.append("t.data >= %(inicio)s")
+        params["inicio"] = inicio.to_pydatetime()
+    if fim is not None:
+        condicoes.append("t.data < %(fim)s")
+        params["fim"] = fim.to_pydatetime()
+    if filtros.contas:
+        condicoes.append("t.conta_id IN (SELECT id FROM tb_contas WHERE nome = ANY(%(contas)s))")
+        params["contas"] = list(filtros.contas)
+    if filtros.categorias:
+        condicoes.append("t.categoria_id IN (SELECT id FROM tb_categorias WHERE nome = ANY(%(categorias)s))")
+        params["categorias"] = list(filtros.categorias)
+    if not condicoes:
+        return "", params
+    return "WHERE " + " AND ".join(condicoes), params
+
+
+def argumentos_parquet(filtros):
+    # (inicio, fim, contas, categorias) para ler_particionado, que tem fim
+    # inclusivo: vai até o último instante do dia
+    inicio, fim = filtros.faixa()
+    if fim is not None:
+        fim -= pd.Timedelta(microseconds=1)
+    return inicio, fim, filtros.contas or None, filtros.categorias or None
+
+
+def ordenar_por_data(df):
+    # Ordenação estável feita uma vez (na leitura em cache); depois disso os
+    # recortes por período são busca binária
+    if df['Data'].is_monotonic_increasing:
+        return df
+    return df.sort_values('Data', kind='stable', ignore_index=True)
+
+
+def fatiar_periodo(df, inicio=None, fim=None):
+    # [inicio, fim) em `df` já ordenado por Data (ordenar_por_data, na
+    # leitura em cache): searchsorted + iloc. Sem conferir a ordem aqui, que
+    # seria uma varredura da coluna inteira a cada recorte
+    datas = df['Data']
+    de = datas.searchsorted(pd.Timestamp(inicio), side='left') if inicio is not None else 0
+    ate = datas.searchsorted(pd.Timestamp(fim), side='left') if fim is not None else len(df)
+    return df.iloc[de:ate]
+
+
+def filtrar_frame(df, filtros, ordenado=True):
+    # `ordenado=False` para frames fora de ordem de data (ex.: lotes lidos
+    # uma vez só): o período vira máscara em vez de busca binária
+    if df is None or not filtros.ativo:
+        return df
+    inicio, fim = filtros.faixa()
+    if ordenado:
+        df = fatiar_periodo(df, inicio, fim)
+    elif inicio is not None or fim is not None:
+        datas = df['Data']
+        dentro = pd.Series(True, index=df.index)
+        if inicio is not None:
+            dentro &= datas >= inicio
+        if fim is not None:
+            dentro &= datas < fim
+        df = df[dentro]
+    # Contas e categorias só no que sobrou do período
+    if filtros.contas and 'Conta' in df:
+        df = df[df['Conta'].isin(filtros.contas)]
+    if filtros.categorias:
+        df = df[df['Categoria'].isin(filtros.categorias)]
+    return df
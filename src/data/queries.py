@@ -0,0 +1,141 @@
+import pandas as pd
+from src.analytics.aggregates import (COLUNAS_RECENTES, Agregados, dia_semana_do_diario,
+                                      mensal_do_diario)
+from src.data.db import consultar
+from src.data.filtros import SEM_FILTROS, clausula_sql
+
+# Camada de consultas do dashboard: as agregações rodam no PostgreSQL e só
+# tabelas pequenas (um registro por dia, mês ou categoria) voltam para o app.
+# Os filtros do dashboard entram no WHERE ({filtro}), então um período curto
+# só lê as partições daquele período.
+
+SQL_DIARIO = """
+    SELECT dia, entrada, saida, qtd_entrada, qtd_saida,
+           SUM(entrada - saida) OVER (ORDER BY dia) AS saldo_acumulado
+    FROM (
+        SELECT date_trunc('day', data) AS dia,
+               COALESCE(SUM(valor) FILTER (WHERE tipo = 'entrada'), 0)::float8 AS entrada,
+               COALESCE(SUM(valor) FILTER (WHERE tipo = 'saida'), 0)::float8 AS saida,
+               COUNT(*) FILTER (WHERE tipo = 'entrada') AS qtd_entrada,
+               COUNT(*) FILTER (WHERE tipo = 'saida') AS qtd_saida
+        FROM tb_transacoes t
+        {filtro}
+        GROUP BY 1
+    ) d
+    ORDER BY dia
+"""
+
+# Mensal e por categoria vêm do resumo materializado (tb_resumo_mensal)
+SQL_MENSAL = """
+    SELECT ano, mes,
+           COALESCE(SUM(total) FILTER (WHERE tipo = 'entrada'), 0)::float8 AS entrada,
+           COALESCE(SUM(total) FILTER (WHERE tipo = 'saida'), 0)::float8 AS saida,
+           COALESCE(SUM(qtd) FILTER (WHERE tipo = 'entrada'), 0)::int8 AS qtd_entrada,
+           COALESCE(SUM(qtd) FILTER (WHERE tipo = 'saida'), 0)::int8 AS qtd_saida
+    FROM tb_resumo_mensal
+    GROUP BY 1, 2
+    ORDER BY 1, 2
+"""
+
+SQL_CATEGORIAS = """
+    SELECT COALESCE(cat.nome, 'Sem categoria') AS categoria,
+           COALESCE(SUM(r.total) FILTER (WHERE r.tipo = 'entrada'), 0)::float8 AS entrada,
+           COALESCE(SUM(r.total) FILTER (WHERE r.tipo = 'saida'), 0)::float8 AS saida,
+           COALESCE(SUM(r.qtd) FILTER (WHERE r.tipo = 'entrada'), 0)::int8 AS qtd_entrada,
+           COALESCE(SUM(r.qtd) FILTER (WHERE r.tipo = 'saida'), 0)::int8 AS qtd_saida
+    FROM tb_resumo_mensal r
+    LEFT JOIN tb_categorias cat ON cat.id = r.categoria_id
+    GROUP BY 1
+"""
+
+SQL_TRANSACOES = """
+    SELECT t.data AS "Data",
+           t.descricao AS "Descrição",
+           t.valor::float8 AS "Valor",
+           t.tipo AS "Tipo",
+           t.transação AS "Transação",
+           c.nome AS "Conta",
+           cat.nome AS "Categoria"
+    FROM tb_transacoes t
+    LEFT JOIN tb_contas c ON c.id = t.conta_id
+    LEFT JOIN tb_categorias cat ON cat.id = t.categoria_id
+"""
+
+# Com filtro, mensal e por categoria não podem vir do resumo (que é por mês
+# inteiro): o mensal sai do diário filtrado e as categorias daqui
+SQL_CATEGORIAS_FILTRADAS = """
+    SELECT COALESCE(cat.nome, 'Sem categoria') AS categoria,
+           COALESCE(SUM(t.valor) FILTER (WHERE t.tipo = 'entrada'), 0)::float8 AS entrada,
+           COALESCE(SUM(t.valor) FILTER (WHERE t.tipo = 'saida'), 0)::float8 AS saida,
+           COUNT(*) FILTER (WHERE t.tipo = 'entrada') AS qtd_entrada,
+           COUNT(*) FILTER (WHERE t.tipo = 'saida') AS qtd_saida
+    FROM tb_transacoes t
+    LEFT JOIN tb_categorias cat ON cat.id = t.categoria_id
+    {filtro}
+    GROUP BY 1
+"""
+
+SQL_CONTAS = "SELECT nome FROM tb_contas ORDER BY nome"
+
+COLUNAS_SOMA = ['entrada', 'saida', 'qtd_entrada', 'qtd_saida']
+
+
+def _frame(sql, params=None):
+    linhas, colunas = consultar(sql, params)
+    return pd.DataFrame(linhas, columns=colunas)
+
+
+def diario_db(filtros=SEM_FILTROS):
+    filtro, params = clausula_sql(filtros)
+    diario = _frame(SQL_DIARIO.format(filtro=filtro), params)
+    diario['dia'] = pd.to_datetime(diario['dia'])
+    return diario.set_index('dia').rename_axis('Dia')
+
+
+def mensal_db():
+    mensal = _frame(SQL_MENSAL).set_index(['ano', 'mes'])
+    mensal.index.names = ['Ano', 'Mês']
+    return mensal[COLUNAS_SOMA]
+
+
+def categorias_db(filtros=SEM_FILTROS):
+    if filtros.ativo:
+        filtro, params = clausula_sql(filtros)
+        categorias = _frame(SQL_CATEGORIAS_FILTRADAS.format(filtro=filtro), params)
+    else:
+        categorias = _frame(SQL_CATEGORIAS)
+    return categorias.set_index('categoria').rename_axis('Categoria')[COLUNAS_SOMA]
+
+
+def recentes_db(filtros=SEM_FILTROS):
+    filtro, params = clausula_sql(filtros)
+    recentes = _frame(f"{SQL_TRANSACOES} {filtro} ORDER BY t.data DESC LIMIT 10", params)
+    recentes['Data'] = pd.to_datetime(recentes['Data'])
+    return recentes[COLUNAS_RECENTES]
+
+
+def maior_gasto_db(filtros=SEM_FILTROS):
+    filtro, params = clausula_sql(filtros, ["t.tipo = 'saida'"])
+    maior = _frame(f"{SQL_TRANSACOES} {filtro} ORDER BY t.valor DESC LIMIT 1", params)
+    if maior.empty:
+        return None
+    linha = maior.iloc[0][COLUNAS_RECENTES].copy()
+    linha['Data'] = pd.Timestamp(linha['Data'])
+    return linha
+
+
+def agregados_db(filtros=SEM_FILTROS):
+    diario = diario_db(filtros)
+    return Agregados(
+        diario=diario,
+        mensal=mensal_do_diario(diario) if filtros.ativo else mensal_db(),
+        categorias=categorias_db(filtros),
+        dia_semana=dia_semana_do_diario(diario),
+        recentes=recentes_db(filtros),
+        maior_gasto=maior_gasto_db(filtros),
+    )
+
+
+def contas_db():
+    linhas, _ = consultar(SQL_CONTAS)
+    return [nome for (nome,) in linhas]
@@ -0,0 +1,98 @@
+import csv
+import os
+
+from src.config.contas import CONTA_PADRAO
+from src.data.db import conexao
+from src.etl.dimensoes import ids_categorias, ids_contas, limpar_cache
+from src.etl.schema import garantir_particoes
+from src.etl.trava import travado
+
+COLUNAS_CSV = ['Data', 'Tipo', 'Categoria', 'Descrição', 'Valor']
+
+# Gravação de uma transação avulsa (formulário "Nova Transação"). Nos dois
+# caminhos o custo é de uma linha, não do histórico.
+
+
+def anexar_csv(transacao, path):
+    """
+    Acrescenta uma linha ao CSV sob trava exclusiva, respeitando a ordem de
+    colunas do cabeçalho existente. Devolve as fingerprints (mtime, tamanho)
+    de antes e depois da gravação, lidas com a trava ainda presa.
+    """
+    with open(path, 'a+', newline='', encoding='utf-8') as f, travado(f):
+        antes = _fingerprint(f)
+        f.seek(0)
+        cabecalho = f.readline().rstrip('\r\n')
+        colunas = next(csv.reader([cabecalho])) if cabecalho else COLUNAS_CSV
+
+        f.seek(0, os.SEEK_END)
+        escritor = csv.writer(f)
+        if not cabecalho:
+            escritor.writerow(colunas)
+        elif not _termina_em_nova_linha(path):
+            # Editado à mão sem a quebra final: a linha nova não pode colar na última
+            f.write('\n')
+        escritor.writerow([transacao.get(c, '') for c in colunas])
+        f.flush()
+        os.fsync(f.fileno())
+        return antes, _fingerprint(f)
+
+
+def _termina_em_nova_linha(path):
+    with open(path, 'rb') as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b'\n'
+
+
+def _fingerprint(f):
+    info = os.fstat(f.fileno())
+    return (info.st_mtime_ns, info.st_size)
+
+
+def inserir_transacao_db(transacao, conta=CONTA_PADRAO):
+    """
+    INSERT de uma linha em tb_transacoes pelo pool, já atualizando o resumo
+    mensal com o delta (sem recalcular o mês). A conta é a de
+    transacao['Conta'] quando houver. Devolve o id gerado.
+    """
+    data = transacao['Data']
+    conta = transacao.get('Conta') or conta
+    with conexao() as conn, conn.cursor() as cur:
+        try:
+            return _inserir(cur, transacao, data, conta)
+        except Exception:
+            # IDs criados nesta transação somem com o rollback
+            limpar_cache(conn)
+            raise
+
+
+def _inserir(cur, transacao, data, conta):
+    garantir_particoes(cur, [(data.year, data.month)])
+    # Mesmo cache de IDs das cargas: conta e categoria conhecidas não vão ao banco
+    conta_id = ids_contas(cur, [conta])[str(conta)]
+    categoria = str(transacao['Categoria'])
+    categoria_id = ids_categorias(cur, [(categoria, transacao['Tipo'])])[categoria]
+
+    cur.execute(
+        """
+        INSERT INTO tb_transacoes
+        (data, descricao, valor, tipo, transação, conta_id, categoria_id)
+        VALUES (%s, %s, %s, %s, %s, %s, %s)
+        RETURNING id
+        """,
+        (data, transacao.get('Descrição'), abs(transacao['Valor']), transacao['Tipo'],
+         transacao.get('Transação', 'manual'), conta_id, categoria_id)
+    )
+    transacao_id = cur.fetchone()[0]
+
+    cur.execute(
+        """
+        INSERT INTO tb_resumo_mensal (ano, mes, conta_id, categoria_id, tipo, total, qtd)
+        VALUES (%s, %s, %s, %s, %s, %s, 1)
+        ON CONFLICT (ano, mes, conta_id, categoria_id, tipo) DO UPDATE
+        SET total = tb_resumo_mensal.total + EXCLUDED.total,
+            qtd = tb_resumo_mensal.qtd + 1
+        """,
+        (data.year, data.month, conta_id, categoria_id, transacao['Tipo'], abs(transacao['Valor']))
+    )
+    return transacao_id
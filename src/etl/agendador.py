@@ -0,0 +1,190 @@
+import argparse
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from src.config.contas import carregar_contas
+from src.etl.extract import chave_arquivo
+from src.etl.ingest import carregar_frames, descobrir_arquivos, inferir_conta, processar_arquivo
+from src.etl.load import MODOS_CARGA
+from src.etl.metrics import RUNS_DIR, RunMetrics, contar, etapa
+from src.etl.trava import ETL_LOCK, trava
+
+# Agendador do ETL, fora do app: observa uma pasta de entrada, transforma os
+# extratos novos num pool de processos e carrega tudo numa carga só (como o
+# ingest). O dashboard só lê o que já foi carregado.
+#
+#   python -m src.etl.agendador entrada/ --intervalo 60
+#
+# Extratos processados vão para entrada/_processados, os que falham na
+# leitura para entrada/_erros (mantendo a subpasta, que define a conta). Se a
+# carga no banco falha, os arquivos ficam na entrada para o próximo ciclo.
+# Cada ciclo com arquivos grava um registro em `runs_dir`, com o status de
+# cada extrato.
+
+ETL_INBOX = os.getenv("ETL_INBOX", "entrada")
+# Arquivo modificado há menos que isso ainda pode estar sendo copiado
+ESTAVEL_S = float(os.getenv("ETL_ESTAVEL_S", "5"))
+
+PROCESSADOS = "_processados"
+ERROS = "_erros"
+
+
+def pendentes(inbox, estavel=ESTAVEL_S):
+    # Extratos da entrada fora das pastas do próprio agendador e parados há
+    # pelo menos `estavel` segundos
+    limite = time.time() - estavel
+    arquivos = []
+    for path in descobrir_arquivos(inbox):
+        partes = os.path.relpath(path, inbox).split(os.sep)
+        if partes[0] in (PROCESSADOS, ERROS):
+            continue
+        if os.path.getmtime(path) <= limite:
+            arquivos.append(path)
+    return arquivos
+
+
+def mover(path, inbox, destino):
+    # Mantém a subpasta (a conta); nome repetido ganha um sufixo com a hora
+    alvo = os.path.join(inbox, destino, os.path.relpath(path, inbox))
+    if os.path.exists(alvo):
+        raiz, ext = os.path.splitext(alvo)
+        alvo = f"{raiz}-{time.strftime('%Y%m%d-%H%M%S')}{ext}"
+    os.makedirs(os.path.dirname(alvo), exist_ok=True)
+    shutil.move(path, alvo)
+    return alvo
+
+
+def transformar(arquivos, contas, pool=None):
+    """
+    extract + transform de cada extrato, no pool quando há um. Devolve
+    {path: DataFrame} e {path: erro}: um arquivo ruim não derruba os outros.
+    """
+    if pool is None:
+        futuros = None
+    else:
+        futuros = {p: pool.submit(processar_arquivo, p, c) for p, c in zip(arquivos, contas)}
+
+    frames, erros = {}, {}
+    for path, conta in zip(arquivos, contas):
+        try:
+            frames[path] = futuros[path].result() if futuros else processar_arquivo(path, conta)
+        except Exception as erro:
+            erros[path] = repr(erro)
+    return frames, erros
+
+
+def ciclo(inbox=ETL_INBOX, pool=None, mode="incremental", parquet_dir=None,
+          runs_dir=RUNS_DIR, estavel=ESTAVEL_S, lock=ETL_LOCK):
+    """
+    Uma passada pela entrada. Devolve o registro da execução, ou None se não
+    havia extrato novo ou outra carga estava rodando.
+    """
+    with trava(lock) as livre:
+        if not livre:
+            print(f"⏳ Outra carga em andamento ({lock}); ciclo ignorado")
+            return None
+
+        arquivos = pendentes(inbox, estavel)
+        if not arquivos:
+            return None
+
+        config = carregar_contas()
+        contas = [inferir_conta(p, config, raiz=inbox) for p in arquivos]
+        print(f"📂 {len(arquivos)} extratos novos em {inbox}")
+
+        extratos = {os.path.relpath(p, inbox): {"conta": c, "status": "pendente"}
+                    for p, c in zip(arquivos, contas)}
+        run = RunMetrics("agendador", inbox=inbox, modo=mode, parquet=parquet_dir, extratos=extratos)
+        try:
+            with run:
+                with etapa("leitura"):
+                    frames, erros = transformar(arquivos, contas, pool)
+                for path, erro in erros.items():
+                    print(f"❌ {path}: {erro}")
+                    extratos[os.path.relpath(path, inbox)].update(status="erro", erro=erro,
+                                                                  movido_para=mover(path, inbox, ERROS))
+                contar("extratos_com_erro", len(erros))
+
+                if frames:
+                    if parquet_dir:
+                        with etapa("parquet"):
+                            _gravar_parquet(frames, parquet_dir)
+                    carregar_frames(list(frames.values()), mode=mode)
+                    for path, df in frames.items():
+                        extratos[os.path.relpath(path, inbox)].update(
+                            status="ok", linhas=len(df), movido_para=mover(path, inbox, PROCESSADOS))
+        finally:
+            # Carga que falhou: os extratos lidos ficam na entrada para o próximo ciclo
+            for registro in extratos.values():
+                if registro["status"] == "pendente":
+                    registro["status"] = "nao_carregado"
+            run.imprimir()
+            if runs_dir:
+                print(f"📝 Registro da execução em {run.salvar(runs_dir)}")
+    return run.registro()
+
+
+def _gravar_parquet(frames, parquet_dir):
+    # Mesmo esquema do pipeline: lote = versão do extrato, e o estado dos
+    # KPIs soma só o que é novo
+    from src.analytics.kpis import atualizar_estado, caminho_estado
+    from src.storage.parquet import fingerprint_dataset, gravar_particionado
+
+    for path, df in frames.items():
+        lote = chave_arquivo(path)
+        antes = fingerprint_dataset(parquet_dir)
+        gravar_particionado(df.drop(columns="Hash"), parquet_dir, lote=lote)
+        atualizar_estado(caminho_estado(parquet_dir), df, antes, fingerprint_dataset(parquet_dir), lote=lote)
+
+
+def agendar(inbox=ETL_INBOX, intervalo=60, workers=None, uma_vez=False, **kwargs):
+    # O pool vive entre os ciclos: os processos já sobem com pandas importado
+    os.makedirs(inbox, exist_ok=True)
+    pool = None if workers == 1 else ProcessPoolExecutor(max_workers=workers)
+    print(f"👀 Observando {inbox}" + ("" if uma_vez else f" a cada {intervalo}s (Ctrl+C para sair)"))
+    try:
+        while True:
+            try:
+                ciclo(inbox, pool=pool, **kwargs)
+            except Exception as erro:
+                # Já registrado na execução; o agendador segue para o próximo ciclo
+                if uma_vez:
+                    raise
+                print(f"❌ Ciclo falhou: {erro!r}")
+            if uma_vez:
+                break
+            time.sleep(intervalo)
+    except KeyboardInterrupt:
+        print("👋 Agendador encerrado")
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Agendador do ETL: carrega os extratos que chegam numa pasta")
+    parser.add_argument("inbox", nargs="?", default=ETL_INBOX, help="pasta de entrada dos extratos")
+    parser.add_argument("--intervalo", type=float, default=60, help="segundos entre as verificações")
+    parser.add_argument("--uma-vez", action="store_true",
+                        help="processa o que houver e sai (para rodar pelo cron)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="processos para leitura/transformação (1 = sequencial)")
+    parser.add_argument("--mode", choices=MODOS_CARGA, default="incremental")
+    parser.add_argument("--parquet", metavar="DIR", default=None,
+                        help="também grava as transações em Parquet particionado neste diretório")
+    parser.add_argument("--estavel", type=float, default=ESTAVEL_S,
+                        help="ignora arquivos modificados há menos que isso (segundos)")
+    parser.add_argument("--runs-dir", default=RUNS_DIR,
+                        help="onde gravar os registros JSON das execuções")
+    parser.add_argument("--trava", default=ETL_LOCK, help="arquivo de trava entre execuções")
+    args = parser.parse_args()
+
+    agendar(args.inbox, intervalo=args.intervalo, workers=args.workers, uma_vez=args.uma_vez,
+            mode=args.mode, parquet_dir=args.parquet, estavel=args.estavel,
+            runs_dir=args.runs_dir, lock=args.trava)
+
+
+if __name__ == "__main__":
+    main()
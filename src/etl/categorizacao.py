@@ -0,0 +1,211 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import uuid
+
+import numpy as np
+import pandas as pd
+from src.config.categorias import carregar_regras
+from src.etl.metrics import contar
+
+# Categorização por regras sobre a descrição do extrato.
+#
+#   - as "palavras" de todas as regras vão para um autômato Aho-Corasick, que
+#     acha numa passada pela descrição todas as que aparecem; as regras com
+#     "regex" viram uma única regex com um grupo por regra. Vence a regra de
+#     menor índice entre as que casam, como num laço sobre as regras
+#   - cada descrição distinta é normalizada e classificada uma vez; o
+#     resultado fica num dicionário do processo, compartilhado entre
+#     chunks e arquivos
+#   - o dicionário é gravado em CATEGORIZACAO_CACHE junto com o hash das
+#     regras: mudou uma regra, o cache antigo é descartado
+
+CATEGORIZACAO_CACHE = os.getenv("CATEGORIZACAO_CACHE", ".cache/categorizacao.json")
+# Muda quando a normalização muda (invalida caches como uma regra nova)
+VERSAO = 1
+
+_SEM_CATEGORIA = ""  # no cache: já classificada, nenhuma regra casou
+
+_motores = {}
+_trava = threading.Lock()
+
+
+def normalizar_descricoes(s):
+    # Minúsculas, sem acento, sem números soltos (ids, datas, parcelas) e com
+    # espaços colapsados: "PIX  Padaria São João 0413" -> "pix padaria sao joao"
+    s = s.astype(str).str.lower().str.normalize("NFKD")
+    s = s.str.encode("ascii", "ignore").str.decode("ascii")
+    s = s.str.replace(r"\b\d+\b", " ", regex=True)
+    return s.str.replace(r"\s+", " ", regex=True).str.strip()
+
+
+def normalizar_descricao(texto):
+    return normalizar_descricoes(pd.Series([texto])).iloc[0]
+
+
+def hash_regras(regras):
+    conteudo = json.dumps([VERSAO, regras], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(conteudo.encode("utf-8")).hexdigest()[:16]
+
+
+class Automato:
+    """
+    Aho-Corasick sobre as palavras-chave. `buscar(texto)` devolve o menor
+    índice de regra entre as palavras que aparecem em `texto`, ou None.
+    """
+
+    def __init__(self, palavras):
+        # palavras: pares (texto, índice da regra)
+        self.proximo = [{}]
+        self.regra = [None]
+        for texto, indice in palavras:
+            no = 0
+            for caractere in texto:
+                if caractere not in self.proximo[no]:
+                    self.proximo[no][caractere] = len(self.proximo)
+                    self.proximo.append({})
+                    self.regra.append(None)
+                no = self.proximo[no][caractere]
+            self.regra[no] = indice if self.regra[no] is None else min(self.regra[no], indice)
+
+        # Links de falha em largura; cada nó herda a regra do sufixo mais
+        # longo que também é palavra (fica a de menor índice)
+        self.falha = [0] * len(self.proximo)
+        fila = list(self.proximo[0].values())
+        for no in fila:
+            for caractere, filho in self.proximo[no].items():
+                anterior = self.falha[no]
+                while anterior and caractere not in self.proximo[anterior]:
+                    anterior = self.falha[anterior]
+                destino = self.proximo[anterior].get(caractere, 0)
+                self.falha[filho] = destino if destino != filho else 0
+                herdada = self.regra[self.falha[filho]]
+                if herdada is not None and (self.regra[filho] is None or herdada < self.regra[filho]):
+                    self.regra[filho] = herdada
+                fila.append(filho)
+
+    def buscar(self, texto):
+        proximo, falha, regra = self.proximo, self.falha, self.regra
+        no, melhor = 0, None
+        for caractere in texto:
+            while no and caractere not in proximo[no]:
+                no = falha[no]
+            no = proximo[no].get(caractere, 0)
+            if regra[no] is not None and (melhor is None or regra[no] < melhor):
+                melhor = regra[no]
+        return melhor
+
+
+def compilar(regras):
+    """
+    (autômato das palavras, regex das regras com "regex" ou None). Na regex
+    o lookahead testa todas as posições, cada uma com as regras em ordem.
+    """
+    textos, indices, alternativas = [], [], []
+    for i, regra in enumerate(regras):
+        textos += regra.get("palavras", [])
+        indices += [i] * len(regra.get("palavras", []))
+        if regra.get("regex"):
+            alternativas.append(f"(?P<r{i}>{regra['regex']})")
+        elif not regra.get("palavras"):
+            raise ValueError(f"Regra sem 'palavras' nem 'regex': {regra}")
+    padrao = re.compile(f"(?=(?:{'|'.join(alternativas)}))") if alternativas else None
+    palavras = zip(normalizar_descricoes(pd.Series(textos, dtype=object)), indices)
+    return Automato(palavras), padrao
+
+
+class Categorizador:
+    """
+    Regras compiladas + memo por descrição normalizada. `classificar`
+    devolve a categoria da primeira regra que casa ou None.
+    """
+
+    def __init__(self, regras, cache_path=CATEGORIZACAO_CACHE):
+        self.regras = regras
+        self.hash = hash_regras(regras)
+        self.automato, self.padrao = compilar(regras)
+        self.categorias = [regra["categoria"] for regra in regras]
+        self.cache_path = cache_path
+        self.memo = self._ler_cache()
+        self.novas = 0
+
+    def _ler_cache(self):
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return {}
+        try:
+            with open(self.cache_path, encoding="utf-8") as f:
+                salvo = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return salvo["descricoes"] if salvo.get("regras") == self.hash else {}
+
+    def salvar(self):
+        # Só regrava se algo novo foi classificado; troca atômica do arquivo
+        if not self.cache_path or not self.novas:
+            return
+        os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+        temporario = f"{self.cache_path}.{uuid.uuid4().hex}.tmp"
+        with _trava:
+            conteudo = {"regras": self.hash, "descricoes": dict(self.memo)}
+            self.novas = 0
+        with open(temporario, "w", encoding="utf-8") as f:
+            json.dump(conteudo, f, ensure_ascii=False)
+        os.replace(temporario, self.cache_path)
+
+    def classificar(self, normalizada):
+        categoria = self.memo.get(normalizada)
+        if categoria is None:
+            indices = [self.automato.buscar(normalizada)]
+            if self.padrao is not None:
+                indices += [int(casou.lastgroup[1:]) for casou in self.padrao.finditer(normalizada)]
+            indices = [i for i in indices if i is not None]
+            categoria = self.categorias[min(indices)] if indices else _SEM_CATEGORIA
+            with _trava:
+                self.memo[normalizada] = categoria
+                self.novas += 1
+        return categoria or None
+
+    def categorizar(self, descricoes):
+        """
+        Categoria por regra para cada descrição de `descricoes` (Series),
+        como array de objetos com None onde nenhuma regra casou.
+        """
+        # Distintas primeiro, normalizadas de forma vetorizada, e de novo
+        # distintas depois da normalização ("uber 123" e "uber 456" são uma só)
+        codigos, unicas = pd.factorize(descricoes)
+        codigos_norm, normalizadas = pd.factorize(normalizar_descricoes(pd.Series(unicas, dtype=object)))
+        por_normalizada = np.array([self.classificar(n) for n in normalizadas] + [None], dtype=object)
+        # Código -1 (descrição nula) cai no None do fim
+        por_unica = np.append(por_normalizada[codigos_norm], None)
+        return por_unica[codigos]
+
+
+def categorizador(regras, cache_path=CATEGORIZACAO_CACHE):
+    # Um por conjunto de regras, vivo pelo processo (o memo vale entre lotes)
+    chave = (hash_regras(regras), cache_path)
+    with _trava:
+        if chave not in _motores:
+            _motores[chave] = Categorizador(regras, cache_path)
+        return _motores[chave]
+
+
+def aplicar_regras(df, regras=None, cache_path=CATEGORIZACAO_CACHE):
+    # Categoria da regra onde alguma casa; nas demais fica a do banco. Sem
+    # regras (nem arquivo de regras) não faz nada.
+    regras = carregar_regras() if regras is None else regras
+    if not regras or df.empty:
+        return df["Categoria"]
+
+    motor = categorizador(regras, cache_path)
+    por_regra = motor.categorizar(df["Descrição"])
+    casou = pd.notna(por_regra)
+    contar("descricoes_unicas", int(df["Descrição"].nunique()))
+    contar("linhas_categorizadas_por_regra", int(casou.sum()))
+    motor.salvar()
+    if not casou.any():
+        return df["Categoria"]
+
+    categorias = df["Categoria"].astype(object).to_numpy()
+    return pd.Series(np.where(casou, por_regra, categorias), index=df.index, dtype="category")
@@ -0,0 +1,69 @@
+import threading
+
+from psycopg2.extras import execute_values
+
+# Cache de IDs das dimensões (contas e categorias) por nome, vivo pelo
+# processo inteiro e compartilhado entre lotes, arquivos e threads. Um lote
+# só vai ao banco pelos nomes que ainda não viu, num único INSERT de várias
+# linhas com RETURNING, sem reler as tabelas inteiras.
+#
+# A chave inclui o DSN da conexão: bancos (ou search_path, como o schema dos
+# benchmarks) diferentes não se misturam.
+
+_cache = {}
+_trava = threading.Lock()
+
+SQL_CONTAS = """
+    INSERT INTO tb_contas (nome) VALUES %s
+    ON CONFLICT (nome) DO UPDATE SET nome = EXCLUDED.nome
+    RETURNING id, nome
+"""
+
+# DO UPDATE (sem mudar nada) em vez de DO NOTHING para o RETURNING trazer
+# também as linhas que já existiam. O tipo da categoria existente é mantido.
+SQL_CATEGORIAS = """
+    INSERT INTO tb_categorias (nome, tipo) VALUES %s
+    ON CONFLICT (nome) DO UPDATE SET nome = EXCLUDED.nome
+    RETURNING id, nome
+"""
+
+
+def _ids(cur, tabela, sql, linhas):
+    # `linhas`: tuplas (nome, ...) na ordem das colunas do INSERT
+    chave = (cur.connection.dsn, tabela)
+    with _trava:
+        conhecidos = _cache.setdefault(chave, {})
+        novas = [linha for linha in linhas if linha[0] not in conhecidos]
+    retornados = []
+    if novas:
+        # Ordenadas por nome: cargas concorrentes travam as linhas na mesma ordem
+        novas.sort(key=lambda linha: linha[0])
+        retornados = execute_values(cur, sql, novas, page_size=len(novas), fetch=True)
+    with _trava:
+        conhecidos.update((nome, id) for id, nome in retornados)
+        # Cópia: outra thread pode acrescentar nomes enquanto este lote faz o map
+        return dict(conhecidos)
+
+
+def ids_contas(cur, nomes):
+    return _ids(cur, "tb_contas", SQL_CONTAS, [(str(nome),) for nome in set(nomes)])
+
+
+def ids_categorias(cur, categorias):
+    # `categorias`: pares (nome, tipo). Uma categoria com entrada e saída no
+    # mesmo lote entra uma vez só, com o primeiro tipo (como antes)
+    unicas = {}
+    for nome, tipo in categorias:
+        unicas.setdefault(str(nome), tipo)
+    return _ids(cur, "tb_categorias", SQL_CATEGORIAS, list(unicas.items()))
+
+
+def limpar_cache(conn=None):
+    # Necessário quando a transação que criou IDs novos é desfeita, ou quando
+    # as tabelas são recriadas. Sem `conn` limpa tudo.
+    with _trava:
+        if conn is None:
+            _cache.clear()
+            return
+        for chave in [c for c in _cache if c[0] == conn.dsn]:
+            del _cache[chave]
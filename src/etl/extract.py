@@ -1,7 +1,67 @@
-import pandas as pd
+import glob
+import hashlib
+import os
+
+from src.etl import parser
+from src.storage import parquet
 
 CSV_PATH = "/home/hebertsouza/etl_ctl_financeiro/src/etl/Extrato_2025-12-19_a_2026-01-17_03379339105.csv"
 
-def extract():
+# Cada extrato lido vira um Parquet aqui; a próxima leitura do mesmo arquivo
+# (mesmo caminho, tamanho e mtime) pula o parse do CSV
+EXTRACT_CACHE_DIR = os.getenv("EXTRACT_CACHE_DIR", ".cache/extratos")
+
+# Só as colunas usadas pelo transform; as "Unnamed: N" do extrato nem são lidas
+# (os tipos e a conversão de Data/Valor ficam no parser)
+COLUNAS_EXTRATO = parser.COLUNAS_EXTRATO
+
+
+def extract(path=CSV_PATH, cache=True):
     print("📥 Extraindo CSV...")
-    return pd.read_csv(CSV_PATH)
+    cache_path = caminho_cache(path) if cache and parquet.disponivel() else None
+    if cache_path and os.path.exists(cache_path):
+        print("   ⚡ Usando cache Parquet")
+        return parquet.ler_cache(cache_path)
+
+    df = parser.ler_extrato(path)
+
+    if cache_path:
+        _limpar_cache(path)
+        parquet.gravar_cache(df, cache_path)
+    return df
+
+
+def extract_chunks(path=CSV_PATH, chunksize=100_000):
+    # Lê o extrato em pedaços para manter a memória limitada em arquivos grandes
+    print(f"📥 Extraindo CSV em chunks de {chunksize} linhas...")
+    yield from parser.ler_extrato_chunks(path, chunksize)
+
+
+def chave_arquivo(path):
+    # Identifica uma versão do arquivo sem lê-lo: caminho, tamanho e mtime
+    info = os.stat(path)
+    origem = f"{os.path.abspath(path)}|{info.st_size}|{info.st_mtime_ns}|parser-v{parser.VERSAO}"
+    return hashlib.sha1(origem.encode("utf-8")).hexdigest()[:16]
+
+
+def caminho_cache(path):
+    return os.path.join(EXTRACT_CACHE_DIR, f"{_prefixo_cache(path)}-{chave_arquivo(path)}.parquet")
+
+
+def _prefixo_cache(path):
+    # Nome do arquivo + hash do caminho absoluto: extratos de mesmo nome em
+    # pastas de contas diferentes (extratos/Nubank/extrato.csv e
+    # extratos/Itau/extrato.csv) não disputam o mesmo cache
+    nome = os.path.splitext(os.path.basename(path))[0]
+    caminho = hashlib.sha1(os.path.abspath(path).encode("utf-8")).hexdigest()[:8]
+    return f"{nome}-{caminho}"
+
+
+def _limpar_cache(path):
+    # Remove caches de versões anteriores do mesmo extrato. Outro processo do
+    # pool pode ter apagado o mesmo arquivo antes
+    for antigo in glob.glob(os.path.join(EXTRACT_CACHE_DIR, f"{glob.escape(_prefixo_cache(path))}-*.parquet")):
+        try:
+            os.remove(antigo)
+        except FileNotFoundError:
+            pass
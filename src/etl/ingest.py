@@ -0,0 +1,126 @@
+import argparse
+import fnmatch
+import glob
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+from src.config.contas import CONTA_PADRAO, carregar_contas
+from src.etl.extract import extract
+from src.etl.load import MODOS_CARGA, hash_transacoes, load, preparar_schema
+from src.etl.load_async import carregar_lotes
+from src.etl.metrics import RunMetrics, contar, etapa
+from src.etl.transform import transform
+from src.etl.trava import ETL_LOCK, trava
+
+
+def descobrir_arquivos(origem):
+    # Aceita um diretório (busca *.csv recursivamente) ou um padrão glob
+    if os.path.isdir(origem):
+        origem = os.path.join(origem, "**", "*.csv")
+    return sorted(glob.glob(origem, recursive=True))
+
+
+def inferir_conta(path, contas=None, raiz=None):
+    """
+    Define a conta de um extrato, nesta ordem:
+    1. padrão glob configurado em contas.json que case com o nome do arquivo;
+    2. nome da pasta do arquivo, quando ele está numa subpasta da origem
+       (ex.: extratos/Nubank/fatura.csv -> "Nubank");
+    3. CONTA_PADRAO.
+    """
+    nome = os.path.basename(path)
+    for padrao, conta in (contas or {}).items():
+        if fnmatch.fnmatch(nome, padrao):
+            return conta
+
+    pasta = os.path.dirname(os.path.abspath(path))
+    if raiz and os.path.isdir(raiz) and pasta != os.path.abspath(raiz):
+        return os.path.basename(pasta)
+
+    return CONTA_PADRAO
+
+
+def processar_arquivo(path, conta, cache=True):
+    df = transform(extract(path, cache=cache), conta=conta)
+    # Hash calculado por arquivo: a ocorrência de transações idênticas conta
+    # dentro de um extrato, não na soma de extratos sobrepostos
+    df["Hash"] = hash_transacoes(df)
+    return df
+
+
+def ler_arquivos(arquivos, contas, workers=None, cache=True):
+    # workers=1 processa em sequência no próprio processo
+    if workers == 1:
+        return [processar_arquivo(p, c, cache) for p, c in zip(arquivos, contas)]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(processar_arquivo, arquivos, contas, itertools.repeat(cache)))
+
+
+def carregar_frames(frames, mode="incremental", concorrencia=None):
+    # Extratos sobrepostos trazem as mesmas transações: uma carga só, sem repetidas
+    with etapa("dedup"):
+        df = pd.concat(frames, keys=range(len(frames)))
+        lidas = len(df)
+        contar("linhas_lidas", lidas)
+        df = df[~df["Hash"].duplicated()]
+    contar("linhas_repetidas_entre_extratos", lidas - len(df))
+    with etapa("load"):
+        if concorrencia:
+            lotes = [lote.reset_index(drop=True) for _, lote in df.groupby(level=0, sort=False)]
+            carregar_lotes(lotes, mode=mode, concorrencia=concorrencia)
+        else:
+            preparar_schema()
+            load(df, mode=mode)
+    return df.reset_index(drop=True)
+
+
+def ingest(origem, workers=None, mode="incremental", concorrencia=None):
+    # Com `concorrencia` cada extrato vira um lote carregado em paralelo na
+    # própria transação (load_async); sem ela, uma carga só com tudo junto
+    arquivos = descobrir_arquivos(origem)
+    if not arquivos:
+        print(f"⚠️ Nenhum extrato encontrado em {origem}")
+        return pd.DataFrame()
+
+    config = carregar_contas()
+    contas = [inferir_conta(p, config, raiz=origem) for p in arquivos]
+    print(f"📂 {len(arquivos)} extratos encontrados em {len(set(contas))} contas")
+
+    run = RunMetrics("ingest", origem=origem, arquivos=len(arquivos), modo=mode)
+    try:
+        with run:
+            inicio = time.perf_counter()
+            with etapa("leitura"):
+                frames = ler_arquivos(arquivos, contas, workers=workers)
+            print(f"⏱️ Leitura e transformação em {time.perf_counter() - inicio:.2f}s")
+
+            df = carregar_frames(frames, mode=mode, concorrencia=concorrencia)
+    finally:
+        # Registro gravado também quando a ingestão falha, como no pipeline
+        run.imprimir()
+        run.salvar()
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingestão de vários extratos bancários")
+    parser.add_argument("origem", help="diretório ou padrão glob dos extratos")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="processos para leitura/transformação (1 = sequencial)")
+    parser.add_argument("--mode", choices=MODOS_CARGA, default="incremental")
+    parser.add_argument("--concorrencia", type=int, default=None,
+                        help="carrega os extratos em paralelo com N conexões (requer asyncpg)")
+    args = parser.parse_args()
+
+    with trava() as livre:
+        if not livre:
+            raise SystemExit(f"⏳ Outra carga em andamento ({ETL_LOCK})")
+        ingest(args.origem, workers=args.workers, mode=args.mode, concorrencia=args.concorrencia)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,68 +1,401 @@
+import hashlib
+import io
+import time
+
+import numpy as np
+import pandas as pd
 import psycopg2
 from psycopg2.extras import execute_batch
 from src.config.database import DB_CONFIG
+from src.etl.dimensoes import ids_categorias, ids_contas, limpar_cache
+from src.etl.metrics import contar, etapa
+from src.etl.resumo import atualizar_resumo, meses_do_lote
+from src.etl.schema import garantir_particoes, garantir_schema, nome_particao, truncar_particao
+
+COLUNAS_TRANSACOES = ["data", "descricao", "valor", "tipo", "transação", "conta_id", "categoria_id"]
+MODOS_CARGA = ("copy", "insert", "incremental")
+
+# SQL da carga incremental, compartilhado com o loader assíncrono
+SQL_STAGING = """
+    CREATE TEMP TABLE tmp_transacoes ON COMMIT DROP AS
+    SELECT {colunas} FROM tb_transacoes WITH NO DATA
+"""
+SQL_INSERIR_NOVAS = """
+    INSERT INTO tb_transacoes ({colunas})
+    SELECT {colunas} FROM tmp_transacoes
+    ON CONFLICT (data, hash) DO NOTHING
+"""
+SQL_ATUALIZAR_MARCAS = """
+    INSERT INTO tb_marcas_carga (conta_id, ultima_data)
+    SELECT conta_id, max(data) FROM tmp_transacoes GROUP BY conta_id
+    ON CONFLICT (conta_id) DO UPDATE
+    SET ultima_data = GREATEST(tb_marcas_carga.ultima_data, EXCLUDED.ultima_data),
+        atualizado_em = now()
+"""
+
 
-def load(df):
-    print("📤 Carregando dados no PostgreSQL...")
+def preparar_schema(conn=None):
+    # DDL idempotente uma vez por execução, commitada à parte: o CREATE INDEX
+    # IF NOT EXISTS na tabela-mãe trava inserções concorrentes até o commit,
+    # então não pode ficar dentro da transação de cada lote
+    conexao_propria = conn is None
+    if conexao_propria:
+        conn = psycopg2.connect(**DB_CONFIG)
+    try:
+        with etapa("schema"), conn.cursor() as cur:
+            garantir_schema(cur)
+        conn.commit()
+    finally:
+        if conexao_propria:
+            conn.close()
 
-    conn = psycopg2.connect(**DB_CONFIG)
+
+def load(df, mode="copy", conn=None, marcas=None):
+    # Com `conn` a conexão é do chamador (ex.: pipeline em chunks): cada chamada
+    # faz o próprio commit, mas não fecha a conexão. `marcas` permite fixar as
+    # marcas d'água lidas no início da execução em vez de relê-las a cada lote.
+    # O schema já tem que existir (preparar_schema, uma vez por execução).
+    if mode not in MODOS_CARGA:
+        raise ValueError(f"Modo de carga inválido: {mode!r} (use {', '.join(MODOS_CARGA)})")
+
+    print(f"📤 Carregando dados no PostgreSQL (modo {mode})...")
+
+    conexao_propria = conn is None
+    if conexao_propria:
+        conn = psycopg2.connect(**DB_CONFIG)
     cur = conn.cursor()
 
-    # Inserir contas
-    contas = df["Conta"].unique()
-    cur.executemany(
-        """
-        INSERT INTO tb_contas (nome)
-        VALUES (%s)
-        ON CONFLICT (nome) DO NOTHING
-        """,
-        [(c,) for c in contas]
+    recebidas = len(df)
+    try:
+        if mode == "incremental":
+            with etapa("marcas"):
+                if marcas is None:
+                    marcas = buscar_marcas(cur)
+                df = filtrar_novas(df, marcas)
+
+        inicio = time.perf_counter()
+        carregadas = 0
+        if not df.empty:
+            carregadas = _carregar(cur, df, mode)
+        if carregadas:
+            with etapa("resumo"):
+                atualizar_resumo(cur, meses_do_lote(df))
+
+        with etapa("commit"):
+            conn.commit()
+        duracao = time.perf_counter() - inicio
+    except Exception:
+        # IDs criados nesta transação sumiram com o rollback: o cache não pode guardá-los
+        conn.rollback()
+        limpar_cache(conn)
+        raise
+    finally:
+        cur.close()
+        if conexao_propria:
+            conn.close()
+
+    contar("linhas_inseridas", carregadas)
+    if mode == "incremental":
+        contar("linhas_abaixo_marca", recebidas - len(df))
+        contar("linhas_duplicadas", len(df) - carregadas)
+
+    linhas_s = carregadas / duracao if duracao > 0 else float("inf")
+    if mode == "incremental":
+        print(f"✅ {carregadas} transações novas carregadas de {recebidas} recebidas "
+              f"({recebidas - len(df)} abaixo da marca d'água, "
+              f"{len(df) - carregadas} duplicadas) "
+              f"({duracao:.2f}s, {linhas_s:,.0f} linhas/s, modo {mode})")
+    else:
+        print(f"✅ {carregadas} transações carregadas com sucesso! "
+              f"({duracao:.2f}s, {linhas_s:,.0f} linhas/s, modo {mode})")
+
+    return carregadas
+
+
+def _carregar(cur, df, mode):
+    with etapa("dimensoes"):
+        # IDs do cache do processo; só nomes nunca vistos vão ao banco
+        contas_map = ids_contas(cur, df["Conta"].unique())
+        categorias_map = ids_categorias(cur, df[["Categoria", "Tipo"]].drop_duplicates().itertuples(index=False))
+
+    with etapa("particoes"):
+        garantir_particoes(cur, meses_do_lote(df))
+
+    with etapa("fatos"):
+        # Inserir transações
+        transacoes = montar_transacoes(df, contas_map, categorias_map, com_hash=mode == "incremental")
+
+        if mode == "incremental":
+            return upsert_transacoes(cur, transacoes)
+
+        if mode == "copy":
+            copy_por_particao(cur, transacoes)
+        else:
+            insert_transacoes(cur, transacoes)
+        return len(transacoes)
+
+
+def montar_transacoes(df, contas_map, categorias_map, com_hash=False):
+    # Resolve os IDs com map vetorizado em vez de percorrer linha a linha
+    transacoes = {
+        "data": df["Data"],
+        "descricao": df["Descrição"],
+        "valor": df["Valor"].abs(),
+        "tipo": df["Tipo"],
+        "transação": df["Transação"],
+        # Int64: o map de um categórico vira float quando alguma categoria
+        # sem uso no lote não está no dict, e o COPY recusaria "1.0"
+        "conta_id": df["Conta"].map(contas_map).astype("Int64"),
+        "categoria_id": df["Categoria"].map(categorias_map).astype("Int64"),
+    }
+    transacoes = pd.DataFrame(transacoes, columns=COLUNAS_TRANSACOES)
+    if com_hash:
+        # A ingestão multi-arquivo já traz o hash calculado por arquivo
+        hashes = df["Hash"] if "Hash" in df else hash_transacoes(df)
+        transacoes["hash"] = hashes.to_numpy()
+    return transacoes
+
+
+class Ocorrencias:
+    """
+    Quantas vezes cada chave natural já apareceu num extrato lido em chunks,
+    em arrays numpy ordenados pelo código de 64 bits da chave.
+
+    Com o extrato em ordem de data (crescente ou decrescente) os minutos que
+    já passaram não voltam e as chaves deles são descartadas a cada chunk: o
+    estado fica do tamanho de um chunk. Fora de ordem nada é descartado
+    (24 bytes por chave distinta).
+    """
+
+    def __init__(self):
+        self.codigos = np.empty(0, dtype="uint64")
+        self.vistas = np.empty(0, dtype="int64")
+        self.minutos = np.empty(0, dtype="int64")
+        self.sentido = None  # 1 crescente, -1 decrescente, 0 fora de ordem
+        self.ultimo = None
+        self.piso = self.teto = None
+        self.pico_chaves = self.pico_bytes = 0
+
+    def __len__(self):
+        return len(self.codigos)
+
+    @property
+    def nbytes(self):
+        return self.codigos.nbytes + self.vistas.nbytes + self.minutos.nbytes
+
+    def registrar(self, codigos, minutos):
+        # Devolve, por linha, as ocorrências da chave nos chunks anteriores
+        if (self.piso is not None and minutos.min() < self.piso) or \
+                (self.teto is not None and minutos.max() > self.teto):
+            raise ValueError("Extrato saiu da ordem de data depois de descartar minutos já lidos; "
+                             "carregue sem --chunksize")
+
+        unicos, posicao, contagem = np.unique(codigos, return_inverse=True, return_counts=True)
+        onde = np.searchsorted(self.codigos, unicos)
+        achou = onde < len(self.codigos)
+        achou[achou] = self.codigos[onde[achou]] == unicos[achou]
+        vistas = np.zeros(len(unicos), dtype="int64")
+        vistas[achou] = self.vistas[onde[achou]]
+        self.vistas[onde[achou]] += contagem[achou]
+
+        # O minuto faz parte da chave: qualquer linha serve de representante
+        minuto = np.empty(len(unicos), dtype="int64")
+        minuto[posicao] = minutos
+        novos = ~achou
+        codigos_ = np.concatenate([self.codigos, unicos[novos]])
+        ordem = np.argsort(codigos_, kind="stable")
+        self.codigos = codigos_[ordem]
+        self.vistas = np.concatenate([self.vistas, contagem[novos]])[ordem]
+        self.minutos = np.concatenate([self.minutos, minuto[novos]])[ordem]
+        self.pico_chaves = max(self.pico_chaves, len(self))
+        self.pico_bytes = max(self.pico_bytes, self.nbytes)
+
+        self._descartar_passados(minutos)
+        return vistas[posicao]
+
+    def _descartar_passados(self, minutos):
+        if self.sentido == 0:
+            return
+        passos = np.diff(minutos, prepend=minutos[:1] if self.ultimo is None else self.ultimo)
+        crescente, decrescente = bool((passos >= 0).all()), bool((passos <= 0).all())
+        if crescente and decrescente:
+            pass  # tudo no mesmo minuto: ainda não dá para saber o sentido
+        elif self.sentido is None and (crescente or decrescente):
+            self.sentido = 1 if crescente else -1
+        elif not (crescente if self.sentido == 1 else decrescente if self.sentido == -1 else False):
+            self.sentido = 0
+            return
+        self.ultimo = minutos[-1]
+        if self.sentido == 1:
+            self.piso = self.ultimo
+            manter = self.minutos >= self.piso
+        elif self.sentido == -1:
+            self.teto = self.ultimo
+            manter = self.minutos <= self.teto
+        else:
+            return
+        self.codigos, self.vistas, self.minutos = self.codigos[manter], self.vistas[manter], self.minutos[manter]
+
+
+def hash_transacoes(df, ocorrencias=None):
+    # Chave natural estável: (Data, Descrição, Valor, Transação, Conta).
+    # `ocorrencias` (Ocorrencias) carrega a contagem de um chunk para o
+    # próximo do mesmo extrato; é atualizado aqui
+    if df.empty:
+        return pd.Series([], index=df.index, dtype=object)
+    chave = (
+        df["Data"].dt.strftime("%Y-%m-%d %H:%M")
+        + "|" + df["Descrição"].astype(str)
+        + "|" + df["Valor"].map("{:.2f}".format)
+        + "|" + df["Transação"].astype(str)
+        + "|" + df["Conta"].astype(str)
     )
+    # Transações idênticas no mesmo minuto são legítimas (duas compras iguais);
+    # o número da ocorrência mantém as duas sem quebrar a estabilidade do hash
+    ocorrencia = chave.groupby(chave).cumcount().to_numpy()
+    if ocorrencias is not None:
+        # Código de 64 bits da chave: uma colisão só desloca o contador, o
+        # hash final continua com a chave inteira
+        codigos = pd.util.hash_pandas_object(chave, index=False).to_numpy()
+        minutos = df["Data"].to_numpy().astype("datetime64[m]").astype("int64")
+        ocorrencia = ocorrencia + ocorrencias.registrar(codigos, minutos)
+    chave = chave + "|" + pd.Series(ocorrencia, index=df.index).astype(str)
+    return pd.Series(
+        [hashlib.sha1(c.encode("utf-8")).hexdigest() for c in chave],
+        index=df.index,
+    )
+
 
-    # Inserir categorias
-    categorias = df[["Categoria", "Tipo"]].drop_duplicates()
-    cur.executemany(
+def buscar_marcas(cur):
+    cur.execute(
         """
-        INSERT INTO tb_categorias (nome, tipo)
-        VALUES (%s, %s)
-        ON CONFLICT (nome) DO NOTHING
+        SELECT c.nome, m.ultima_data
+        FROM tb_marcas_carga m
+        JOIN tb_contas c ON c.id = m.conta_id
+        """
+    )
+    return dict(cur.fetchall())
+
+
+def filtrar_novas(df, marcas):
+    # Mantém só o que é igual ou mais recente que a marca d'água da conta.
+    # A própria data da marca entra de novo; o hash descarta o que já existe.
+    if not marcas:
+        return df
+
+    # Conta costuma ser categórica; o map devolve categórico e precisa virar data
+    marca = pd.to_datetime(df["Conta"].map(marcas).astype(object))
+    return df[marca.isna() | (df["Data"] >= marca)]
+
+
+def copy_transacoes(cur, transacoes, tabela="tb_transacoes"):
+    # Serializa o lote em memória e envia tudo em um único COPY
+    buffer = io.StringIO()
+    transacoes.to_csv(buffer, index=False, header=False)
+    buffer.seek(0)
+
+    cur.copy_expert(
+        f"""
+        COPY {tabela} ({", ".join(transacoes.columns)})
+        FROM STDIN WITH (FORMAT csv)
         """,
-        categorias.values.tolist()
+        buffer
     )
 
-    # Buscar IDs
-    cur.execute("SELECT id, nome FROM tb_contas")
-    contas_map = {nome: id for id, nome in cur.fetchall()}
-
-    cur.execute("SELECT id, nome FROM tb_categorias")
-    categorias_map = {nome: id for id, nome in cur.fetchall()}
-
-    # Inserir transações
-    transacoes = [
-        (
-            row["Data"],
-            row["Descrição"],
-            abs(row["Valor"]),
-            row["Tipo"],
-            row["Transação"],
-            contas_map[row["Conta"]],
-            categorias_map[row["Categoria"]]
-        )
-        for _, row in df.iterrows()
-    ]
-
-    # print(transacoes[:5])  # Debug: print first 5 transactions")
 
+def copy_por_particao(cur, transacoes):
+    # Um COPY direto em cada partição mensal, sem o roteamento linha a linha
+    # que o COPY na tabela-mãe faria
+    datas = transacoes["data"]
+    for (ano, mes), grupo in transacoes.groupby([datas.dt.year, datas.dt.month], sort=False):
+        copy_transacoes(cur, grupo, tabela=nome_particao(ano, mes))
+
+
+def insert_transacoes(cur, transacoes):
+    # Caminho alternativo via INSERT, útil quando COPY não está disponível
     sql = """
         INSERT INTO tb_transacoes
         (data, descricao, valor, tipo, transação, conta_id, categoria_id)
         VALUES (%s, %s, %s, %s, %s, %s, %s)
     """
 
-    execute_batch(cur, sql, transacoes, page_size=1000)
+    execute_batch(cur, sql, registros_transacoes(transacoes), page_size=1000)
+
+
+def registros_transacoes(transacoes):
+    # Tuplas com tipos Python (int, float, datetime, str, None), que o
+    # psycopg2 e o asyncpg sabem adaptar; numpy.int64 e pd.NA eles não sabem
+    colunas = (transacoes[c].to_numpy(dtype=object, na_value=None) for c in transacoes.columns)
+    return list(zip(*colunas))
+
+
+def upsert_transacoes(cur, transacoes):
+    # COPY para uma staging temporária e depois um único INSERT ... SELECT
+    # que ignora as chaves já existentes no índice único de hash
+    colunas = ", ".join(transacoes.columns)
+    cur.execute(SQL_STAGING.format(colunas=colunas))
+    copy_transacoes(cur, transacoes, tabela="tmp_transacoes")
+
+    cur.execute(SQL_INSERIR_NOVAS.format(colunas=colunas))
+    carregadas = cur.rowcount
+
+    cur.execute(SQL_ATUALIZAR_MARCAS)
+    return carregadas
+
+
+def recarregar_mes(df, ano, mes, conn=None, contas=None, todas_contas=False, permitir_vazio=False):
+    """
+    Substitui o mês pelas transações de `df` daquele mês: apaga o que há na
+    partição e copia o conteúdo novo, na mesma transação. Serve para
+    reprocessar o mês corrente quando o banco reenvia o extrato corrigido.
+
+    Só as contas em `contas` (por padrão as que aparecem em `df`) são
+    substituídas: o extrato de uma conta não apaga as outras. Com
+    `todas_contas` o lote cobre todas as contas e a partição vai por TRUNCATE.
+    Sem linhas no mês levanta ValueError (mês errado apagaria tudo), a não
+    ser com `permitir_vazio`. Devolve as linhas gravadas.
+    """
+    if not 1 <= mes <= 12:
+        raise ValueError(f"Mês inválido: {mes}")
+    df = df[(df["Data"].dt.year == ano) & (df["Data"].dt.month == mes)]
+    if df.empty and not permitir_vazio:
+        raise ValueError(f"Extrato sem transações em {mes:02d}/{ano}; nada foi apagado "
+                         "(use permitir_vazio para esvaziar o mês)")
+    if contas is None:
+        contas = list(df["Conta"].unique())
+    if not contas and not todas_contas:
+        raise ValueError(f"Nenhuma conta para recarregar em {mes:02d}/{ano}")
+    alvo = "todas as contas" if todas_contas else ", ".join(map(str, contas))
+    print(f"♻️ Recarregando {mes:02d}/{ano} (partição {nome_particao(ano, mes)}, {alvo})...")
+
+    conexao_propria = conn is None
+    if conexao_propria:
+        conn = psycopg2.connect(**DB_CONFIG)
+    preparar_schema(conn)
+    cur = conn.cursor()
+    try:
+        garantir_particoes(cur, [(ano, mes)])
+        contas_map = ids_contas(cur, set(contas) | set(df["Conta"].unique()))
+        categorias_map = ids_categorias(cur, df[["Categoria", "Tipo"]].drop_duplicates().itertuples(index=False))
+        transacoes = montar_transacoes(df, contas_map, categorias_map, com_hash=True)
 
-    conn.commit()
-    cur.close()
-    conn.close()
+        truncar_particao(cur, ano, mes, None if todas_contas else [contas_map[str(c)] for c in contas])
+        colunas = ", ".join(transacoes.columns)
+        cur.execute(SQL_STAGING.format(colunas=colunas))
+        copy_transacoes(cur, transacoes, tabela="tmp_transacoes")
+        cur.execute(f"INSERT INTO {nome_particao(ano, mes)} ({colunas}) SELECT {colunas} FROM tmp_transacoes")
+        gravadas = cur.rowcount
+        cur.execute(SQL_ATUALIZAR_MARCAS)
+        atualizar_resumo(cur, [(ano, mes)])
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        limpar_cache(conn)
+        raise
+    finally:
+        cur.close()
+        if conexao_propria:
+            conn.close()
 
-    print(f"✅ {len(transacoes)} transações carregadas com sucesso!")
+    print(f"✅ {gravadas} transações gravadas em {mes:02d}/{ano}")
+    return gravadas
@@ -0,0 +1,183 @@
+import asyncio
+import random
+
+import psycopg2
+from src.config.database import DB_CONFIG
+from src.etl.dimensoes import ids_categorias, ids_contas
+from src.etl.load import (COLUNAS_TRANSACOES, MODOS_CARGA, SQL_ATUALIZAR_MARCAS, SQL_INSERIR_NOVAS,
+                          SQL_STAGING, buscar_marcas, filtrar_novas, montar_transacoes,
+                          preparar_schema, registros_transacoes)
+from src.etl.metrics import contar, etapa
+from src.etl.resumo import atualizar_resumo, meses_do_lote
+from src.etl.schema import garantir_particoes
+
+try:
+    import asyncpg
+except ImportError:  # asyncpg é opcional
+    asyncpg = None
+
+CONCORRENCIA = 4
+TENTATIVAS = 3
+
+# Carga concorrente de vários lotes independentes (ex.: um por extrato ou
+# conta) sobre um pool asyncpg limitado a `concorrencia` conexões.
+#
+#   1. preparo (síncrono, uma conexão): schema, marcas d'água, IDs das
+#      dimensões pelo cache do processo e montagem das linhas de cada lote.
+#      Resolver as dimensões antes evita lotes concorrentes disputando as
+#      mesmas linhas de tb_contas/tb_categorias.
+#   2. lotes (concorrente): cada lote na própria transação, com nova
+#      tentativa em deadlock, conflito de serialização e queda de conexão.
+#   3. resumo mensal dos meses tocados, uma vez só no fim, em vez de cada
+#      lote recalcular (e disputar) os mesmos meses.
+
+
+def _erros_transitorios():
+    return (asyncpg.exceptions.TransactionRollbackError,   # deadlock, serialização
+            asyncpg.exceptions.PostgresConnectionError,
+            asyncpg.exceptions.ConnectionDoesNotExistError,
+            asyncpg.exceptions.TooManyConnectionsError,
+            OSError)
+
+
+def _conectar_sync(server_settings):
+    opcoes = " ".join(f"-c {chave}={valor}" for chave, valor in (server_settings or {}).items())
+    return psycopg2.connect(**DB_CONFIG, **({"options": opcoes} if opcoes else {}))
+
+
+def _preparar(lotes, mode, server_settings):
+    conn = _conectar_sync(server_settings)
+    try:
+        preparar_schema(conn)
+        with conn.cursor() as cur:
+            marcas = buscar_marcas(cur) if mode == "incremental" else None
+            # Partições de todos os lotes antes: os lotes só inserem
+            garantir_particoes(cur, [m for df in lotes for m in meses_do_lote(df)])
+
+            preparados = []
+            for df in lotes:
+                if marcas is not None:
+                    df = filtrar_novas(df, marcas)
+                if df.empty:
+                    preparados.append((None, []))
+                    continue
+                contas_map = ids_contas(cur, df["Conta"].unique())
+                categorias_map = ids_categorias(cur, df[["Categoria", "Tipo"]].drop_duplicates()
+                                                .itertuples(index=False))
+                transacoes = montar_transacoes(df, contas_map, categorias_map,
+                                               com_hash=mode == "incremental")
+                registros = registros_transacoes(transacoes)
+                preparados.append((registros, meses_do_lote(df)))
+        conn.commit()
+        return preparados
+    finally:
+        conn.close()
+
+
+def _finalizar(meses, server_settings):
+    conn = _conectar_sync(server_settings)
+    try:
+        with conn, conn.cursor() as cur:
+            atualizar_resumo(cur, sorted(meses))
+    finally:
+        conn.close()
+
+
+async def _carregar_lote(pool, registros, mode):
+    colunas = COLUNAS_TRANSACOES + (["hash"] if mode == "incremental" else [])
+    async with pool.acquire() as conn, conn.transaction():
+        if mode == "copy":
+            status = await conn.copy_records_to_table("tb_transacoes", records=registros, columns=colunas)
+            return int(status.split()[-1])
+
+        if mode == "insert":
+            parametros = ", ".join(f"${i}" for i in range(1, len(colunas) + 1))
+            await conn.executemany(
+                f"INSERT INTO tb_transacoes ({', '.join(colunas)}) VALUES ({parametros})",
+                registros
+            )
+            return len(registros)
+
+        lista = ", ".join(colunas)
+        await conn.execute(SQL_STAGING.format(colunas=lista))
+        await conn.copy_records_to_table("tmp_transacoes", records=registros, columns=colunas)
+        status = await conn.execute(SQL_INSERIR_NOVAS.format(colunas=lista))
+        await conn.execute(SQL_ATUALIZAR_MARCAS)
+        return int(status.split()[-1])
+
+
+async def _com_tentativas(pool, indice, registros, mode, tentativas):
+    for tentativa in range(1, tentativas + 1):
+        try:
+            return await _carregar_lote(pool, registros, mode)
+        except _erros_transitorios() as erro:
+            if tentativa == tentativas:
+                raise
+            espera = 0.2 * 2 ** (tentativa - 1) * (1 + random.random())
+            print(f"🔁 Lote {indice}: {type(erro).__name__}, nova tentativa em {espera:.1f}s")
+            await asyncio.sleep(espera)
+
+
+async def carregar_lotes_async(lotes, mode="incremental", concorrencia=CONCORRENCIA,
+                               tentativas=TENTATIVAS, server_settings=None):
+    """
+    Carrega os DataFrames transformados de `lotes` em paralelo, cada um na
+    própria transação. Devolve as linhas carregadas por lote, na ordem de
+    `lotes`.
+
+    Lotes que falham mesmo depois das novas tentativas não impedem os
+    outros: os que deram certo ficam commitados, o resumo é atualizado com
+    eles e as falhas sobem juntas num ExceptionGroup.
+    """
+    if asyncpg is None:
+        raise RuntimeError("A carga assíncrona precisa do asyncpg (pip install asyncpg)")
+    if mode not in MODOS_CARGA:
+        raise ValueError(f"Modo de carga inválido: {mode!r} (use {', '.join(MODOS_CARGA)})")
+
+    print(f"📤 Carregando {len(lotes)} lotes no PostgreSQL (modo {mode}, {concorrencia} conexões)...")
+    with etapa("preparo"):
+        preparados = await asyncio.to_thread(_preparar, lotes, mode, server_settings)
+
+    with etapa("lotes"):
+        async with asyncpg.create_pool(
+            host=DB_CONFIG["host"],
+            port=int(DB_CONFIG["port"]) if DB_CONFIG["port"] else None,
+            database=DB_CONFIG["dbname"],
+            user=DB_CONFIG["user"],
+            password=DB_CONFIG["password"],
+            server_settings=server_settings,
+            min_size=1,
+            max_size=concorrencia,
+        ) as pool:
+            resultados = await asyncio.gather(
+                *(_com_tentativas(pool, i, registros, mode, tentativas)
+                  for i, (registros, _) in enumerate(preparados) if registros),
+                return_exceptions=True
+            )
+
+    carregadas, erros, meses = [], [], set()
+    resultados = iter(resultados)
+    for registros, meses_lote in preparados:
+        resultado = next(resultados) if registros else 0
+        if isinstance(resultado, BaseException):
+            erros.append(resultado)
+            carregadas.append(0)
+            continue
+        carregadas.append(resultado)
+        if resultado:
+            meses.update(meses_lote)
+
+    if meses:
+        with etapa("resumo"):
+            await asyncio.to_thread(_finalizar, meses, server_settings)
+
+    contar("linhas_inseridas", sum(carregadas))
+    print(f"✅ {sum(carregadas)} transações carregadas em {len(lotes) - len(erros)} de {len(lotes)} lotes")
+    if erros:
+        raise BaseExceptionGroup(f"{len(erros)} lotes falharam", erros)
+    return carregadas
+
+
+def carregar_lotes(lotes, **kwargs):
+    # Ponto de entrada síncrono (scripts, ingest, Streamlit)
+    return asyncio.run(carregar_lotes_async(lotes, **kwargs))
@@ -0,0 +1,207 @@
+import contextvars
+import functools
+import json
+import os
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+RUNS_DIR = os.getenv("ETL_RUNS_DIR", "runs")
+
+# Execução corrente. As etapas e contadores registrados fora de uma execução
+# (ex.: load() chamado direto) viram no-op.
+_execucao = contextvars.ContextVar("execucao", default=None)
+_pilha = contextvars.ContextVar("pilha", default=())
+
+
+class RunMetrics:
+    """
+    Métricas de uma execução do ETL: tempo e pico de memória por etapa (com
+    sub-etapas aninhadas, ex.: "load/fatos"), contadores de linhas e um
+    registro JSON ao final.
+
+    Com `memoria=True` o pico alocado por etapa vem do tracemalloc, que
+    enxerga também os buffers do numpy/pandas, mas deixa tudo mais lento.
+    Sem ele fica só o pico de RSS do processo ao fim de cada etapa.
+    """
+
+    def __init__(self, nome="etl", memoria=False, **contexto):
+        self.run_id = uuid.uuid4().hex[:12]
+        self.nome = nome
+        self.memoria = memoria
+        self.contexto = contexto
+        self.etapas = {}
+        self.contadores = {}
+        self.status = "rodando"
+        self.erro = None
+        self.inicio = datetime.now()
+        self._t0 = time.perf_counter()
+        self.duracao = None
+        self._picos = {}
+
+    def _acumular_pico(self):
+        pico = tracemalloc.get_traced_memory()[1]
+        for caminho, atual in self._picos.items():
+            self._picos[caminho] = max(atual, pico)
+
+    def __enter__(self):
+        if self.memoria:
+            tracemalloc.start()
+        self._token = _execucao.set(self)
+        return self
+
+    def __exit__(self, tipo, erro, tb):
+        _execucao.reset(self._token)
+        if self.memoria:
+            tracemalloc.stop()
+        self.duracao = time.perf_counter() - self._t0
+        self.status = "erro" if erro else "ok"
+        self.erro = repr(erro) if erro else None
+        return False
+
+    @contextmanager
+    def etapa(self, nome):
+        caminho = _pilha.get() + (nome,)
+        token = _pilha.set(caminho)
+        # Registrada já na entrada para a etapa vir antes das sub-etapas
+        registro = self.etapas.setdefault("/".join(caminho), {
+            "segundos": 0.0, "chamadas": 0, "pico_rss_mb": None,
+        })
+        if self.memoria:
+            # reset_peak() zera o pico global: antes, repassa o pico atual
+            # para as etapas abertas (as de fora desta)
+            self._acumular_pico()
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+            self._picos[caminho] = base
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            segundos = time.perf_counter() - t0
+            _pilha.reset(token)
+
+            registro["segundos"] += segundos
+            registro["chamadas"] += 1
+            registro["pico_rss_mb"] = pico_rss_mb()
+            if self.memoria:
+                self._acumular_pico()
+                pico = (self._picos.pop(caminho) - base) / 2**20
+                registro["pico_alocado_mb"] = max(registro.get("pico_alocado_mb", 0.0), pico)
+
+    def contar(self, chave, n):
+        self.contadores[chave] = self.contadores.get(chave, 0) + int(n)
+
+    def registro(self):
+        return {
+            "run_id": self.run_id,
+            "nome": self.nome,
+            "status": self.status,
+            "erro": self.erro,
+            "inicio": self.inicio.isoformat(timespec="seconds"),
+            "duracao_s": self.duracao,
+            "pico_rss_mb": pico_rss_mb(),
+            "contexto": self.contexto,
+            "contadores": self.contadores,
+            "etapas": self.etapas,
+        }
+
+    def salvar(self, diretorio=RUNS_DIR):
+        os.makedirs(diretorio, exist_ok=True)
+        path = os.path.join(diretorio, f"{self.inicio:%Y%m%d-%H%M%S}-{self.nome}-{self.run_id}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.registro(), f, ensure_ascii=False, indent=2, default=str)
+        return path
+
+    def imprimir(self):
+        print(f"📊 Resumo da execução {self.run_id} ({self.status})")
+        for chave, valor in self.contadores.items():
+            print(f"   {chave:<28} {valor:>12,}")
+        for nome, etapa in self.etapas.items():
+            recuo = "  " * nome.count("/")
+            linha = f"   {recuo}{nome.rsplit('/', 1)[-1]:<{22 - len(recuo)}} {etapa['segundos']:8.2f}s"
+            if "pico_alocado_mb" in etapa:
+                linha += f"  {etapa['pico_alocado_mb']:8.1f} MB alocados"
+            print(linha)
+        if self.duracao is not None:
+            print(f"   {'total':<22} {self.duracao:8.2f}s")
+        pico = pico_rss_mb()
+        if pico is not None:
+            print(f"   Pico de memória (RSS): {pico:.1f} MB")
+
+
+def pico_rss_mb():
+    # ru_maxrss vem em KB no Linux
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+@contextmanager
+def etapa(nome):
+    execucao = _execucao.get()
+    if execucao is None:
+        yield
+        return
+    with execucao.etapa(nome):
+        yield
+
+
+def contar(chave, n):
+    execucao = _execucao.get()
+    if execucao is not None:
+        execucao.contar(chave, n)
+
+
+def medir(nome):
+    # Decorator: a função inteira vira uma etapa da execução corrente
+    def decorador(func):
+        @functools.wraps(func)
+        def envolvida(*args, **kwargs):
+            with etapa(nome):
+                return func(*args, **kwargs)
+        return envolvida
+    return decorador
+
+
+@contextmanager
+def perfilar(ferramenta, destino):
+    """
+    Perfila o bloco com cProfile (.prof, abre no snakeviz) ou pyinstrument
+    (.html). `ferramenta=None` não faz nada.
+    """
+    if not ferramenta:
+        yield None
+        return
+
+    os.makedirs(os.path.dirname(destino) or ".", exist_ok=True)
+    if ferramenta == "cprofile":
+        import cProfile
+
+        perfil = cProfile.Profile()
+        perfil.enable()
+        try:
+            yield f"{destino}.prof"
+        finally:
+            perfil.disable()
+            perfil.dump_stats(f"{destino}.prof")
+    elif ferramenta == "pyinstrument":
+        from pyinstrument import Profiler
+
+        perfil = Profiler()
+        perfil.start()
+        try:
+            yield f"{destino}.html"
+        finally:
+            perfil.stop()
+            with open(f"{destino}.html", "w", encoding="utf-8") as f:
+                f.write(perfil.output_html())
+    else:
+        raise ValueError(f"Profiler desconhecido: {ferramenta!r} (use cprofile ou pyinstrument)")
@@ -0,0 +1,297 @@
+import csv
+import os
+import re
+import warnings
+
+import numpy as np
+import pandas as pd
+from src.etl.metrics import contar
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pcsv
+except ImportError:  # pyarrow é opcional
+    pa = None
+
+# Parser do extrato bancário. Os tipos são declarados na leitura (nada passa
+# por object), Data e Valor são convertidos de forma vetorizada e linhas
+# malformadas vão para um arquivo de rejeitados em vez de sumirem no dropna.
+#
+# Com pyarrow a leitura usa o leitor CSV dele (multithread); sem ele, o
+# pd.read_csv com os mesmos tipos.
+
+COLUNAS_EXTRATO = ["Data", "Descrição", "Categoria", "Transação", "Valor"]
+FORMATO_DATA = "%d/%m/%Y %H:%M"
+REJEITADOS_DIR = os.getenv("REJEITADOS_DIR", "dados/rejeitados")
+# Muda quando o formato do DataFrame devolvido muda (invalida caches)
+VERSAO = 2
+
+# Data e Valor chegam como texto e são convertidos aqui, onde dá para saber
+# quais linhas falharam
+DTYPES_TEXTO = {
+    "Data": str,
+    "Descrição": str,
+    "Categoria": "category",
+    "Transação": "category",
+    "Valor": str,
+}
+
+_VALOR_VALIDO = r"^[+-]?(\d+\.?\d*|\.\d+)$"
+_LINHA_PULADA = re.compile(r"Skipping line (\d+): (.*)")
+
+
+def ler_extrato(path, decimal="auto", rejeitados_dir=REJEITADOS_DIR):
+    """
+    Lê o extrato inteiro com Data em datetime64 e Valor em float64.
+
+    `decimal` é "," (1.234,56), "." (1,234.56) ou "auto", que decide pelo
+    formato da maioria dos valores. Linhas com número de campos errado,
+    data ou valor inválidos ou campo obrigatório vazio vão para
+    `rejeitados_dir`/<extrato>-rejeitados.csv (None para não gravar).
+    """
+    if pa is not None:
+        df, ruins = _ler_pyarrow(path)
+    else:
+        df, ruins = _ler_pandas(path)
+
+    df, invalidas = converter(df, decimal)
+    gravar_rejeitados(path, ruins + invalidas, rejeitados_dir)
+    return df
+
+
+def ler_extrato_chunks(path, chunksize=100_000, decimal="auto", rejeitados_dir=REJEITADOS_DIR):
+    # Mesmo parse, um pedaço por vez; os rejeitados saem ao fim da leitura.
+    # Em "auto" o separador decimal é decidido pelo primeiro pedaço.
+    rejeitados = []
+    pedacos = _pedacos_pyarrow(path, chunksize, rejeitados) if pa is not None \
+        else _pedacos_pandas(path, chunksize, rejeitados)
+    inicio = 0
+    try:
+        for chunk in pedacos:
+            # Índice contínuo entre pedaços, como no read_csv com chunksize
+            chunk.index = pd.RangeIndex(inicio, inicio + len(chunk))
+            inicio += len(chunk)
+            if decimal == "auto":
+                decimal = detectar_decimal(chunk["Valor"])
+            chunk, invalidas = converter(chunk, decimal)
+            rejeitados += invalidas
+            if len(chunk):
+                yield chunk
+    finally:
+        gravar_rejeitados(path, rejeitados, rejeitados_dir)
+
+
+def _pedacos_pyarrow(path, chunksize, rejeitados):
+    # Leitor em streaming: lotes de ~1 MB juntados até dar `chunksize` linhas
+    leitor = pcsv.open_csv(path, parse_options=_opcoes_parse(rejeitados),
+                           convert_options=_opcoes_conversao())
+    lotes, linhas = [], 0
+    for lote in leitor:
+        lotes.append(lote)
+        linhas += lote.num_rows
+        if linhas >= chunksize:
+            tabela = pa.Table.from_batches(lotes)
+            yield tabela.slice(0, chunksize).to_pandas()
+            resto = tabela.slice(chunksize)
+            lotes, linhas = resto.to_batches(), resto.num_rows
+    tabela = pa.Table.from_batches(lotes, schema=leitor.schema)
+    while tabela.num_rows:
+        yield tabela.slice(0, chunksize).to_pandas()
+        tabela = tabela.slice(chunksize)
+
+
+def _pedacos_pandas(path, chunksize, rejeitados):
+    with pd.read_csv(path, dtype=DTYPES_TEXTO, on_bad_lines="warn", index_col=False,
+                     chunksize=chunksize) as reader:
+        while True:
+            with warnings.catch_warnings(record=True) as avisos:
+                warnings.simplefilter("always", pd.errors.ParserWarning)
+                chunk = next(reader, None)
+            rejeitados += _linhas_puladas(path, avisos)
+            if chunk is None:
+                return
+            yield chunk[COLUNAS_EXTRATO]
+
+
+def _opcoes_parse(rejeitados):
+    def linha_ruim(linha):
+        rejeitados.append({"linha": linha.number, "motivo":
+                           f"esperados {linha.expected_columns} campos, encontrados {linha.actual_columns}",
+                           "conteudo": linha.text})
+        return "skip"
+
+    return pcsv.ParseOptions(invalid_row_handler=linha_ruim)
+
+
+def _opcoes_conversao():
+    categoria = pa.dictionary(pa.int32(), pa.string())
+    return pcsv.ConvertOptions(
+        include_columns=COLUNAS_EXTRATO,
+        column_types={"Data": pa.string(), "Descrição": pa.string(), "Categoria": categoria,
+                      "Transação": categoria, "Valor": pa.string()},
+        strings_can_be_null=True,
+    )
+
+
+def _ler_pyarrow(path):
+    ruins = []
+    tabela = pcsv.read_csv(path, parse_options=_opcoes_parse(ruins), convert_options=_opcoes_conversao())
+    if ruins:
+        # Multithread o leitor não numera as linhas puladas; só com linhas
+        # ruins (raro) relê numa thread para o rejeitado apontar a linha
+        ruins = []
+        tabela = pcsv.read_csv(path, read_options=pcsv.ReadOptions(use_threads=False),
+                               parse_options=_opcoes_parse(ruins), convert_options=_opcoes_conversao())
+    return tabela.to_pandas(), ruins
+
+
+def _ler_pandas(path):
+    # Sem usecols: com ele o pandas não acusa linhas com campos a mais
+    with warnings.catch_warnings(record=True) as avisos:
+        warnings.simplefilter("always", pd.errors.ParserWarning)
+        df = pd.read_csv(path, dtype=DTYPES_TEXTO, on_bad_lines="warn", index_col=False)
+    return df[COLUNAS_EXTRATO], _linhas_puladas(path, avisos)
+
+
+def _linhas_puladas(path, avisos):
+    numeros = {}
+    for aviso in avisos:
+        for numero, motivo in _LINHA_PULADA.findall(str(aviso.message)):
+            numeros[int(numero)] = motivo
+    if not numeros:
+        return []
+    # O aviso do pandas não traz o texto: relê só essas linhas
+    conteudos = {}
+    with open(path, encoding="utf-8") as f:
+        for numero, linha in enumerate(f, start=1):
+            if numero in numeros:
+                conteudos[numero] = linha.rstrip("\r\n")
+    return [{"linha": n, "motivo": m, "conteudo": conteudos.get(n)} for n, m in numeros.items()]
+
+
+def converter(df, decimal="auto"):
+    """
+    Converte Data e Valor (texto) e separa as linhas que não passam.
+    Devolve (df válido, lista de rejeitados).
+    """
+    datas = parse_datas(df["Data"])
+    valores = parse_valores(df["Valor"], decimal)
+
+    # Primeiro motivo que se aplica; campo vazio vem antes de data inválida
+    condicoes = [df[coluna].isna().to_numpy() for coluna in COLUNAS_EXTRATO]
+    condicoes += [datas.isna().to_numpy(), valores.isna().to_numpy()]
+    rotulos = [f"{coluna} vazio" for coluna in COLUNAS_EXTRATO] + ["data inválida", "valor inválido"]
+    motivos = np.select(condicoes, rotulos, default="")
+
+    ruins = motivos != ""
+    rejeitados = []
+    if ruins.any():
+        originais = df.loc[ruins, COLUNAS_EXTRATO].astype(object).where(df.loc[ruins].notna(), "")
+        for (registro, linha), motivo in zip(originais.iterrows(), motivos[ruins]):
+            rejeitados.append({"linha": None, "registro": registro, "motivo": motivo,
+                               "conteudo": ",".join(str(v) for v in linha)})
+
+    df = df.assign(Data=datas, Valor=valores)
+    return df[~ruins], rejeitados
+
+
+def detectar_decimal(s):
+    # Vírgula se mais valores terminam em ",d" / ",dd" do que em ".d" / ".dd";
+    # uma amostra do começo basta
+    texto = s.dropna().head(10_000).astype(str)
+    virgula = texto.str.contains(r",\d{1,2}$").sum()
+    ponto = texto.str.contains(r"\.\d{1,2}$").sum()
+    return "," if virgula > ponto else "."
+
+
+def parse_valores(s, decimal="auto"):
+    # "R$ -1.234,56", "-1234.56" e "1,234.56" viram float; o resto vira NaN
+    if pd.api.types.is_numeric_dtype(s):
+        return s.astype("float64")
+    if decimal == "auto":
+        decimal = detectar_decimal(s)
+    milhar = "." if decimal == "," else ","
+
+    if pa is None:
+        texto = s.astype(str).str.replace(r"R\$|\s", "", regex=True).str.replace(milhar, "", regex=False)
+        if decimal == ",":
+            texto = texto.str.replace(",", ".", regex=False)
+        texto = texto.where(s.notna() & texto.str.match(_VALOR_VALIDO))
+        return pd.to_numeric(texto, errors="coerce").astype("float64")
+
+    texto = pa.array(s, type=pa.string(), from_pandas=True)
+    texto = pc.replace_substring_regex(texto, r"R\$|\s", "")
+    texto = pc.replace_substring(texto, milhar, "")
+    if decimal == ",":
+        texto = pc.replace_substring(texto, ",", ".")
+    valido = pc.match_substring_regex(texto, _VALOR_VALIDO)
+    valores = pc.cast(pc.if_else(valido, texto, pa.scalar(None, pa.string())), pa.float64())
+    return pd.Series(valores.to_numpy(zero_copy_only=False), index=s.index, name=s.name)
+
+
+def parse_datas(s, formato=FORMATO_DATA):
+    # Datas inválidas viram NaT. O strptime do pyarrow é bem mais rápido que o
+    # pd.to_datetime com format, que fica como alternativa sem pyarrow.
+    if pd.api.types.is_datetime64_any_dtype(s):
+        return s
+    if pa is None:
+        return pd.to_datetime(s, format=formato, errors="coerce")
+
+    datas = pc.strptime(pa.array(s, type=pa.string(), from_pandas=True),
+                        format=formato, unit="s", error_is_null=True)
+    return pd.Series(datas.to_numpy(zero_copy_only=False), index=s.index, name=s.name)
+
+
+def localizar_linhas(path, rejeitados):
+    # Os rejeitados na conversão só sabem o `registro` (posição entre as
+    # linhas lidas, sem cabeçalho, linhas em branco e as puladas por número
+    # de campos). Uma passada pelo arquivo traduz para a linha no extrato.
+    faltam = {r["registro"]: r for r in rejeitados if r.get("linha") is None and r.get("registro") is not None}
+    if not faltam:
+        return rejeitados
+    puladas = {r["linha"] for r in rejeitados if r.get("registro") is None}
+    with open(path, newline="", encoding="utf-8") as f:
+        leitor = csv.reader(f)
+        fim, registro = 0, None
+        for campos in leitor:
+            inicio, fim = fim + 1, leitor.line_num
+            if not campos or inicio in puladas:
+                continue
+            if registro is None:
+                registro = 0  # cabeçalho
+                continue
+            if registro in faltam:
+                faltam.pop(registro)["linha"] = inicio
+                if not faltam:
+                    break
+            registro += 1
+    return sorted(rejeitados, key=lambda r: r["linha"] if r["linha"] is not None else float("inf"))
+
+
+def caminho_rejeitados(path, rejeitados_dir=REJEITADOS_DIR):
+    nome = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(rejeitados_dir, f"{nome}-rejeitados.csv")
+
+
+def gravar_rejeitados(path, rejeitados, rejeitados_dir=REJEITADOS_DIR):
+    # Um arquivo por extrato, regravado a cada parse; sem rejeitados, apaga o antigo.
+    # As linhas rejeitadas entram no registro da execução mesmo sem arquivo
+    contar("linhas_rejeitadas", len(rejeitados))
+    if not rejeitados_dir:
+        return None
+    destino = caminho_rejeitados(path, rejeitados_dir)
+    if not rejeitados:
+        if os.path.exists(destino):
+            os.remove(destino)
+        return None
+
+    rejeitados = localizar_linhas(path, rejeitados)
+    os.makedirs(rejeitados_dir, exist_ok=True)
+    with open(destino, "w", newline="", encoding="utf-8") as f:
+        escritor = csv.DictWriter(f, fieldnames=["linha", "registro", "motivo", "conteudo"])
+        escritor.writeheader()
+        for rejeitado in rejeitados:
+            escritor.writerow({"registro": None, **rejeitado})
+    print(f"⚠️ {len(rejeitados)} linhas rejeitadas em {os.path.basename(path)}: veja {destino}")
+    return destino
@@ -0,0 +1,156 @@
+import argparse
+import os
+
+import psycopg2
+from src.analytics.kpis import atualizar_estado, caminho_estado
+from src.config.contas import CONTA_PADRAO, carregar_contas
+from src.config.database import DB_CONFIG
+from src.etl.extract import CSV_PATH, chave_arquivo, extract, extract_chunks
+from src.etl.ingest import inferir_conta
+from src.etl.load import (MODOS_CARGA, Ocorrencias, buscar_marcas, hash_transacoes, load, preparar_schema,
+                          recarregar_mes)
+from src.etl.metrics import RUNS_DIR, RunMetrics, contar, etapa, perfilar
+from src.etl.transform import transform
+from src.etl.trava import ETL_LOCK, trava
+from src.storage.parquet import fingerprint_dataset, gravar_particionado
+
+
+def run_pipeline(path=CSV_PATH, chunksize=None, mode="incremental", parquet_dir=None,
+                 memoria=False, runs_dir=RUNS_DIR, conta=CONTA_PADRAO):
+    """
+    Executa extract -> transform -> load das transações de `conta`.
+
+    Sem `chunksize` o arquivo é lido de uma vez. Com `chunksize` cada pedaço
+    é transformado e commitado assim que chega, usando uma única conexão, e
+    o pico de memória deixa de depender do tamanho do arquivo.
+
+    Com `parquet_dir` as transações transformadas também vão para o
+    armazenamento Parquet particionado por ano/mês, e o estado dos KPIs
+    gravado ao lado soma só o chunk novo.
+
+    Tempo, memória e linhas por etapa (e sub-etapa do load) ficam num
+    registro JSON gravado em `runs_dir` (None para não gravar) mesmo quando
+    a execução falha. O registro também é devolvido.
+    """
+    run = RunMetrics("pipeline", memoria=memoria, arquivo=path, conta=conta, modo=mode,
+                     chunksize=chunksize, parquet=parquet_dir)
+    try:
+        with run:
+            _executar(path, chunksize, mode, parquet_dir, conta)
+    finally:
+        run.imprimir()
+        if runs_dir:
+            print(f"📝 Registro da execução em {run.salvar(runs_dir)}")
+    return run.registro()
+
+
+def _executar(path, chunksize, mode, parquet_dir, conta):
+    if parquet_dir:
+        lote = chave_arquivo(path)
+    chunks = 0
+    # Transações idênticas no mesmo minuto podem cair em chunks diferentes: a
+    # contagem de ocorrências do hash segue pelo arquivo inteiro
+    ocorrencias = Ocorrencias()
+
+    conn = psycopg2.connect(**DB_CONFIG)
+    try:
+        # Schema e marcas uma vez por execução, não a cada chunk
+        preparar_schema(conn)
+        marcas = None
+        if mode == "incremental":
+            # Marcas lidas uma vez só: o extrato não vem ordenado por data, então
+            # a marca avançada por um chunk não pode descartar linhas do próximo
+            with etapa("marcas"), conn.cursor() as cur:
+                marcas = buscar_marcas(cur)
+            conn.commit()
+
+        if chunksize:
+            lotes = extract_chunks(path, chunksize)
+        else:
+            lotes = (extract(path) for _ in range(1))
+        while True:
+            with etapa("extract"):
+                df = next(lotes, None)
+            if df is None:
+                break
+
+            chunks += 1
+            contar("chunks", 1)
+            contar("linhas_lidas", len(df))
+
+            with etapa("transform"):
+                df = transform(df, conta=conta)
+            contar("linhas_transformadas", len(df))
+
+            if parquet_dir:
+                # Nome fixo por extrato + chunk: reprocessar o arquivo sobrescreve
+                with etapa("parquet"):
+                    antes = fingerprint_dataset(parquet_dir)
+                    gravar_particionado(df, parquet_dir, lote=f"{lote}-{chunks}")
+                    # Reprocessamento (lote já somado) ou estado defasado:
+                    # fica para a próxima leitura remontar
+                    atualizar_estado(caminho_estado(parquet_dir), df, antes,
+                                     fingerprint_dataset(parquet_dir), lote=f"{lote}-{chunks}")
+
+            with etapa("load"):
+                if mode == "incremental":
+                    df = df.assign(Hash=hash_transacoes(df, ocorrencias))
+                load(df, mode=mode, conn=conn, marcas=marcas)
+    finally:
+        conn.close()
+        # Estado que atravessa os chunks: fica do tamanho de um chunk com o
+        # extrato em ordem de data
+        contar("ocorrencias_chaves_pico", ocorrencias.pico_chaves)
+        contar("ocorrencias_bytes_pico", ocorrencias.pico_bytes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Executa o ETL do extrato bancário")
+    parser.add_argument("path", nargs="?", default=CSV_PATH)
+    parser.add_argument("--chunksize", type=int, default=None,
+                        help="linhas por chunk; omita para ler o arquivo inteiro")
+    parser.add_argument("--mode", choices=MODOS_CARGA, default="incremental")
+    parser.add_argument("--parquet", metavar="DIR", default=None,
+                        help="também grava as transações em Parquet particionado neste diretório")
+    parser.add_argument("--conta", default=None,
+                        help="conta do extrato; por padrão a de contas.json ou CONTA_PADRAO")
+    parser.add_argument("--recarregar-mes", metavar="AAAA-MM", default=None,
+                        help="substitui as transações da conta neste mês pelo conteúdo do extrato")
+    parser.add_argument("--todas-contas", action="store_true",
+                        help="com --recarregar-mes: o extrato cobre todas as contas e o mês inteiro é substituído")
+    parser.add_argument("--permitir-vazio", action="store_true",
+                        help="com --recarregar-mes: aceita extrato sem linhas no mês e apaga o mês")
+    parser.add_argument("--memoria", action="store_true",
+                        help="mede o pico alocado por etapa com tracemalloc (mais lento)")
+    parser.add_argument("--profile", choices=["cprofile", "pyinstrument"], default=None,
+                        help="grava um perfil da execução em --runs-dir")
+    parser.add_argument("--runs-dir", default=RUNS_DIR,
+                        help="onde gravar os registros JSON das execuções")
+    args = parser.parse_args()
+    conta = args.conta or inferir_conta(args.path, carregar_contas())
+
+    with trava() as livre:
+        if not livre:
+            raise SystemExit(f"⏳ Outra carga em andamento ({ETL_LOCK})")
+
+        if args.recarregar_mes:
+            ano, mes = (int(parte) for parte in args.recarregar_mes.split("-"))
+            try:
+                recarregar_mes(transform(extract(args.path), conta=conta), ano, mes,
+                               contas=None if args.todas_contas else [conta], todas_contas=args.todas_contas,
+                               permitir_vazio=args.permitir_vazio)
+            except ValueError as erro:
+                raise SystemExit(f"❌ {erro}")
+            return
+
+        destino = os.path.join(args.runs_dir, f"perfil-{os.getpid()}")
+        with perfilar(args.profile, destino) as arquivo:
+            run_pipeline(args.path, chunksize=args.chunksize, mode=args.mode,
+                         parquet_dir=args.parquet, memoria=args.memoria, runs_dir=args.runs_dir,
+                         conta=conta)
+        if arquivo:
+            print(f"🔬 Perfil gravado em {arquivo}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import argparse
+
+import psycopg2
+from src.config.database import DB_CONFIG
+from src.etl.schema import garantir_schema
+
+# tb_resumo_mensal guarda as somas por (ano, mês, conta, categoria, tipo).
+# Relatórios mensais leem algumas centenas de linhas daqui em vez do razão
+# inteiro. A carga recalcula só os meses que o lote tocou.
+
+SQL_INSERIR_RESUMO = """
+    INSERT INTO tb_resumo_mensal (ano, mes, conta_id, categoria_id, tipo, total, qtd)
+    SELECT EXTRACT(YEAR FROM t.data)::int,
+           EXTRACT(MONTH FROM t.data)::int,
+           COALESCE(t.conta_id, 0),
+           COALESCE(t.categoria_id, 0),
+           t.tipo,
+           SUM(t.valor),
+           COUNT(*)
+    FROM tb_transacoes t
+    {filtro}
+    GROUP BY 1, 2, 3, 4, 5
+"""
+
+
+def meses_do_lote(df):
+    datas = df["Data"]
+    meses = datas.dt.year.astype("int64") * 100 + datas.dt.month.astype("int64")
+    return sorted({divmod(int(m), 100) for m in meses.unique()})
+
+
+def atualizar_resumo(cur, meses):
+    # Recalcula do zero cada mês tocado; o filtro por faixa de data usa o
+    # índice em tb_transacoes (data)
+    if not meses:
+        return
+    inicios = [f"{ano:04d}-{mes:02d}-01" for ano, mes in meses]
+
+    cur.execute(
+        """
+        DELETE FROM tb_resumo_mensal r
+        USING unnest(%s::int[], %s::int[]) AS m(ano, mes)
+        WHERE r.ano = m.ano AND r.mes = m.mes
+        """,
+        ([ano for ano, _ in meses], [mes for _, mes in meses])
+    )
+    cur.execute(
+        SQL_INSERIR_RESUMO.format(filtro="""
+            JOIN unnest(%s::date[]) AS m(inicio)
+              ON t.data >= m.inicio AND t.data < m.inicio + INTERVAL '1 month'
+        """),
+        (inicios,)
+    )
+
+
+def reconstruir_resumo(cur):
+    cur.execute("TRUNCATE tb_resumo_mensal")
+    cur.execute(SQL_INSERIR_RESUMO.format(filtro=""))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manutenção de tb_resumo_mensal")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="reconstrói o resumo inteiro a partir de tb_transacoes")
+    args = parser.parse_args()
+    if not args.rebuild:
+        parser.print_help()
+        return
+
+    conn = psycopg2.connect(**DB_CONFIG)
+    with conn, conn.cursor() as cur:
+        garantir_schema(cur)
+        reconstruir_resumo(cur)
+        cur.execute("SELECT COUNT(*) FROM tb_resumo_mensal")
+        print(f"✅ Resumo mensal reconstruído: {cur.fetchone()[0]} linhas")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+import argparse
+from datetime import date
+
+# DDL das tabelas usadas pela carga. Tudo é idempotente (IF NOT EXISTS),
+# então pode rodar no início de cada execução.
+#
+# tb_transacoes é particionada por faixa de data, uma partição por mês
+# (tb_transacoes_pAAAA_MM), criadas sob demanda pela carga. Consultas com
+# filtro de data só abrem as partições dos meses pedidos, e um mês pode ser
+# recarregado com TRUNCATE da partição em vez de DELETE linha a linha.
+# Como toda chave única precisa conter a chave de partição, a PK é
+# (id, data) e a deduplicação usa (data, hash).
+SCHEMA_SQL = [
+    """
+    CREATE TABLE IF NOT EXISTS tb_contas (
+        id SERIAL PRIMARY KEY,
+        nome TEXT NOT NULL UNIQUE
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS tb_categorias (
+        id SERIAL PRIMARY KEY,
+        nome TEXT NOT NULL UNIQUE,
+        tipo TEXT
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS tb_transacoes (
+        id SERIAL,
+        data TIMESTAMP NOT NULL,
+        descricao TEXT,
+        valor NUMERIC(14, 2) NOT NULL,
+        tipo TEXT NOT NULL,
+        transação TEXT,
+        conta_id INTEGER REFERENCES tb_contas (id),
+        categoria_id INTEGER REFERENCES tb_categorias (id),
+        -- Chave natural para deduplicar extratos sobrepostos
+        hash TEXT,
+        PRIMARY KEY (id, data)
+    ) PARTITION BY RANGE (data)
+    """,
+    "CREATE UNIQUE INDEX IF NOT EXISTS ux_tb_transacoes_data_hash ON tb_transacoes (data, hash)",
+    # Índices das consultas do dashboard (período, categoria e tipo por período)
+    "CREATE INDEX IF NOT EXISTS ix_tb_transacoes_data ON tb_transacoes (data)",
+    "CREATE INDEX IF NOT EXISTS ix_tb_transacoes_categoria_data ON tb_transacoes (categoria_id, data)",
+    "CREATE INDEX IF NOT EXISTS ix_tb_transacoes_tipo_data ON tb_transacoes (tipo, data)",
+    # Resumo mensal materializado, mantido pela carga (src/etl/resumo.py).
+    # conta_id/categoria_id = 0 agrupam transações sem conta ou categoria.
+    """
+    CREATE TABLE IF NOT EXISTS tb_resumo_mensal (
+        ano SMALLINT NOT NULL,
+        mes SMALLINT NOT NULL,
+        conta_id INTEGER NOT NULL,
+        categoria_id INTEGER NOT NULL,
+        tipo TEXT NOT NULL,
+        total NUMERIC(16, 2) NOT NULL,
+        qtd INTEGER NOT NULL,
+        PRIMARY KEY (ano, mes, conta_id, categoria_id, tipo)
+    )
+    """,
+    # Marca d'água por conta: data da transação mais recente já carregada
+    """
+    CREATE TABLE IF NOT EXISTS tb_marcas_carga (
+        conta_id INTEGER PRIMARY KEY REFERENCES tb_contas (id),
+        ultima_data TIMESTAMP NOT NULL,
+        atualizado_em TIMESTAMP NOT NULL DEFAULT now()
+    )
+    """,
+]
+
+
+COLUNAS_LEGADO = "id, data, descricao, valor, tipo, transação, conta_id, categoria_id, hash"
+
+
+def garantir_schema(cur):
+    # Bancos criados antes do particionamento são migrados na primeira execução
+    legado = _tabela_legada(cur)
+    if legado:
+        _exportar_legado(cur)
+    for sql in SCHEMA_SQL:
+        cur.execute(sql)
+    if legado:
+        _importar_legado(cur)
+
+
+def _tabela_legada(cur):
+    # relkind 'r' = tabela comum; a particionada é 'p'
+    cur.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass('tb_transacoes')")
+    linha = cur.fetchone()
+    return linha is not None and linha[0] == "r"
+
+
+def _exportar_legado(cur):
+    # Copia para uma temporária e apaga a original (com índices, PK e
+    # sequência), liberando os nomes para a tabela particionada. Tudo na
+    # transação do chamador: se algo falhar, nada muda.
+    print("🔧 Migrando tb_transacoes para tabela particionada por mês...")
+    cur.execute("ALTER TABLE tb_transacoes ADD COLUMN IF NOT EXISTS hash TEXT")
+    cur.execute(f"CREATE TEMP TABLE tmp_legado AS SELECT {COLUNAS_LEGADO} FROM tb_transacoes")
+    cur.execute("DROP TABLE tb_transacoes")
+
+
+def _importar_legado(cur):
+    cur.execute("""
+        SELECT DISTINCT EXTRACT(YEAR FROM data)::int, EXTRACT(MONTH FROM data)::int
+        FROM tmp_legado
+    """)
+    garantir_particoes(cur, cur.fetchall())
+    cur.execute(f"INSERT INTO tb_transacoes ({COLUNAS_LEGADO}) SELECT {COLUNAS_LEGADO} FROM tmp_legado")
+    migradas = cur.rowcount
+    # Os ids foram preservados: a sequência continua de onde a antiga parou
+    cur.execute("""
+        SELECT setval(pg_get_serial_sequence('tb_transacoes', 'id'),
+                      COALESCE(MAX(id), 1), MAX(id) IS NOT NULL)
+        FROM tmp_legado
+    """)
+    cur.execute("DROP TABLE tmp_legado")
+    cur.execute("ANALYZE tb_transacoes")
+    print(f"✅ {migradas} transações migradas para as partições mensais")
+
+
+def nome_particao(ano, mes):
+    return f"tb_transacoes_p{ano:04d}_{mes:02d}"
+
+
+def particoes_existentes(cur):
+    cur.execute("""
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'tb_transacoes'::regclass
+    """)
+    return {nome for (nome,) in cur.fetchall()}
+
+
+def garantir_particoes(cur, meses):
+    # `meses`: [(ano, mes), ...]. Só cria as que faltam; uma consulta ao
+    # catálogo por chamada
+    existentes = particoes_existentes(cur)
+    for ano, mes in sorted(set(meses)):
+        nome = nome_particao(ano, mes)
+        if nome in existentes:
+            continue
+        inicio = date(ano, mes, 1)
+        fim = date(ano + mes // 12, mes % 12 + 1, 1)
+        cur.execute(
+            f"CREATE TABLE IF NOT EXISTS {nome} PARTITION OF tb_transacoes FOR VALUES FROM (%s) TO (%s)",
+            (inicio, fim)
+        )
+
+
+def truncar_particao(cur, ano, mes, conta_ids=None):
+    # Esvazia o mês de uma vez; trava só a partição do mês até o commit. Com
+    # `conta_ids` apaga só as transações dessas contas (as outras continuam)
+    nome = nome_particao(ano, mes)
+    if nome not in particoes_existentes(cur):
+        return
+    if conta_ids is None:
+        cur.execute(f"TRUNCATE {nome}")
+    else:
+        cur.execute(f"DELETE FROM {nome} WHERE conta_id = ANY(%s)", (list(conta_ids),))
+
+
+def main():
+    import psycopg2
+    from src.config.database import DB_CONFIG
+
+    parser = argparse.ArgumentParser(description="Cria/atualiza o schema do ETL")
+    parser.add_argument("--particoes", action="store_true",
+                        help="lista as partições mensais de tb_transacoes")
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(**DB_CONFIG)
+    with conn, conn.cursor() as cur:
+        garantir_schema(cur)
+        print("✅ Schema atualizado")
+        if args.particoes:
+            cur.execute("""
+                SELECT c.relname, c.reltuples::bigint
+                FROM pg_inherits i
+                JOIN pg_class c ON c.oid = i.inhrelid
+                WHERE i.inhparent = 'tb_transacoes'::regclass
+                ORDER BY c.relname
+            """)
+            for nome, linhas in cur.fetchall():
+                print(f"   {nome:<28} ~{max(linhas, 0):>10,} linhas")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
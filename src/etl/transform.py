@@ -1,35 +1,58 @@
+import numpy as np
 import pandas as pd
+from src.config.contas import CONTA_PADRAO
+from src.config.settings import VERBOSE
+from src.etl.categorizacao import aplicar_regras
+from src.etl.extract import COLUNAS_EXTRATO
+from src.etl.metrics import contar
+from src.etl.parser import parse_datas, parse_valores
 
-def transform(df: pd.DataFrame) -> pd.DataFrame:
+TIPOS = ["entrada", "saida"]
+
+
+def transform(df: pd.DataFrame, conta: str = CONTA_PADRAO, verbose: int = VERBOSE) -> pd.DataFrame:
     print("🔄 Transformando dados...")
-    print(df.columns)
-    # Padroniza nomes das colunas
-    #df.columns = [c.lower().strip() for c in df.columns]
-
-    df = df.drop(columns=["Unnamed: 4"], errors="ignore")
-    df = df.drop(columns=["Unnamed: 7"], errors="ignore")
-    df = df.drop(columns=["Unnamed: 0"], errors="ignore")
-    df = df.drop(columns=["Unnamed: 5"], errors="ignore")
-    df = df.drop(columns=["Unnamed: 8"], errors="ignore")
-    df = df.drop(columns=["Unnamed: 9"], errors="ignore")
-    #df["Data"] = pd.to_datetime(df["Data"], errors="coerce")
-    #df["Data"] = df["Data"].astype(str)
-    df["Data"] = pd.to_datetime(
-    df["Data"],
-    format="%d/%m/%Y %H:%M",
-    errors="coerce"
-)
+    if verbose >= 1:
+        print(df.columns)
+
+    # Uma única projeção no lugar dos drop() coluna a coluna
+    df = df[COLUNAS_EXTRATO].copy()
+
+    df["Data"] = parse_datas(df["Data"])
     df["Descrição"] = df["Descrição"].str.lower().str.strip()
-    df["Categoria"] = df["Categoria"].str.strip()
-    df["Transação"] = df["Transação"].str.lower().str.strip()
-    df["Valor"] = pd.to_numeric(df["Valor"], errors="coerce")
-    df["Conta"] = "Conta BTG Pactual"
-    df["Tipo"] = df["Valor"].apply(lambda x: "saida" if x < 0 else "entrada")
+    df["Categoria"] = normalizar_categorias(df["Categoria"])
+    # Regras de REGRAS_CATEGORIAS (se houver) sobrepõem a categoria do banco
+    df["Categoria"] = aplicar_regras(df)
+    df["Transação"] = normalizar_categorias(df["Transação"], lower=True)
+    df["Valor"] = parse_valores(df["Valor"])
+    df["Conta"] = pd.Categorical.from_codes(np.zeros(len(df), dtype="int8"), [conta])
+    df["Tipo"] = pd.Categorical.from_codes(
+        np.where(df["Valor"].to_numpy() < 0, 1, 0).astype("int8"), TIPOS
+    )
 
-    print(df)
-    qtd = df.isna().any(axis=1).sum()
-    print("A quantidade de linhas com valores nulos é:", qtd)
+    if verbose >= 2:
+        print(df)
 
+    total = len(df)
     df = df.dropna(subset=["Data", "Valor", "Transação", "Categoria", "Descrição", "Conta"])
+    print("A quantidade de linhas com valores nulos é:", total - len(df))
+    contar("linhas_descartadas_dropna", total - len(df))
 
     return df
+
+
+def normalizar_categorias(s, lower=False):
+    # strip/lower sobre as categorias distintas em vez de cada linha; rótulos
+    # que colidem depois de normalizados (" Lazer" e "Lazer") viram um só
+    s = s.astype("category")
+    if len(s.cat.categories) == 0:
+        return s
+
+    rotulos = s.cat.categories.astype(str).str.strip()
+    if lower:
+        rotulos = rotulos.str.lower()
+
+    codigos_novos, unicos = pd.factorize(rotulos)
+    codigos = s.cat.codes.to_numpy()
+    codigos = np.where(codigos >= 0, codigos_novos[codigos], -1)
+    return pd.Categorical.from_codes(codigos, unicos)
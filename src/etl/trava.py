@@ -0,0 +1,49 @@
+import os
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem trava entre processos
+    fcntl = None
+
+# Trava entre as execuções do ETL (pipeline, ingest e agendador): uma carga
+# por vez, mesmo com o agendador rodando e alguém chamando a CLI à mão
+ETL_LOCK = os.getenv("ETL_LOCK", ".etl.lock")
+
+
+@contextmanager
+def trava(path=ETL_LOCK):
+    """
+    Trava exclusiva, sem esperar, sobre `path`. Devolve False se outra
+    execução já está com ela. O sistema solta a trava se o processo morre,
+    então não sobra arquivo "preso".
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a+") as f, travado(f, esperar=False) as livre:
+        if livre:
+            # PID de quem está com a trava, para quem for investigar
+            f.truncate(0)
+            f.write(f"{os.getpid()}\n")
+            f.flush()
+        yield livre
+
+
+@contextmanager
+def travado(f, esperar=True):
+    """
+    flock exclusivo sobre o arquivo já aberto `f` enquanto durar o bloco
+    (ex.: o CSV de finanças ao acrescentar uma linha). Sem `esperar` devolve
+    False se outro processo já está com ele. Sem fcntl não trava nada.
+    """
+    if fcntl is None:
+        yield True
+        return
+    try:
+        fcntl.flock(f, fcntl.LOCK_EX | (0 if esperar else fcntl.LOCK_NB))
+    except BlockingIOError:
+        yield False
+        return
+    try:
+        yield True
+    finally:
+        fcntl.flock(f, fcntl.LOCK_UN)
@@ -0,0 +1,142 @@
+import os
+import uuid
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow é opcional
+    pa = None
+
+PARQUET_DIR = os.getenv("PARQUET_DIR", "dados/transacoes")
+
+# Armazenamento colunar das transações, particionado em ano=AAAA/mes=M (hive).
+# Colunas categóricas viram dictionary no Parquet e voltam categóricas na
+# leitura; filtros de período, conta e categoria são empurrados para o pyarrow, que pula
+# partições e row groups inteiros.
+
+
+def disponivel():
+    return pa is not None
+
+
+def _exigir_pyarrow():
+    if pa is None:
+        raise RuntimeError("O armazenamento em Parquet precisa do pyarrow (pip install pyarrow)")
+
+
+def gravar_particionado(df, base=PARQUET_DIR, lote=None, substituir=False):
+    """
+    Grava `df` nas partições ano/mes.
+
+    Por padrão acrescenta arquivos às partições. Com `lote` (ex.: hash do
+    extrato de origem) o nome dos arquivos fica fixo, e regravar o mesmo lote
+    sobrescreve os arquivos dele em vez de duplicar. Com `substituir=True`
+    os meses presentes em `df` são trocados inteiros.
+    """
+    _exigir_pyarrow()
+    if df.empty:
+        return
+
+    df = df.assign(ano=df["Data"].dt.year.astype("int16"),
+                   mes=df["Data"].dt.month.astype("int8"))
+    tabela = pa.Table.from_pandas(df, preserve_index=False)
+
+    pq.write_to_dataset(
+        tabela,
+        root_path=base,
+        partition_cols=["ano", "mes"],
+        basename_template=f"{lote or uuid.uuid4().hex}-{{i}}.parquet",
+        existing_data_behavior="delete_matching" if substituir else "overwrite_or_ignore",
+    )
+
+
+def _dataset(base):
+    return ds.dataset(base, format="parquet", partitioning="hive")
+
+
+def _filtro(inicio=None, fim=None, contas=None, categorias=None):
+    # As condições em ano/mes descartam partições sem abrir arquivo; as em
+    # Data/Conta filtram dentro das que sobraram
+    condicoes = []
+    if inicio is not None:
+        inicio = pd.Timestamp(inicio)
+        condicoes.append((ds.field("ano") > inicio.year)
+                         | ((ds.field("ano") == inicio.year) & (ds.field("mes") >= inicio.month)))
+        condicoes.append(ds.field("Data") >= pa.scalar(inicio.to_pydatetime()))
+    if fim is not None:
+        fim = pd.Timestamp(fim)
+        condicoes.append((ds.field("ano") < fim.year)
+                         | ((ds.field("ano") == fim.year) & (ds.field("mes") <= fim.month)))
+        condicoes.append(ds.field("Data") <= pa.scalar(fim.to_pydatetime()))
+    if contas:
+        condicoes.append(ds.field("Conta").isin(list(contas)))
+    if categorias:
+        condicoes.append(ds.field("Categoria").isin(list(categorias)))
+
+    filtro = None
+    for condicao in condicoes:
+        filtro = condicao if filtro is None else filtro & condicao
+    return filtro
+
+
+def ler_particionado(base=PARQUET_DIR, inicio=None, fim=None, contas=None, colunas=None,
+                     categorias=None):
+    _exigir_pyarrow()
+    if not os.path.isdir(base):
+        return pd.DataFrame()
+
+    tabela = _dataset(base).to_table(columns=colunas, filter=_filtro(inicio, fim, contas, categorias))
+    df = tabela.to_pandas()
+    return df.drop(columns=["ano", "mes"], errors="ignore")
+
+
+def ler_em_lotes(base=PARQUET_DIR, inicio=None, fim=None, contas=None, categorias=None,
+                 tamanho=100_000):
+    # Mesmo filtro de ler_particionado, mas em DataFrames de até `tamanho`
+    # linhas: a memória não depende do tamanho do dataset. Um arquivo por vez
+    # e sem threads: o scan do dataset inteiro lê adiante enquanto o consumidor
+    # converte e grava, e o que ele acumula cresce com o histórico
+    _exigir_pyarrow()
+    if not os.path.isdir(base):
+        return
+    dataset = _dataset(base)
+    filtro = _filtro(inicio, fim, contas, categorias)
+    vazio = True
+    for fragmento in dataset.get_fragments(filter=filtro):
+        for lote in fragmento.to_batches(schema=dataset.schema, filter=filtro, batch_size=tamanho,
+                                         use_threads=False):
+            if lote.num_rows:
+                vazio = False
+                yield lote.to_pandas().drop(columns=["ano", "mes"], errors="ignore")
+    if vazio:
+        # Nada no filtro: um lote vazio com as colunas do dataset
+        yield dataset.schema.empty_table().to_pandas().drop(columns=["ano", "mes"], errors="ignore")
+
+
+def fingerprint_dataset(base=PARQUET_DIR):
+    # (arquivos, maior mtime, bytes): muda a cada gravação
+    arquivos = maior = tamanho = 0
+    for raiz, _, nomes in os.walk(base):
+        for nome in nomes:
+            if nome.endswith(".parquet"):
+                info = os.stat(os.path.join(raiz, nome))
+                arquivos += 1
+                maior = max(maior, info.st_mtime_ns)
+                tamanho += info.st_size
+    return (arquivos, maior, tamanho)
+
+
+def gravar_cache(df, path):
+    _exigir_pyarrow()
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temporario = f"{path}.{uuid.uuid4().hex}.tmp"
+    df.to_parquet(temporario, index=False)
+    os.replace(temporario, path)
+
+
+def ler_cache(path):
+    _exigir_pyarrow()
+    return pd.read_parquet(path)
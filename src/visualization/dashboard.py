@@ -1,34 +1,332 @@
+import numpy as np
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-import plotly.subplots as sp
 import streamlit as st
-from datetime import datetime, timedelta
+from dataclasses import replace
+from datetime import date, datetime, timedelta
+from functools import partial
 import calendar
+from src.analytics.aggregates import (
+    DIAS_ORDEM,
+    anos_com_gastos,
+    build_aggregates,
+    hash_conteudo,
+    heatmap_mes_dia,
+    media_mensal,
+    saldo_acumulado,
+    saldo_mensal,
+)
+from src.analytics.amostragem import GRANULARIDADES, MAX_PONTOS, janela, reamostrar, reduzir
+from src.analytics.kpis import kpis
+from src.data.access import (carregar_agregados_csv, carregar_csv, carregar_kpis_csv, exportar_csv,
+                             registrar_transacao_csv)
+from src.data.exportacao import FORMATOS, exportacao_em_cache, formatos_disponiveis, lotes_frame
+from src.data.filtros import SEM_FILTROS, Filtros, filtrar_frame
 
-def show_dashboard(df):
+PADROES_TEMPORAIS = ["📅 Por Dia da Semana", "📆 Por Mês", "📊 Tendência"]
+PERIODOS = {"Tudo": None, "Últimos 30 dias": 30, "Últimos 90 dias": 90,
+            "Últimos 12 meses": 365, "Personalizado": None}
+CATEGORIAS_FORMULARIO = ["Salário", "Investimentos", "Alimentação", "Transporte",
+                         "Moradia", "Lazer", "Saúde", "Educação", "Outros"]
+
+# Cada gráfico sai de uma função memoizada pela fingerprint dos agregados (hash
+# do conteúdo das tabelas compactas). O parâmetro `_agregados` (com sublinhado)
+# fica fora da chave do st.cache_data: só a fingerprint é comparada, então um
+# rerun sem mudança nos dados reaproveita a figura pronta. O plotly só é importado dentro
+# delas: quem abre o app numa tela sem gráfico não paga o import.
+
+
+def _gastos_categoria(agregados):
+    categorias = agregados.categorias
+    return categorias.loc[categorias['qtd_saida'] > 0, 'saida']
+
+
+@st.cache_data(show_spinner=False)
+def figura_saldo(fingerprint, _agregados, granularidade="Diário", inicio=None, fim=None,
+                 webgl=False, max_pontos=MAX_PONTOS):
+    import plotly.graph_objects as go
+
+    # Saldo acumulado ao fim de cada dia, recortado na janela de zoom,
+    # reamostrado na granularidade e reduzido a no máximo `max_pontos`
+    # pontos (LTTB): o payload do gráfico não cresce com o histórico
+    saldo = reduzir(reamostrar(janela(saldo_acumulado(_agregados), inicio, fim), granularidade),
+                    max_pontos)
+    scatter = go.Scattergl if webgl else go.Scatter
+
+    fig_saldo = go.Figure()
+
+    # Área do saldo
+    fig_saldo.add_trace(scatter(
+        x=saldo.index,
+        y=saldo.values,
+        fill='tozeroy',
+        mode='lines',
+        name='Saldo Acumulado',
+        line=dict(color='#2E86AB', width=3),
+        fillcolor='rgba(46, 134, 171, 0.2)'
+    ))
+
+    # Linha de meta (opcional - 20% crescimento anualizado)
+    meta_inicial = saldo.iloc[0]
+    dias = (saldo.index.max() - saldo.index.min()).days
+    meta_final = meta_inicial * (1.2 ** (dias/365))  # 20% ao ano
+    fig_saldo.add_trace(go.Scatter(
+        x=[saldo.index.min(), saldo.index.max()],
+        y=[meta_inicial, meta_final],
+        mode='lines',
+        name='Meta (20% ao ano)',
+        line=dict(color='#A63A50', width=2, dash='dash')
+    ))
+
+    fig_saldo.update_layout(
+        title='Evolução do Patrimônio com Meta',
+        xaxis_title='Data',
+        yaxis_title='Saldo (R$)',
+        hovermode='x unified',
+        template='plotly_white',
+        showlegend=True
+    )
+    return fig_saldo
+
+
+@st.cache_data(show_spinner=False)
+def figura_sankey(fingerprint, _agregados):
+    import plotly.graph_objects as go
+
+    # Preparar dados para Sankey: Entradas -> Saídas/Saldo, Saídas -> Categoria
+    gastos_categoria = _gastos_categoria(_agregados)
+    saldo_atual = _agregados.total_receita - _agregados.total_despesa
+    categorias = list(gastos_categoria.index)
+    labels = ['Entradas', 'Saídas', 'Saldo'] + categorias
+    source = [0, 0] + [1] * len(categorias)
+    target = [1, 2] + [3 + i for i in range(len(categorias))]
+    value = [_agregados.total_despesa, max(saldo_atual, 0)] + list(gastos_categoria.values)
+
+    fig_sankey = go.Figure(data=[go.Sankey(
+        node=dict(
+            pad=15,
+            thickness=20,
+            line=dict(color="black", width=0.5),
+            label=labels,
+            color=['#00CC96', '#EF553B', '#2E86AB'] + ['#FF6B6B'] * len(categorias)
+        ),
+        link=dict(
+            source=source,
+            target=target,
+            value=value,
+            color=['rgba(0, 204, 150, 0.3)', 'rgba(46, 134, 171, 0.3)'] +
+                  ['rgba(255, 107, 107, 0.3)'] * len(categorias)
+        )
+    )])
+
+    fig_sankey.update_layout(title_text="Fluxo do Dinheiro", font_size=10)
+    return fig_sankey
+
+
+@st.cache_data(show_spinner=False)
+def figura_donut(fingerprint, _agregados):
+    import plotly.express as px
+
+    # Agrupar categorias pequenas em "Outros"
+    cat_sums = _gastos_categoria(_agregados).copy()
+    threshold = cat_sums.sum() * 0.05  # 5% threshold
+    main_cats = cat_sums[cat_sums >= threshold]
+    other_sum = cat_sums[cat_sums < threshold].sum()
+
+    if other_sum > 0:
+        main_cats['Outros'] = other_sum
+
+    fig_donut = px.pie(
+        values=main_cats.values,
+        names=main_cats.index,
+        hole=0.4,
+        color_discrete_sequence=px.colors.qualitative.Set3
+    )
+
+    fig_donut.update_traces(
+        textposition='inside',
+        textinfo='percent+label',
+        hovertemplate="<b>%{label}</b><br>R$ %{value:,.2f}<br>%{percent}"
+    )
+    return fig_donut
+
+
+@st.cache_data(show_spinner=False)
+def figura_dia_semana(fingerprint, _agregados):
+    import plotly.express as px
+
+    # Gastos por dia da semana
+    gastos_dia = _agregados.dia_semana
+
+    return px.bar(
+        x=[d[:3] for d in DIAS_ORDEM],
+        y=gastos_dia.values,
+        title="Gastos por Dia da Semana",
+        color=gastos_dia.values,
+        color_continuous_scale='Reds',
+        labels={'x': 'Dia', 'y': 'Valor Gasto (R$)'}
+    )
+
+
+@st.cache_data(show_spinner=False)
+def figura_mensal(fingerprint, _agregados):
+    import plotly.express as px
+    import plotly.graph_objects as go
+
+    # Evolução mensal
+    df_mensal = saldo_mensal(_agregados)
+
+    fig_mes = px.line(
+        df_mensal,
+        x='Data_Ref',
+        y='Saldo_Mensal',
+        title="Evolução Mensal do Saldo",
+        markers=True,
+        line_shape='spline'
+    )
+
+    # Adicionar barras para entrada/saída mensal
+    fig_mes.add_trace(go.Bar(
+        x=df_mensal['Data_Ref'],
+        y=df_mensal['entrada'],
+        name='Entradas',
+        marker_color='#00CC96',
+        opacity=0.3
+    ))
+
+    fig_mes.add_trace(go.Bar(
+        x=df_mensal['Data_Ref'],
+        y=-df_mensal['saida'],
+        name='Saídas',
+        marker_color='#EF553B',
+        opacity=0.3
+    ))
+
+    fig_mes.update_layout(barmode='overlay')
+    return fig_mes
+
+
+@st.cache_data(show_spinner=False)
+def figura_heatmap(fingerprint, _agregados, ano=None):
+    import plotly.express as px
+
+    # Um ano por vez: o mesmo mês de anos diferentes não se soma
+    return px.imshow(
+        heatmap_mes_dia(_agregados, ano),
+        labels=dict(x="Dia do Mês", y="Mês", color="Valor Gasto"),
+        color_continuous_scale='Reds',
+        aspect='auto'
+    )
+
+
+def relatorio_resumido(agregados):
+    total_receita = agregados.total_receita
+    total_despesa = agregados.total_despesa
+    saldo_atual = total_receita - total_despesa
+    margem_lucro = (saldo_atual / total_receita * 100) if total_receita > 0 else 0
+    taxa_poupanca = (saldo_atual / total_receita * 100) if total_receita > 0 else 0
+
+    # Linhas numa lista e um join no fim, em vez de concatenar string
+    linhas = [
+        "📋 RELATÓRIO FINANCEIRO",
+        f"Data: {datetime.now().strftime('%d/%m/%Y')}",
+        f"Período: {agregados.diario.index.min().strftime('%d/%m/%Y')} a "
+        f"{agregados.diario.index.max().strftime('%d/%m/%Y')}",
+        "",
+        "📈 MÉTRICAS PRINCIPAIS:",
+        f"• Total Entradas: R$ {total_receita:,.2f}",
+        f"• Total Saídas: R$ {total_despesa:,.2f}",
+        f"• Saldo Líquido: R$ {saldo_atual:,.2f}",
+        f"• Margem de Lucro: {margem_lucro:.1f}%",
+        f"• Taxa de Poupança: {taxa_poupanca:.1f}%",
+        "",
+        "🏆 TOP 3 CATEGORIAS DE GASTO:",
+    ]
+    top_cats = _gastos_categoria(agregados).nlargest(3)
+    for i, (cat, valor) in enumerate(top_cats.items(), 1):
+        percentual = (valor / total_despesa * 100) if total_despesa > 0 else 0
+        linhas.append(f"{i}. {cat}: R$ {valor:,.2f} ({percentual:.1f}%)")
+    return "\n".join(linhas) + "\n"
+
+
+def filtros_sidebar(agregados, contas=()):
+    """
+    Filtros de período, conta e categoria na barra lateral. `agregados` (sem
+    filtro) informa as datas e categorias disponíveis; `contas` vazio
+    esconde o filtro de conta (origens sem essa coluna).
+    """
+    if agregados is None or agregados.vazio:
+        return SEM_FILTROS
+
+    st.sidebar.markdown("### 🔎 Filtros")
+    primeiro_dia = agregados.diario.index[0].date()
+    ultimo_dia = agregados.diario.index[-1].date()
+
+    periodo = st.sidebar.selectbox("Período", list(PERIODOS), key="filtro_periodo")
+    inicio = fim = None
+    if periodo == "Personalizado":
+        escolha = st.sidebar.date_input("De / até", (primeiro_dia, ultimo_dia), min_value=primeiro_dia,
+                                        max_value=ultimo_dia, format="DD/MM/YYYY", key="filtro_datas")
+        # Enquanto só a primeira data foi escolhida vem um item só
+        if len(escolha) == 2:
+            inicio, fim = escolha
+    elif PERIODOS[periodo]:
+        # Contados a partir da transação mais recente, não de hoje
+        inicio = ultimo_dia - timedelta(days=PERIODOS[periodo] - 1)
+
+    contas_escolhidas = st.sidebar.multiselect("Contas", list(contas), key="filtro_contas") if len(contas) else []
+    categorias = st.sidebar.multiselect("Categorias", list(agregados.categorias.index), key="filtro_categorias")
+    return Filtros(inicio, fim, tuple(contas_escolhidas), tuple(categorias))
+
+
+def _exportar_frame(df, formato):
+    # DataFrame em memória (sem origem para ler em lotes): o hash do conteúdo,
+    # calculado só no clique, faz o papel de versão dos dados
+    return exportacao_em_cache("memoria", formato, versao=hash_conteudo(df), lotes=lotes_frame(df))
+
+
+def _arquivo_exportado(exportar, formato):
+    # Só roda no clique do download (o Streamlit chama a função nessa hora);
+    # com os mesmos filtros e sem transação nova o arquivo já está pronto
+    with open(exportar(formato), 'rb') as f:
+        return f.read()
+
+
+def show_dashboard(df=None, agregados=None, exportar=None, estado_kpis=None):
     # ----------- Preparação dos dados ----------- #
-    df['Data'] = pd.to_datetime(df['Data'])
-    df['Mês'] = df['Data'].dt.month
-    df['Ano'] = df['Data'].dt.year
-    df['Mês_Nome'] = df['Data'].dt.strftime('%b')
-    df['Dia_Semana'] = df['Data'].dt.day_name()
-    df['Semana'] = df['Data'].dt.isocalendar().week
-    df['Trimestre'] = df['Data'].dt.quarter
-    
+    # Tudo abaixo sai das tabelas compactas de `agregados`; `df` só é
+    # necessário para montá-las e para a exportação completa. Sem `df`, a
+    # exportação chama `exportar(formato)`, que devolve o caminho do arquivo
+    # gerado em lotes a partir da origem (src.data.exportacao).
+    # Com `estado_kpis` (src.analytics.kpis) os cartões vêm do estado
+    # incremental gravado ao lado dos dados.
+    if agregados is None:
+        agregados = build_aggregates(df)
+
+    if agregados.vazio:
+        st.title("💰 Dashboard Financeiro Inteligente")
+        st.info("Nenhuma transação para exibir.")
+        return
+
+    fingerprint = agregados.fingerprint
+
     # Cálculos Rápidos
-    df_entradas = df[df['Tipo'] == 'entrada']
-    df_saidas = df[df['Tipo'] == 'saida']
-    
-    total_receita = df_entradas['Valor'].sum()
-    total_despesa = df_saidas['Valor'].sum()
+    categorias_saida = agregados.categorias.loc[agregados.categorias['qtd_saida'] > 0]
+    
+    if estado_kpis is not None:
+        indicadores = kpis(estado_kpis)
+        total_receita = indicadores['total_receita']
+        total_despesa = indicadores['total_despesa']
+        media_mensal_entrada = indicadores['media_mensal_entrada']
+        media_mensal_saida = indicadores['media_mensal_saida']
+    else:
+        total_receita = agregados.total_receita
+        total_despesa = agregados.total_despesa
+        # Médias
+        media_mensal_entrada = media_mensal(agregados, 'entrada')
+        media_mensal_saida = media_mensal(agregados, 'saida')
     saldo_atual = total_receita - total_despesa
     margem_lucro = (saldo_atual / total_receita * 100) if total_receita > 0 else 0
     
-    # Médias
-    media_mensal_entrada = df_entradas.groupby(df_entradas['Data'].dt.to_period('M'))['Valor'].sum().mean()
-    media_mensal_saida = df_saidas.groupby(df_saidas['Data'].dt.to_period('M'))['Valor'].sum().mean()
-    
     # ----------- Dashboard ----------- #
     st.title("💰 Dashboard Financeiro Inteligente")
     
@@ -67,46 +365,25 @@ def show_dashboard(df):
     # 2. Gráfico de Evolução com área sombreada e meta
     st.subheader("📈 Evolução Patrimonial")
     
-    # Calcular saldo acumulado
-    df['Valor_Ajustado'] = df.apply(lambda x: x['Valor'] if x['Tipo'] == 'entrada' else -x['Valor'], axis=1)
-    df_sorted = df.sort_values('Data')
-    df_sorted['Saldo_Acumulado'] = df_sorted['Valor_Ajustado'].cumsum()
-    
-    fig_saldo = go.Figure()
-    
-    # Área do saldo
-    fig_saldo.add_trace(go.Scatter(
-        x=df_sorted['Data'],
-        y=df_sorted['Saldo_Acumulado'],
-        fill='tozeroy',
-        mode='lines',
-        name='Saldo Acumulado',
-        line=dict(color='#2E86AB', width=3),
-        fillcolor='rgba(46, 134, 171, 0.2)'
-    ))
-    
-    # Linha de meta (opcional - 20% crescimento anualizado)
-    meta_inicial = df_sorted['Saldo_Acumulado'].iloc[0] if len(df_sorted) > 0 else 0
-    dias = (df_sorted['Data'].max() - df_sorted['Data'].min()).days
-    meta_final = meta_inicial * (1.2 ** (dias/365))  # 20% ao ano
-    fig_saldo.add_trace(go.Scatter(
-        x=[df_sorted['Data'].min(), df_sorted['Data'].max()],
-        y=[meta_inicial, meta_final],
-        mode='lines',
-        name='Meta (20% ao ano)',
-        line=dict(color='#A63A50', width=2, dash='dash')
-    ))
-    
-    fig_saldo.update_layout(
-        title='Evolução do Patrimônio com Meta',
-        xaxis_title='Data',
-        yaxis_title='Saldo (R$)',
-        hovermode='x unified',
-        template='plotly_white',
-        showlegend=True
-    )
+    # Zoom e granularidade refazem a redução no servidor: mais detalhe num
+    # período curto sem mandar o histórico inteiro para o navegador
+    primeiro_dia = agregados.diario.index[0].date()
+    ultimo_dia = agregados.diario.index[-1].date()
+    col1, col2, col3 = st.columns([3, 1, 1])
+    with col1:
+        if primeiro_dia < ultimo_dia:
+            inicio, fim = st.slider("Período", primeiro_dia, ultimo_dia, (primeiro_dia, ultimo_dia),
+                                    format="DD/MM/YYYY", key="zoom_saldo")
+        else:
+            inicio, fim = primeiro_dia, ultimo_dia
+    with col2:
+        granularidade = st.selectbox("Granularidade", list(GRANULARIDADES), key="granularidade_saldo")
+    with col3:
+        webgl = st.toggle("WebGL", value=len(agregados.diario) > MAX_PONTOS, key="webgl_saldo",
+                          help="Desenha com Scattergl (mais leve com muitos pontos)")
     
-    st.plotly_chart(fig_saldo, use_container_width=True)
+    st.plotly_chart(figura_saldo(fingerprint, agregados, granularidade, inicio, fim, webgl),
+                    use_container_width=True)
     
     # 3. Análise comparativa mensal
     st.subheader("📊 Análise Mensal Detalhada")
@@ -116,81 +393,23 @@ def show_dashboard(df):
     with col1:
         # Gráfico de Sankey para fluxo de dinheiro
         st.markdown("**🔀 Fluxo Financeiro**")
-        
-        # Preparar dados para Sankey
-        labels = ['Entradas', 'Saídas', 'Saldo'] + list(df_saidas['Categoria'].unique())
-        source = [0, 0]  # Entradas -> Saídas, Entradas -> Saldo
-        target = [1, 2]
-        value = [total_despesa, saldo_atual]
-        
-        # Adicionar categorias de despesas
-        for i, (cat, val) in enumerate(df_saidas.groupby('Categoria')['Valor'].sum().items()):
-            labels.append(cat)
-            source.append(1)  # Saídas -> Categoria
-            target.append(2 + i)  # Índice da categoria
-            value.append(val)
-        
-        fig_sankey = go.Figure(data=[go.Sankey(
-            node=dict(
-                pad=15,
-                thickness=20,
-                line=dict(color="black", width=0.5),
-                label=labels,
-                color=['#00CC96', '#EF553B', '#2E86AB'] + ['#FF6B6B'] * len(df_saidas['Categoria'].unique())
-            ),
-            link=dict(
-                source=source,
-                target=target,
-                value=value,
-                color=['rgba(0, 204, 150, 0.3)', 'rgba(46, 134, 171, 0.3)'] + 
-                      ['rgba(255, 107, 107, 0.3)'] * len(df_saidas['Categoria'].unique())
-            )
-        )])
-        
-        fig_sankey.update_layout(title_text="Fluxo do Dinheiro", font_size=10)
-        st.plotly_chart(fig_sankey, use_container_width=True)
+        st.plotly_chart(figura_sankey(fingerprint, agregados), use_container_width=True)
     
     with col2:
         # Pizza donut para distribuição
         st.markdown("**📦 Distribuição por Categoria**")
-        
-        # Agrupar categorias pequenas em "Outros"
-        cat_sums = df_saidas.groupby('Categoria')['Valor'].sum()
-        threshold = cat_sums.sum() * 0.05  # 5% threshold
-        main_cats = cat_sums[cat_sums >= threshold]
-        other_sum = cat_sums[cat_sums < threshold].sum()
-        
-        if other_sum > 0:
-            main_cats['Outros'] = other_sum
-        
-        fig_donut = px.pie(
-            values=main_cats.values,
-            names=main_cats.index,
-            hole=0.4,
-            color_discrete_sequence=px.colors.qualitative.Set3
-        )
-        
-        fig_donut.update_traces(
-            textposition='inside',
-            textinfo='percent+label',
-            hovertemplate="<b>%{label}</b><br>R$ %{value:,.2f}<br>%{percent}"
-        )
-        
-        st.plotly_chart(fig_donut, use_container_width=True)
+        st.plotly_chart(figura_donut(fingerprint, agregados), use_container_width=True)
     
     # 4. Tabela interativa com transações recentes
     st.subheader("📝 Últimas Transações")
     
-    # Ordenar por data decrescente
-    df_recent = df.sort_values('Data', ascending=False).head(10)
+    df_recent = agregados.recentes.copy()
     
     # Formatar valores
-    df_recent['Valor_Formatado'] = df_recent.apply(
-        lambda x: f"R$ {x['Valor']:,.2f}", axis=1
-    )
+    df_recent['Valor_Formatado'] = df_recent['Valor'].map("R$ {:,.2f}".format)
     
     # Adicionar ícones baseados no tipo
-    df_recent['Tipo_Icon'] = df_recent['Tipo'].map({
+    df_recent['Tipo_Icon'] = df_recent['Tipo'].astype(str).map({
         'entrada': '💰',
         'saida': '💸'
     })
@@ -210,92 +429,24 @@ def show_dashboard(df):
     # 5. Análise temporal
     st.subheader("⏰ Padrões Temporais")
     
-    tab1, tab2, tab3 = st.tabs(["📅 Por Dia da Semana", "📆 Por Mês", "📊 Tendência"])
-    
-    with tab1:
-        # Gastos por dia da semana
-        dias_ordem = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-        df_saidas['Dia_Semana'] = pd.Categorical(df_saidas['Dia_Semana'], categories=dias_ordem, ordered=True)
-        gastos_dia = df_saidas.groupby('Dia_Semana')['Valor'].sum().reindex(dias_ordem)
-        
-        fig_dia = px.bar(
-            x=[d[:3] for d in dias_ordem],
-            y=gastos_dia.values,
-            title="Gastos por Dia da Semana",
-            color=gastos_dia.values,
-            color_continuous_scale='Reds',
-            labels={'x': 'Dia', 'y': 'Valor Gasto (R$)'}
-        )
-        st.plotly_chart(fig_dia, use_container_width=True)
-    
-    with tab2:
-        # Evolução mensal
-        df_mensal = df.groupby(['Ano', 'Mês'])['Valor_Ajustado'].sum().reset_index()
-        df_mensal['Data_Ref'] = df_mensal.apply(
-            lambda x: datetime(x['Ano'], x['Mês'], 1), axis=1
-        )
-        df_mensal = df_mensal.sort_values('Data_Ref')
-        df_mensal['Saldo_Mensal'] = df_mensal['Valor_Ajustado'].cumsum()
-        
-        fig_mes = px.line(
-            df_mensal,
-            x='Data_Ref',
-            y='Saldo_Mensal',
-            title="Evolução Mensal do Saldo",
-            markers=True,
-            line_shape='spline'
-        )
-        
-        # Adicionar barras para entrada/saída mensal
-        df_mensal_det = df.groupby(['Ano', 'Mês', 'Tipo'])['Valor'].sum().unstack().fillna(0)
-        df_mensal_det['Data_Ref'] = [datetime(ano, mes, 1) for ano, mes in df_mensal_det.index]
-        
-        fig_mes.add_trace(go.Bar(
-            x=df_mensal_det['Data_Ref'],
-            y=df_mensal_det.get('entrada', 0),
-            name='Entradas',
-            marker_color='#00CC96',
-            opacity=0.3
-        ))
-        
-        fig_mes.add_trace(go.Bar(
-            x=df_mensal_det['Data_Ref'],
-            y=-df_mensal_det.get('saida', 0),
-            name='Saídas',
-            marker_color='#EF553B',
-            opacity=0.3
-        ))
-        
-        fig_mes.update_layout(barmode='overlay')
-        st.plotly_chart(fig_mes, use_container_width=True)
+    # Seletor em vez de st.tabs: as abas executam todas a cada rerun, aqui só
+    # a visão escolhida é montada
+    padrao = st.segmented_control("Visão", PADROES_TEMPORAIS, default=PADROES_TEMPORAIS[0],
+                                  key="padrao_temporal", label_visibility="collapsed")
     
-    with tab3:
+    if padrao == PADROES_TEMPORAIS[1]:
+        st.plotly_chart(figura_mensal(fingerprint, agregados), use_container_width=True)
+    elif padrao == PADROES_TEMPORAIS[2]:
         # Heatmap de gastos
         st.markdown("**🔥 Heatmap de Gastos Diários**")
-        
-        # Criar heatmap
-        df_saidas['Dia'] = df_saidas['Data'].dt.day
-        heatmap_data = df_saidas.pivot_table(
-            index='Mês_Nome',
-            columns='Dia',
-            values='Valor',
-            aggfunc='sum',
-            fill_value=0
-        )
-        
-        # Ordenar meses
-        meses_ordem = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 
-                      'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
-        heatmap_data = heatmap_data.reindex([m for m in meses_ordem if m in heatmap_data.index])
-        
-        fig_heat = px.imshow(
-            heatmap_data,
-            labels=dict(x="Dia do Mês", y="Mês", color="Valor Gasto"),
-            color_continuous_scale='Reds',
-            aspect='auto'
-        )
-        
-        st.plotly_chart(fig_heat, use_container_width=True)
+        anos = anos_com_gastos(agregados)
+        if anos:
+            ano = st.selectbox("Ano", anos, key="ano_heatmap")
+            st.plotly_chart(figura_heatmap(fingerprint, agregados, ano), use_container_width=True)
+        else:
+            st.info("Nenhuma saída no período para montar o heatmap")
+    else:
+        st.plotly_chart(figura_dia_semana(fingerprint, agregados), use_container_width=True)
     
     # 6. Insights automáticos
     st.subheader("🤖 Insights Inteligentes")
@@ -304,20 +455,20 @@ def show_dashboard(df):
     insights = []
     
     # Maior gasto
-    if not df_saidas.empty:
-        maior_gasto = df_saidas.loc[df_saidas['Valor'].idxmax()]
+    maior_gasto = agregados.maior_gasto
+    if maior_gasto is not None:
         insights.append(f"⚠️ **Maior gasto**: {maior_gasto['Categoria']} - R$ {maior_gasto['Valor']:,.2f} em {maior_gasto['Data'].strftime('%d/%m/%Y')}")
     
     # Categoria mais frequente
-    if not df_saidas.empty:
-        cat_frequente = df_saidas['Categoria'].mode()[0]
-        freq = (df_saidas['Categoria'] == cat_frequente).sum()
+    if not categorias_saida.empty:
+        cat_frequente = categorias_saida['qtd_saida'].idxmax()
+        freq = categorias_saida.loc[cat_frequente, 'qtd_saida']
         insights.append(f"🔁 **Categoria mais frequente**: {cat_frequente} ({freq} transações)")
     
     # Dia com mais gastos
-    if not df_saidas.empty:
-        dia_mais_gasto = df_saidas.groupby('Dia_Semana')['Valor'].sum().idxmax()
-        valor_dia = df_saidas.groupby('Dia_Semana')['Valor'].sum().max()
+    if total_despesa > 0:
+        dia_mais_gasto = agregados.dia_semana.idxmax()
+        valor_dia = agregados.dia_semana.max()
         insights.append(f"📅 **Dia de maior gasto**: {dia_mais_gasto} (R$ {valor_dia:,.2f})")
     
     # Meta de poupança
@@ -334,48 +485,68 @@ def show_dashboard(df):
     st.markdown("---")
     st.subheader("📥 Exportar Relatório")
     
+    # Os arquivos são gerados no clique (data como função), não a cada rerun
     col1, col2 = st.columns(2)
     
     with col1:
-        if st.button("📊 Gerar Relatório Resumido", use_container_width=True):
-            # Criar relatório resumido
-            relatorio = f"""
-            📋 RELATÓRIO FINANCEIRO
-            Data: {datetime.now().strftime('%d/%m/%Y')}
-            Período: {df['Data'].min().strftime('%d/%m/%Y')} a {df['Data'].max().strftime('%d/%m/%Y')}
-            
-            📈 MÉTRICAS PRINCIPAIS:
-            • Total Entradas: R$ {total_receita:,.2f}
-            • Total Saídas: R$ {total_despesa:,.2f}
-            • Saldo Líquido: R$ {saldo_atual:,.2f}
-            • Margem de Lucro: {margem_lucro:.1f}%
-            • Taxa de Poupança: {taxa_poupanca:.1f}%
-            
-            🏆 TOP 3 CATEGORIAS DE GASTO:
-            """
-            
-            top_cats = df_saidas.groupby('Categoria')['Valor'].sum().nlargest(3)
-            for i, (cat, valor) in enumerate(top_cats.items(), 1):
-                percentual = (valor / total_despesa * 100) if total_despesa > 0 else 0
-                relatorio += f"{i}. {cat}: R$ {valor:,.2f} ({percentual:.1f}%)\n"
-            
-            st.download_button(
-                label="⬇️ Baixar Relatório (.txt)",
-                data=relatorio,
-                file_name=f"relatorio_financeiro_{datetime.now().strftime('%Y%m%d')}.txt",
-                mime="text/plain"
-            )
-    
-    with col2:
-        # Opção para exportar dados
-        csv = df.to_csv(index=False).encode('utf-8')
         st.download_button(
-            label="📁 Exportar Dados Completos (.csv)",
-            data=csv,
-            file_name=f"dados_financeiros_{datetime.now().strftime('%Y%m%d')}.csv",
-            mime="text/csv",
+            label="📊 Baixar Relatório Resumido (.txt)",
+            data=lambda: relatorio_resumido(agregados),
+            file_name=f"relatorio_financeiro_{datetime.now().strftime('%Y%m%d')}.txt",
+            mime="text/plain",
+            on_click="ignore",
             use_container_width=True
         )
+    
+    with col2:
+        # Opção para exportar dados
+        if exportar is None and df is not None:
+            exportar = partial(_exportar_frame, df)
+        if exportar is not None:
+            formato = st.selectbox("Formato", formatos_disponiveis(), key="formato_exportacao",
+                                   format_func=str.upper, label_visibility="collapsed")
+            st.download_button(
+                label=f"📁 Exportar Dados Completos (.{formato})",
+                data=lambda: _arquivo_exportado(exportar, formato),
+                file_name=f"dados_financeiros_{datetime.now().strftime('%Y%m%d')}.{formato}",
+                mime=FORMATOS[formato],
+                on_click="ignore",
+                use_container_width=True
+            )
+
+
+def formulario_transacao(registrar, contas=None):
+    # Formulário "Nova Transação". `registrar(transacao)` grava só a linha e
+    # soma o delta nos agregados em cache (src.data.access): o custo não
+    # cresce com o tamanho do histórico. Com `contas` a conta é escolhida
+    with st.form("nova_transacao"):
+        col1, col2 = st.columns(2)
+
+        with col1:
+            data = st.date_input("Data")
+            tipo = st.selectbox("Tipo", ["entrada", "saida"])
+            valor = st.number_input("Valor (R$)", min_value=0.01, step=0.01)
+
+        with col2:
+            categoria = st.selectbox("Categoria", CATEGORIAS_FORMULARIO)
+            descricao = st.text_input("Descrição")
+            conta = st.selectbox("Conta", contas) if contas else None
+
+        submitted = st.form_submit_button("Salvar Transação")
+
+        if submitted:
+            transacao = {
+                'Data': pd.Timestamp(data),
+                'Tipo': tipo,
+                'Categoria': categoria,
+                'Descrição': descricao,
+                'Valor': valor
+            }
+            if conta:
+                transacao['Conta'] = conta
+            registrar(transacao)
+            st.success("✅ Transação salva com sucesso!")
+
 
 # Código adicional para um sistema completo de controle financeiro:
 def sistema_controle_financeiro_completo():
@@ -395,10 +566,11 @@ def sistema_controle_financeiro_completo():
         ["🏠 Dashboard", "➕ Nova Transação", "🎯 Metas", "⚙️ Configurações"]
     )
     
-    # Carregar dados (simulação - na prática, use um banco de dados)
-    try:
-        df = pd.read_csv("financas.csv")
-    except:
+    # Carregar dados (em cache até o arquivo mudar). As linhas do histórico só
+    # são lidas nas telas que precisam delas; o dashboard usa os agregados.
+    df = None
+    agregados = carregar_agregados_csv()
+    if agregados is None:
         # Dados de exemplo
         df = pd.DataFrame({
             'Data': pd.date_range(start='2024-01-01', periods=100, freq='D'),
@@ -411,46 +583,38 @@ def sistema_controle_financeiro_completo():
             'Valor': [3000 if i % 3 == 0 else 
                      abs(np.random.normal(50, 20)) for i in range(100)]
         })
+        agregados = build_aggregates(df)
+    
+    # Filtros valem para o dashboard e as metas; são aplicados na leitura
+    filtros = SEM_FILTROS
+    if menu in ("🏠 Dashboard", "🎯 Metas"):
+        filtros = filtros_sidebar(agregados)
     
     if menu == "🏠 Dashboard":
-        show_dashboard(df)
+        if df is not None:
+            show_dashboard(filtrar_frame(df, filtros), agregados=None if filtros.ativo else agregados)
+        else:
+            show_dashboard(agregados=carregar_agregados_csv(filtros=filtros),
+                           exportar=partial(exportar_csv, filtros),
+                           estado_kpis=None if filtros.ativo else carregar_kpis_csv())
     
     elif menu == "➕ Nova Transação":
         st.header("Adicionar Nova Transação")
-        
-        with st.form("nova_transacao"):
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                data = st.date_input("Data")
-                tipo = st.selectbox("Tipo", ["entrada", "saida"])
-                valor = st.number_input("Valor (R$)", min_value=0.01, step=0.01)
-            
-            with col2:
-                categoria = st.selectbox("Categoria", 
-                    ["Salário", "Investimentos", "Alimentação", "Transporte", 
-                     "Moradia", "Lazer", "Saúde", "Educação", "Outros"])
-                descricao = st.text_input("Descrição")
-            
-            submitted = st.form_submit_button("Salvar Transação")
-            
-            if submitted:
-                nova_linha = pd.DataFrame([{
-                    'Data': data,
-                    'Tipo': tipo,
-                    'Categoria': categoria,
-                    'Descrição': descricao,
-                    'Valor': valor
-                }])
-                
-                df = pd.concat([df, nova_linha], ignore_index=True)
-                df.to_csv("financas.csv", index=False)
-                st.success("✅ Transação salva com sucesso!")
-                st.rerun()
+        formulario_transacao(registrar_transacao_csv)
     
     elif menu == "🎯 Metas":
         st.header("Metas Financeiras")
         
+        # Só o mês corrente (do ano corrente) com as contas/categorias do
+        # filtro: recorte por busca binária nas datas ordenadas, uma vez por
+        # rerun, em vez de uma máscara no histórico por categoria
+        hoje = datetime.now()
+        filtros_mes = replace(filtros, inicio=date(hoje.year, hoje.month, 1),
+                              fim=date(hoje.year, hoje.month, calendar.monthrange(hoje.year, hoje.month)[1]))
+        df_mes = filtrar_frame(df, filtros_mes) if df is not None else carregar_csv(filtros=filtros_mes)
+        saidas_mes = df_mes[df_mes['Tipo'] == 'saida']
+        gastos_mes = saidas_mes.groupby('Categoria', observed=True)['Valor'].sum()
+        
         col1, col2 = st.columns(2)
         
         with col1:
@@ -459,16 +623,10 @@ def sistema_controle_financeiro_completo():
                                          min_value=0.0, value=1000.0)
             
             # Calcular progresso
-            mes_atual = datetime.now().month
-            ano_atual = datetime.now().year
-            
-            df_mes = df[(df['Data'].dt.month == mes_atual) & 
-                       (df['Data'].dt.year == ano_atual)]
-            
-            saldo_mes = df_mes[df_mes['Tipo'] == 'entrada']['Valor'].sum() - \
-                       df_mes[df_mes['Tipo'] == 'saida']['Valor'].sum()
+            saldo_mes = df_mes.loc[df_mes['Tipo'] == 'entrada', 'Valor'].sum() - saidas_mes['Valor'].sum()
             
-            progresso = min(saldo_mes / meta_mensal * 100, 100) if meta_mensal > 0 else 0
+            # Mês no vermelho conta como 0% (st.progress não aceita negativo)
+            progresso = min(max(saldo_mes, 0) / meta_mensal * 100, 100) if meta_mensal > 0 else 0
             
             st.progress(progresso / 100)
             st.caption(f"Progresso: R$ {saldo_mes:,.2f} / R$ {meta_mensal:,.2f} ({progresso:.1f}%)")
@@ -476,12 +634,12 @@ def sistema_controle_financeiro_completo():
         with col2:
             st.subheader("📊 Metas por Categoria")
             
-            categorias = df[df['Tipo'] == 'saida']['Categoria'].unique()
+            categorias = agregados.categorias.index[agregados.categorias['qtd_saida'] > 0]
+            if filtros.categorias:
+                categorias = categorias[categorias.isin(filtros.categorias)]
             
             for cat in categorias[:3]:  # Mostrar apenas 3
-                gasto_cat = df[(df['Categoria'] == cat) & 
-                              (df['Tipo'] == 'saida') & 
-                              (df['Data'].dt.month == mes_atual)]['Valor'].sum()
+                gasto_cat = float(gastos_mes.get(cat, 0.0))
                 
                 meta_cat = st.number_input(
                     f"Meta para {cat} (R$)",
@@ -0,0 +1,21 @@
+import pandas as pd
+from src.analytics.aggregates import build_aggregates
+
+
+def test_saida_de_valor_zero_conta_como_saida():
+    df = pd.DataFrame({
+        'Data': pd.to_datetime(['2024-01-01 10:00', '2024-01-01 11:00', '2024-01-02 09:00',
+                                '2024-02-03 08:00', '2024-02-03 12:00', '2024-02-04 12:00']),
+        'Tipo': ['entrada', 'saida', 'saida', 'saida', 'saida', 'saida'],
+        'Categoria': ['Salário', 'Lazer', 'Lazer', 'Moradia', 'Moradia', 'Lazer'],
+        'Descrição': ['a', 'b', 'c', 'd', 'e', 'f'],
+        'Valor': [100.0, -10.0, 0.0, -20.0, -0.0, -5.0],
+        'Conta': 'Nubank',
+    })
+    agregados = build_aggregates(df)
+    colunas = ['qtd_entrada', 'qtd_saida']
+
+    esperado = {'qtd_entrada': 1, 'qtd_saida': 5}
+    assert agregados.diario[colunas].sum().to_dict() == esperado
+    assert agregados.mensal[colunas].sum().to_dict() == esperado
+    assert agregados.categorias[colunas].sum().to_dict() == esperado
@@ -0,0 +1,43 @@
+from datetime import date
+
+import pandas as pd
+import pytest
+from src.data.exportacao import exportar, lotes_frame
+from src.data.filtros import Filtros
+
+TRANSACOES = pd.DataFrame({
+    'Data': pd.to_datetime(['2024-02-03 10:00', '2024-01-05 09:00']),
+    'Tipo': ['entrada', 'saida'],
+    'Categoria': ['Salário', 'Lazer'],
+    'Descrição': ['ACME', 'Cinema'],
+    'Valor': [3000.0, 45.5],
+    'Conta': ['Nubank', 'Nubank'],
+})
+NENHUMA = Filtros(inicio=date(2030, 1, 1))
+
+
+@pytest.fixture
+def origem_csv(tmp_path):
+    path = tmp_path / 'financas.csv'
+    TRANSACOES.to_csv(path, index=False)
+    return str(path)
+
+
+def test_csv_sem_linhas_no_filtro_tem_cabecalho(origem_csv, tmp_path):
+    destino = exportar(origem_csv, str(tmp_path / 'vazio.csv'), filtros=NENHUMA)
+
+    with open(destino, encoding='utf-8') as f:
+        assert f.read() == ','.join(TRANSACOES.columns) + '\n'
+
+
+def test_frame_vazio_tem_cabecalho(tmp_path):
+    destino = exportar('memoria', str(tmp_path / 'vazio.csv'), lotes=lotes_frame(TRANSACOES.iloc[:0]))
+
+    assert list(pd.read_csv(destino).columns) == list(TRANSACOES.columns)
+
+
+def test_filtro_de_periodo_em_csv_fora_de_ordem(origem_csv, tmp_path):
+    filtros = Filtros(inicio=date(2024, 1, 1), fim=date(2024, 1, 31))
+    destino = exportar(origem_csv, str(tmp_path / 'janeiro.csv'), filtros=filtros, tamanho=1)
+
+    assert pd.read_csv(destino)['Descrição'].tolist() == ['Cinema']
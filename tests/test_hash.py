@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.etl.load import Ocorrencias, hash_transacoes
+
+# Hash em chunks = hash do arquivo inteiro, com transações idênticas no mesmo
+# minuto caindo em chunks diferentes
+
+
+def transacoes(n, seed):
+    rng = np.random.default_rng(seed)
+    # Poucos minutos e descrições: muitas chaves repetidas
+    minutos = np.sort(rng.integers(0, n // 4, n))
+    return pd.DataFrame({
+        'Data': pd.Timestamp('2024-01-01') + pd.to_timedelta(minutos, unit='m'),
+        'Descrição': rng.choice(['PIX', 'Mercado', 'Uber'], n),
+        'Valor': rng.choice([10.0, -25.5], n),
+        'Transação': rng.choice(['Pix enviado', 'Compra'], n),
+        'Conta': 'Nubank',
+    })
+
+
+def em_chunks(df, tamanho):
+    ocorrencias = Ocorrencias()
+    hashes = pd.concat([hash_transacoes(df.iloc[i:i + tamanho], ocorrencias)
+                        for i in range(0, len(df), tamanho)])
+    return hashes, ocorrencias
+
+
+@pytest.mark.parametrize('ordem', ['crescente', 'decrescente', 'embaralhada'])
+@pytest.mark.parametrize('tamanho', [7, 100, 1000])
+def test_chunks_iguais_ao_arquivo_inteiro(ordem, tamanho):
+    df = transacoes(1000, 0)
+    if ordem == 'decrescente':
+        df = df.iloc[::-1]
+    elif ordem == 'embaralhada':
+        df = df.sample(frac=1, random_state=0)
+    df = df.reset_index(drop=True)
+
+    hashes, _ = em_chunks(df, tamanho)
+    assert hashes.is_unique
+    pd.testing.assert_series_equal(hashes, hash_transacoes(df))
+
+
+def test_estado_limitado_em_ordem_de_data():
+    pequeno = em_chunks(transacoes(2_000, 1), 500)[1]
+    grande = em_chunks(transacoes(40_000, 1), 500)[1]
+    # Em ordem de data só ficam as chaves dos minutos ainda abertos
+    assert grande.pico_chaves <= 2 * pequeno.pico_chaves
+    assert len(grande) < 100
+
+
+def test_fora_de_ordem_depois_de_descartar():
+    df = transacoes(1000, 2)
+    ocorrencias = Ocorrencias()
+    hash_transacoes(df.iloc[500:], ocorrencias)
+    with pytest.raises(ValueError):
+        hash_transacoes(df.iloc[:500], ocorrencias)
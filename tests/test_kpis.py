@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.analytics.aggregates import build_aggregates, media_mensal
+from src.analytics.aggregates import saldo_mensal as saldo_mensal_agregados
+from src.analytics.kpis import (absorver, estado_vazio, kpis, ler_estado, montar_estado, salvar_estado,
+                                saldo_mensal)
+
+# Propriedade do estado incremental: absorver o histórico em lotes
+# aleatórios (fora de ordem de data inclusive), com ida e volta pelo arquivo
+# a cada lote, dá exatamente o estado de montar tudo de uma vez.
+
+
+def transacoes(n, seed):
+    rng = np.random.default_rng(seed)
+    minutos = rng.integers(0, 2 * 365 * 24 * 60, n)
+    tipos = np.where(rng.random(n) < 0.3, 'entrada', 'saida')
+    return pd.DataFrame({
+        'Data': pd.Timestamp('2024-01-01') + pd.to_timedelta(minutos, unit='m'),
+        'Tipo': tipos,
+        'Categoria': rng.choice(['Salário', 'Alimentação', 'Lazer', 'Moradia'], n),
+        'Descrição': [f'transação {i}' for i in range(n)],
+        'Valor': np.round(rng.gamma(2.0, 150.0, n), 2),
+        'Conta': rng.choice(['Conta BTG Pactual', 'Nubank', 'Itaú'], n),
+    })
+
+
+def em_lotes(df, lotes, rng):
+    # Partição aleatória das linhas; cada lote mantém a ordem original
+    posicoes = rng.permutation(len(df))
+    cortes = np.sort(rng.choice(np.arange(1, len(df)), size=lotes - 1, replace=False))
+    return [df.iloc[np.sort(pedaco)] for pedaco in np.split(posicoes, cortes)]
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_lotes_aleatorios_iguais_ao_recalculo(seed, tmp_path):
+    rng = np.random.default_rng(seed)
+    df = transacoes(int(rng.integers(50, 2000)), seed)
+    path = tmp_path / 'estado.kpis.json'
+
+    estado = estado_vazio()
+    for i, lote in enumerate(em_lotes(df, int(rng.integers(2, 30)), rng)):
+        estado = absorver(estado, lote, lote=f'lote-{i}')
+        salvar_estado(estado, path)
+        estado = ler_estado(path)
+
+    completo = montar_estado(df)
+    # Centavos inteiros: igualdade exata; só o tipo do índice muda no JSON
+    pd.testing.assert_frame_equal(estado.mensal, completo.mensal, check_index_type=False, check_exact=True)
+    pd.testing.assert_frame_equal(estado.saldos, completo.saldos, check_index_type=False, check_exact=True)
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_kpis_iguais_aos_agregados(seed):
+    df = transacoes(1000, seed)
+    estado = montar_estado(df)
+    agregados = build_aggregates(df)
+
+    atual = kpis(estado)
+    assert atual['total_receita'] == pytest.approx(agregados.total_receita, abs=0.01)
+    assert atual['total_despesa'] == pytest.approx(agregados.total_despesa, abs=0.01)
+    assert atual['media_mensal_entrada'] == pytest.approx(media_mensal(agregados, 'entrada'), abs=0.01)
+    assert atual['media_mensal_saida'] == pytest.approx(media_mensal(agregados, 'saida'), abs=0.01)
+    np.testing.assert_allclose(saldo_mensal(estado)['Saldo_Mensal'],
+                               saldo_mensal_agregados(agregados)['Saldo_Mensal'], atol=0.01)
+
+
+def test_lote_repetido_nao_soma_de_novo():
+    df = transacoes(100, 0)
+    estado = absorver(estado_vazio(), df, lote='extrato-1')
+    with pytest.raises(ValueError):
+        absorver(estado, df, lote='extrato-1')
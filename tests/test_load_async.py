@@ -0,0 +1,129 @@
+import asyncio
+import contextlib
+import io
+import uuid
+from types import SimpleNamespace
+
+import psycopg2
+import pytest
+from benchmarks.sintetico import gerar_extrato
+from src.config.database import DB_CONFIG
+from src.etl import load_async
+from src.etl.dimensoes import limpar_cache
+from src.etl.schema import garantir_schema
+from src.etl.transform import transform
+
+asyncpg = pytest.importorskip("asyncpg")
+
+# Contra um PostgreSQL local (DB_HOST, DB_NAME, ...), num schema descartável
+pytestmark = pytest.mark.skipif(not DB_CONFIG["dbname"], reason="DB_* não configurado")
+
+
+@pytest.fixture
+def schema():
+    nome = f"teste_async_{uuid.uuid4().hex[:8]}"
+    conn = psycopg2.connect(**DB_CONFIG, options=f"-c search_path={nome}")
+    with conn.cursor() as cur:
+        cur.execute(f"CREATE SCHEMA {nome}")
+        garantir_schema(cur)
+    conn.commit()
+    try:
+        yield conn, {"search_path": nome}
+    finally:
+        conn.rollback()
+        with conn.cursor() as cur:
+            cur.execute(f"DROP SCHEMA {nome} CASCADE")
+        conn.commit()
+        conn.close()
+        limpar_cache()
+
+
+def lotes(quantos, linhas=500):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return [transform(gerar_extrato(linhas, seed=i), conta=f"Conta {i}") for i in range(quantos)]
+
+
+def contagens(conn):
+    with conn.cursor() as cur:
+        cur.execute("SELECT (SELECT count(*) FROM tb_transacoes), "
+                    "(SELECT COALESCE(sum(qtd), 0) FROM tb_resumo_mensal)")
+        return cur.fetchone()
+
+
+def test_lotes_concorrentes(schema, monkeypatch):
+    conn, settings = schema
+    original = load_async._carregar_lote
+    em_uso, pico = 0, 0
+
+    @contextlib.asynccontextmanager
+    async def conexao_contada(pool):
+        nonlocal em_uso, pico
+        async with pool.acquire() as conexao:
+            em_uso += 1
+            pico = max(pico, em_uso)
+            try:
+                yield conexao
+            finally:
+                em_uso -= 1
+
+    async def medido(pool, registros, mode):
+        return await original(SimpleNamespace(acquire=lambda: conexao_contada(pool)), registros, mode)
+
+    monkeypatch.setattr(load_async, "_carregar_lote", medido)
+    dfs = lotes(6)
+    carregadas = load_async.carregar_lotes(dfs, concorrencia=3, server_settings=settings)
+
+    assert carregadas == [len(df) for df in dfs]
+    assert 1 < pico <= 3
+    assert contagens(conn) == (sum(carregadas), sum(carregadas))
+    # Incremental: a mesma carga de novo não duplica nada
+    assert load_async.carregar_lotes(dfs, concorrencia=3, server_settings=settings) == [0] * len(dfs)
+
+
+def test_nova_tentativa_em_erro_transitorio(schema, monkeypatch):
+    conn, settings = schema
+    original = load_async._carregar_lote
+    chamadas = []
+
+    async def instavel(pool, registros, mode):
+        chamadas.append(len(registros))
+        if len(chamadas) == 1:
+            raise asyncpg.exceptions.DeadlockDetectedError("deadlock detectado")
+        return await original(pool, registros, mode)
+
+    async def sem_espera(segundos):
+        pass
+
+    monkeypatch.setattr(load_async, "_carregar_lote", instavel)
+    monkeypatch.setattr(asyncio, "sleep", sem_espera)
+    dfs = lotes(1)
+    assert load_async.carregar_lotes(dfs, server_settings=settings) == [len(dfs[0])]
+    assert len(chamadas) == 2
+    assert contagens(conn) == (len(dfs[0]), len(dfs[0]))
+
+
+def test_lote_com_falha_nao_derruba_os_outros(schema, monkeypatch):
+    conn, settings = schema
+    original = load_async.registros_transacoes
+
+    def conta_inexistente(transacoes):
+        registros = original(transacoes)
+        if len(registros) == 300:
+            # conta_id sem linha em tb_contas: a chave estrangeira recusa no
+            # INSERT final, depois do COPY na staging
+            indice = load_async.COLUNAS_TRANSACOES.index("conta_id")
+            registros = [r[:indice] + (999_999,) + r[indice + 1:] for r in registros]
+        return registros
+
+    monkeypatch.setattr(load_async, "registros_transacoes", conta_inexistente)
+    dfs = lotes(3)
+    dfs[1] = dfs[1].head(300)
+
+    with pytest.raises(ExceptionGroup) as falha:
+        load_async.carregar_lotes(dfs, concorrencia=2, server_settings=settings)
+
+    assert falha.group_contains(asyncpg.exceptions.ForeignKeyViolationError)
+    assert len(falha.value.exceptions) == 1
+    # Só o lote ruim voltou atrás; os outros e o resumo deles ficaram
+    esperado = len(dfs[0]) + len(dfs[2])
+    assert contagens(conn) == (esperado, esperado)
@@ -0,0 +1,51 @@
+import pandas as pd
+import pytest
+from src.etl import parser
+
+# Linha 3 tem campo a mais, o registro das linhas 4-5 é um campo com quebra
+# de linha, a 6 fica em branco, a 7 tem data inválida e a 8 valor inválido
+EXTRATO = """\
+,Data,Categoria,Transação,,,Descrição,,,,Valor
+,01/02/2024 10:00,Lazer,Pix,,,Cinema,,,,"-1.234,56"
+,02/02/2024 10:00,Lazer,Pix,,,Cinema,,,,"-80,50",extra
+,04/02/2024 11:00,Lazer,Pix,,,"Mercado
+Centro",,,,"-5,00"
+
+,xx/02/2024 10:00,Lazer,Pix,,,Cinema,,,,"10,00"
+,05/02/2024 11:00,Lazer,Pix,,,Bar,,,,abc
+,06/02/2024 11:00,Lazer,Pix,,,Bar,,,,"R$ 2.500,00"
+"""
+
+
+@pytest.fixture(params=['pyarrow', 'pandas'])
+def motor(request, monkeypatch):
+    if request.param == 'pandas':
+        monkeypatch.setattr(parser, 'pa', None)
+    elif parser.pa is None:
+        pytest.skip('pyarrow não instalado')
+
+
+@pytest.fixture
+def extrato(tmp_path):
+    path = tmp_path / 'extrato.csv'
+    path.write_text(EXTRATO, encoding='utf-8')
+    return path
+
+
+def rejeitados(tmp_path):
+    return pd.read_csv(tmp_path / 'rejeitados' / 'extrato-rejeitados.csv')
+
+
+def test_rejeitados_apontam_a_linha_do_arquivo(motor, extrato, tmp_path):
+    df = parser.ler_extrato(extrato, rejeitados_dir=tmp_path / 'rejeitados')
+
+    assert len(df) == 3
+    assert rejeitados(tmp_path)['linha'].tolist() == [3, 7, 8]
+
+
+def test_chunks_sem_pedacos_vazios(motor, extrato, tmp_path):
+    # O segundo pedaço (linhas 7 e 8) é todo rejeitado
+    chunks = list(parser.ler_extrato_chunks(extrato, chunksize=2, rejeitados_dir=tmp_path / 'rejeitados'))
+
+    assert [len(chunk) for chunk in chunks] == [2, 1]
+    assert rejeitados(tmp_path)['linha'].tolist() == [3, 7, 8]
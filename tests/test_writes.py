@@ -0,0 +1,35 @@
+import pandas as pd
+from src.data.writes import anexar_csv
+from src.etl.trava import trava
+
+TRANSACAO = {'Data': '2024-03-01 10:00', 'Tipo': 'saida', 'Categoria': 'Lazer',
+             'Descrição': 'Cinema', 'Valor': 45.5}
+
+
+def test_anexa_depois_de_ultima_linha_sem_quebra(tmp_path):
+    path = tmp_path / 'financas.csv'
+    path.write_text('Data,Tipo,Categoria,Descrição,Valor\n2024-02-01 09:00,entrada,Salário,ACME,3000.0',
+                    encoding='utf-8')
+
+    antes, depois = anexar_csv(TRANSACAO, path)
+
+    df = pd.read_csv(path)
+    assert df['Descrição'].tolist() == ['ACME', 'Cinema']
+    assert antes != depois
+
+
+def test_arquivo_vazio_ganha_cabecalho(tmp_path):
+    path = tmp_path / 'financas.csv'
+    path.touch()
+
+    anexar_csv(TRANSACAO, path)
+
+    assert pd.read_csv(path).to_dict('records') == [TRANSACAO]
+
+
+def test_trava_exclusiva(tmp_path):
+    path = tmp_path / 'etl.lock'
+    with trava(path) as primeira, trava(path) as segunda:
+        assert primeira and not segunda
+    with trava(path) as de_novo:
+        assert de_novo